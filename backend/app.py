@@ -1,4 +1,5 @@
-from fastapi import APIRouter, FastAPI, Depends, HTTPException, UploadFile, File, Form 
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, UploadFile, File, Form, Request, Response, Query
+from fastapi.responses import FileResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from datetime import date, datetime, timedelta, time
@@ -6,13 +7,22 @@ from sqlalchemy import text
 from pydantic import BaseModel
 from pathlib import Path
 import os,uuid
+import hashlib, hmac
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 
-from database import SessionLocal, engine
-import models, schemas
-from schemas import LeaveApply, LeaveReview, BonafideApply, BonafideReview, OutpassApply, OutpassReview
+from database import (
+    DATABASE_URL, SessionLocal, ReadSessionLocal, AsyncSessionLocal,
+    engine, replica_engine, async_engine, async_replica_engine,
+    pool_stats, connection_budget, read_engine, async_read_engine, fetch_all, violates, deadlocked,
+    READ_YOUR_WRITES_SECONDS, READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_HEADER, primary_until_from
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import DBAPIError, IntegrityError
+import models, schemas, migrate
+import statements as st
+from schemas import LeaveApply, LeaveReview, BonafideApply, BonafideReview, OutpassApply, OutpassReview, BulkReviewItem
 
 from fastapi import UploadFile, File
 from typing import List
@@ -21,9 +31,24 @@ from uuid import uuid4
 from datetime import date, time
 from typing import Optional
 
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from jose import jwt
+from google_verifier import GoogleTokenVerifier
+from identity import (
+    IDENTITY_VERSION, resolve_identity, apply_identity, apply_identity_async, stream_identity
+)
+from pagination import Page, NEXT_CURSOR_HEADER, set_next_cursor
+from exports import export_response
+from conditional import Stamp, version_stamp, validator_headers, not_modified, conditional_stats
+from events import EventHub, sse_response
+from bulk_review import apply_bulk_review, summarize
+from documents import (
+    fetch_bonafide_certificate_data, load_document, can_access_document, document_key,
+    render_document, print_run_documents, documents_key, render_documents
+)
+from pdf_cache import pdf_cache
+from renderer import renderer, RendererBusy, RenderTimeout, RenderError
+from template_service import templates
+from jobs import Job, mail_job, enqueue, enqueue_job, enqueue_many
 
 from fastapi.security import OAuth2PasswordBearer
 
@@ -34,6 +59,13 @@ load_dotenv()
 
 models.Base.metadata.create_all(bind=engine)
 
+# Versioned schema changes (indexes, constraints) live in migrations/ and
+# are applied by `python manage.py migrate` before the workers start.
+# AUTO_MIGRATE is for single-process development: a worker that finds
+# another one migrating carries on rather than waiting for it.
+if os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes"):
+    migrate.upgrade(engine, wait=False)
+
 app = FastAPI(title="Leave Approval System")
 
 def get_db():
@@ -43,6 +75,59 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db(request: Request):
+    # Replica unless the caller (set by the auth dependency) just wrote
+    db = ReadSessionLocal(info={"request_state": request.state})
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# The /internal/* stats endpoints: admins only (users.role = 'ADMIN',
+# set by hand), or a monitoring scraper sending INTERNAL_API_TOKEN in
+# X-Internal-Token
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+def require_admin(request: Request):
+    scraper_token = request.headers.get("x-internal-token")
+    if INTERNAL_API_TOKEN and scraper_token:
+        if hmac.compare_digest(scraper_token, INTERNAL_API_TOKEN):
+            return
+        raise HTTPException(403, "Not allowed")
+
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        raise HTTPException(401, "Not authenticated")
+
+    try:
+        payload = jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except Exception:
+        raise HTTPException(401, "Invalid token")
+
+    if (payload.get("role") or "").lower() != "admin":
+        raise HTTPException(403, "Admins only")
+
+@app.get("/internal/statements", dependencies=[Depends(require_admin)])
+def internal_statement_stats():
+    return st.statement_stats()
+
+@app.get("/internal/conditional", dependencies=[Depends(require_admin)])
+def internal_conditional_stats():
+    return conditional_stats()
+
+@app.get("/internal/pool", dependencies=[Depends(require_admin)])
+def internal_pool_stats(db: Session = Depends(get_db)):
+    stats = pool_stats()
+    stats["server_max_connections"] = int(db.execute(st.SERVER_MAX_CONNECTIONS).scalar())
+    if replica_engine is not engine:
+        stats["replica"] = pool_stats(replica_engine)
+    stats["worker_connection_budget"] = connection_budget()
+    return stats
+
 from fastapi.middleware.cors import CORSMiddleware
 
 app.add_middleware(
@@ -57,8 +142,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, READ_YOUR_WRITES_HEADER, "ETag", "Last-Modified"],
 )
 
+@app.middleware("http")
+async def read_your_writes(request, call_next):
+    # The client brings back the end of its read-your-writes window
+    # (database.py); a commit during this request extends it
+    request.state.primary_until = primary_until_from(
+        request.headers.get(READ_YOUR_WRITES_HEADER)
+        or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    )
+    response = await call_next(request)
+
+    if getattr(request.state, "wrote", False):
+        until = f"{request.state.primary_until:.3f}"
+        response.headers[READ_YOUR_WRITES_HEADER] = until
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, until,
+            max_age=int(READ_YOUR_WRITES_SECONDS) + 1, httponly=True, samesite="lax",
+        )
+    return response
+
 @app.middleware("http")
 async def remove_coop_headers(request, call_next):
     response = await call_next(request)
@@ -73,15 +178,65 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "default-secret")
 ALGORITHM = "HS256"
 
+google_verifier = GoogleTokenVerifier(GOOGLE_CLIENT_ID)
+
 def verify_google_token(token: str):
-    try:
-        return id_token.verify_oauth2_token(
-            token,
-            requests.Request(),
-            GOOGLE_CLIENT_ID
-        )
-    except Exception:
-        return None
+    return google_verifier.verify(token)
+
+@app.on_event("shutdown")
+def stop_google_verifier():
+    google_verifier.stop()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+    if async_replica_engine is not async_engine:
+        await async_replica_engine.dispose()
+
+# One LISTEN connection per worker for the approver SSE streams
+event_hub = EventHub(DATABASE_URL)
+
+@app.on_event("startup")
+async def start_event_hub():
+    event_hub.start()
+
+@app.on_event("shutdown")
+async def stop_event_hub():
+    await event_hub.stop()
+
+@app.get("/internal/events", dependencies=[Depends(require_admin)])
+def internal_event_stats():
+    return event_hub.stats()
+
+@app.get("/internal/jobs", dependencies=[Depends(require_admin)])
+def internal_job_stats(db: Session = Depends(get_db)):
+    return db.execute(st.JOB_QUEUE_STATS).mappings().all()
+
+@app.get("/internal/pdf-cache", dependencies=[Depends(require_admin)])
+def internal_pdf_cache_stats():
+    return pdf_cache.stats()
+
+# Templates compile at startup; the renderer processes start with the
+# first download that misses the PDF cache
+@app.on_event("startup")
+def load_templates():
+    templates.load()
+
+@app.on_event("shutdown")
+def stop_renderer():
+    renderer.shutdown()
+
+@app.get("/internal/renderer", dependencies=[Depends(require_admin)])
+def internal_renderer_stats():
+    return renderer.stats()
+
+@app.get("/internal/templates", dependencies=[Depends(require_admin)])
+def internal_template_stats():
+    return templates.stats()
+
+@app.get("/internal/google-verifier", dependencies=[Depends(require_admin)])
+def google_verifier_stats():
+    return google_verifier.stats()
 
 def create_jwt(payload: dict):
     payload["exp"] = datetime.utcnow() + timedelta(days=1)
@@ -110,110 +265,37 @@ def google_login(payload: GoogleLoginRequest, db: Session = Depends(get_db)):
     if not email.endswith("@citchennai.net"):
         raise HTTPException(403, "Only college email allowed")
 
-    # ===================== PREFER USERS TABLE =====================
-    # Check users table first — this is the single source of truth for role
-    user = db.execute(
-        text("SELECT * FROM users WHERE email = :email"),
-        {"email": email}
-    ).mappings().first()
+    # ===================== RESOLVE + UPSERT USER =====================
+    # users table stays the single source of truth for role. For a
+    # first-time login the role is resolved from the identity tables
+    # (student > advisor > hod > warden) and inserted in the same
+    # statement, so both paths are a single round trip.
+    user = db.execute(st.LOGIN_UPSERT, {"email": email}).mappings().first()
 
     if not user:
-        # User not in users table yet — fallback to students/faculty/advisors
-        # Check students table
-        student = db.execute(
-            text("SELECT reg_no FROM students WHERE email = :email"),
-            {"email": email}
-        ).mappings().first()
-
-        if student:
-            reg_no = student["reg_no"]
-            db.execute(
-                text("""
-                    INSERT INTO users (email, reg_no, role)
-                    VALUES (:email, :reg_no, 'STUDENT')
-                """),
-                {"email": email, "reg_no": reg_no}
-            )
-            db.commit()
+        # ON CONFLICT lost to a concurrent first login — the row exists now
+        user = db.execute(st.LOGIN_UPSERT, {"email": email}).mappings().first()
 
-            user = db.execute(
-                text("SELECT * FROM users WHERE email = :email"),
-                {"email": email}
-            ).mappings().first()
-
-        else:
-            # Not a student — check faculty/advisors table
-            # 🔹 Check ADVISOR
-            advisor = db.execute(
-                text("SELECT advisor_id FROM advisors WHERE email = :email"),
-                {"email": email}
-            ).fetchone()
-
-            # 🔹 Check HOD
-            hod = db.execute(
-                text("SELECT hod_id FROM hods WHERE email = :email"),
-                {"email": email}
-            ).fetchone()
-
-            # 🔹 Check WARDEN
-            warden = db.execute(
-                text("SELECT warden_id FROM wardens WHERE email = :email"),
-                {"email": email}
-            ).fetchone()
-
-# ===================== FACULTY ROLE RESOLUTION =====================
-
-            if advisor:
-                db.execute(
-                    text("""
-                        INSERT INTO users (email, role)
-                        VALUES (:email, 'ADVISOR')
-                    """),
-                    {"email": email}
-                )
-                db.commit()
-
-            elif hod:
-                db.execute(
-                    text("""
-                        INSERT INTO users (email, role)
-                        VALUES (:email, 'HOD')
-                    """),
-                    {"email": email}
-                )
-                db.commit()
-
-            elif warden:
-                db.execute(
-                    text("""
-                        INSERT INTO users (email, role)
-                        VALUES (:email, 'WARDEN')
-                    """),
-                    {"email": email}
-                )
-                db.commit()
-
-            else:
-                raise HTTPException(403, "No account found")
-
-            user = db.execute(
-                text("SELECT * FROM users WHERE email = :email"),
-                {"email": email}
-            ).mappings().first()
-
-
-            user = db.execute(
-                text("SELECT * FROM users WHERE email = :email"),
-                {"email": email}
-            ).mappings().first()
+    if not user:
+        raise HTTPException(403, "No account found")
+
+    db.commit()
 
     # ===================== TOKEN CREATION =====================
-    token = create_jwt({
+    role = user["role"].lower()
+
+    # Approver ids / department / sections travel as signed claims so
+    # the per-request dependencies never have to look them up
+    claims = {
         "user_id": user["user_id"],
         "email": user["email"],
         "reg_no": user.get("reg_no"),
-        "role": user["role"].lower()
-    })
+        "role": role,
+        "idv": IDENTITY_VERSION
+    }
+    claims.update(resolve_identity(db, email, role))
+
+    token = create_jwt(claims)
 
     return {
         "access_token": token,
@@ -226,7 +308,11 @@ def google_login(payload: GoogleLoginRequest, db: Session = Depends(get_db)):
 
 security = HTTPBearer()
 
-def get_current_user(token=Depends(security), db: Session = Depends(get_db)):
+def track_user(request: Request, db: Session, payload: dict):
+    # Lets commits on db pin this user's reads to the primary for a while
+    db.info["request_state"] = request.state
+
+def get_current_user(request: Request, token=Depends(security), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
 
@@ -237,28 +323,17 @@ def get_current_user(token=Depends(security), db: Session = Depends(get_db)):
         if payload["role"] == "student" and not payload.get("reg_no"):
             raise HTTPException(401, "Invalid student token")
 
+        track_user(request, db, payload)
+
+        # Tokens minted before identity claims → TTL cache / DB
+        apply_identity(payload, db)
+
         # Advisor safety
         if payload["role"] == "advisor" and not payload.get("advisor_id"):
             raise HTTPException(401, "Invalid advisor token")
 
-
-        if payload["role"] == "warden":
-            # If token already has it, fine
-            if payload.get("warden_id"):
-                return payload
-
-            # Otherwise fetch from DB using email
-            email = payload.get("sub") or payload.get("email")
-
-            warden = db.execute(
-                text("SELECT warden_id FROM wardens WHERE email = :e"),
-                {"e": email}
-            ).mappings().first()
-
-            if not warden:
-                raise HTTPException(401, "Invalid warden token")
-
-            payload["warden_id"] = warden["warden_id"]
+        if payload["role"] == "warden" and not payload.get("warden_id"):
+            raise HTTPException(401, "Invalid warden token")
 
         return payload
 
@@ -273,37 +348,46 @@ def get_current_user(token=Depends(security), db: Session = Depends(get_db)):
 def test_auth(user=Depends(get_current_user)):
     return user
 
-def send_mail_with_pdfs(to_email, subject, body, pdf_paths: list[str]):
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = os.getenv("SENDER_MAIL")
-    msg["To"] = to_email
-    msg.set_content(body)
-
-    for path in pdf_paths:
-        if path:
-            with open(path, "rb") as f:
-                msg.add_attachment(
-                    f.read(),
-                    maintype="application",
-                    subtype="pdf",
-                    filename=os.path.basename(path)
-                )
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-        smtp.login(
-            os.getenv("SENDER_MAIL"),
-            os.getenv("APP_PASSWORD")
-        )
-        smtp.send_message(msg)
-
-def get_current_user_soft(token: str = Depends(oauth2_scheme)):
+def get_current_user_soft(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except:
         return None
 
+    track_user(request, db, payload)
+    return apply_identity(payload, db)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme)):
+    # get_current_user_soft for async endpoints: no sync Session, so the
+    # request never waits on a threadpool thread; old tokens resolve on
+    # the async engine
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except Exception:
+        return None
+
+    return await apply_identity_async(payload, async_engine)
+
+def get_stream_user(request: Request, token: Optional[str] = None):
+    # EventSource can't set headers, so SSE endpoints also take ?token=
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("bearer "):
+        token = auth[7:]
+
+    if not token:
+        raise HTTPException(401, "Not authenticated")
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except Exception:
+        raise HTTPException(401, "Invalid token")
+
+    # A stream subscribes by these claims until it closes, so they come
+    # from the identity cache (invalidated on section changes) rather
+    # than a token that may be a day old. A short-lived session on a
+    # miss: the stream itself must not hold a connection.
+    return stream_identity(payload, SessionLocal)
+
 #--- Leave Application Endpoint ---
 
 from datetime import date
@@ -357,11 +441,7 @@ def apply_leave(
     # 3️⃣ FETCH STUDENT DETAILS
     # -----------------------------
     student = db.execute(
-        text("""
-            SELECT department, year_of_study, residence_type
-            FROM students
-            WHERE reg_no = :reg_no
-        """),
+        st.LEAVE_APPLY_STUDENT,
         {"reg_no": reg_no}
     ).fetchone()
 
@@ -396,35 +476,10 @@ def apply_leave(
         raise HTTPException(400, "Emergency leave must be for today")
 
     # -----------------------------
-    # 5️⃣ OVERLAPPING LEAVE CHECK
-    # -----------------------------
-    overlap = db.execute(
-        text("""
-            SELECT 1
-            FROM leave_requests
-            WHERE reg_no = :reg_no
-              AND status IN ('PENDING', 'APPROVED')
-              AND (
-                    start_date <= :end_date
-                AND end_date >= :start_date
-              )
-        """),
-        {
-            "reg_no": reg_no,
-            "start_date": leave.start_date,
-            "end_date": leave.end_date
-        }
-    ).first()
-
-    if overlap:
-        raise HTTPException(
-            status_code=409,
-            detail="Leave already exists for the selected dates"
-        )
-
-    # -----------------------------
-    # 6️⃣ CREATE LEAVE REQUEST
+    # 5️⃣ CREATE LEAVE REQUEST
     # -----------------------------
+    # Overlapping active leaves are rejected by the insert itself
+    # (leave_requests_no_overlap, migrations/0011_request_date_ranges.sql)
     new_leave = models.LeaveRequest(
         reg_no=reg_no,
         category=leave.category,
@@ -435,7 +490,16 @@ def apply_leave(
     )
 
     db.add(new_leave)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if violates(e, "leave_requests_no_overlap"):
+            raise HTTPException(
+                status_code=409,
+                detail="Leave already exists for the selected dates"
+            )
+        raise
     db.refresh(new_leave)
 
     return {
@@ -457,26 +521,7 @@ def view_pending_leaves(
     advisor_id = user.get("advisor_id")
 
     leaves = db.execute(
-        text("""
-            SELECT 
-                lr.leave_id,
-                lr.reg_no,
-                s.name AS student_name,
-                lr.category,
-                lr.start_date,
-                lr.end_date,
-                lr.reason,
-                lr.status
-            FROM leave_requests lr
-            JOIN students s ON s.reg_no = lr.reg_no
-            JOIN section_advisors sa
-              ON sa.advisor_id = :advisor_id
-             AND sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE lr.status = 'PENDING'
-            ORDER BY lr.leave_id DESC
-        """),
+        st.LEAVE_PENDING,
         {"advisor_id": advisor_id}
     ).mappings().all()
 
@@ -501,15 +546,7 @@ def review_leave(
         raise HTTPException(400, "Invalid status")
 
     result = db.execute(
-        text("""
-            UPDATE leave_requests
-            SET status = :status,
-                acted_advisor_id = :advisor_id,
-                advisor_remark = :remark,
-                advisor_reviewed_at = CURRENT_TIMESTAMP
-            WHERE leave_id = :leave_id
-            AND status = 'PENDING'
-        """),
+        st.LEAVE_REVIEW,
         {
             "status": review.status,
             "remark": review.advisor_remark,
@@ -523,32 +560,31 @@ def review_leave(
 
     # Fetch student email
     leave = db.execute(
-        text("""
-            SELECT s.email
-            FROM leave_requests l
-            JOIN students s ON s.reg_no = l.reg_no
-            WHERE l.leave_id = :lid
-        """),
+        st.LEAVE_REVIEW_MAIL,
         {"lid": leave_id}
     ).mappings().first()
 
-    send_mail_with_pdfs(
-        to_email=leave["email"],
-        subject=f"Leave {review.status}",
-        body=f"Your leave request has been {review.status.lower()} by your advisor.",
-        pdf_paths=[]
-    )
+    # Mailed by the job worker once this commits
+    job_id = enqueue_job(db, mail_job(
+        leave["email"],
+        f"Leave {review.status}",
+        f"Your leave request has been {review.status.lower()} by your advisor.",
+        "LEAVE", leave_id
+    ))
 
     db.commit()
 
     return {
         "message": f"Leave {review.status.lower()} successfully",
-        "leave_id": leave_id
+        "leave_id": leave_id,
+        "job_id": job_id
     }
 
 
 @app.get("/leave/advisor/history")
 def view_reviewed_leaves(
+    response: Response,
+    page: Page = Depends(),
     user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -559,30 +595,13 @@ def view_reviewed_leaves(
     advisor_id = user.get("advisor_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                lr.leave_id,
-                lr.reg_no,
-                s.name AS student_name,
-                lr.category,
-                lr.start_date,
-                lr.end_date,
-                lr.status,
-                lr.advisor_remark,
-                lr.advisor_reviewed_at
-            FROM leave_requests lr
-            JOIN students s ON s.reg_no = lr.reg_no
-            JOIN section_advisors sa
-              ON sa.advisor_id = :advisor_id
-             AND sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE lr.status <> 'PENDING'
-            ORDER BY lr.advisor_reviewed_at DESC
-        """),
-        {"advisor_id": advisor_id}
+        page.statement(st.LEAVE_ADVISOR_HISTORY),
+        page.params(advisor_id=advisor_id)
     ).mappings().all()
 
+    result, next_cursor = page.cut(result, "advisor_reviewed_at", "leave_id")
+    set_next_cursor(response, next_cursor)
+
     return result
 
 
@@ -599,83 +618,6 @@ from email.message import EmailMessage
 import smtplib
 import os
 import pdfkit
-TEMPLATE_MAP = {
-    "SCHOLARSHIP": "scholarship_bonafide.html",
-    "EDUCATIONAL_LOAN": "educational_loan_bonafide.html",
-    "INTERNSHIP": "internship_bonafide.html",
-    "GENERAL": "general_bonafide.html"
-}
-
-# -------------------------------
-# WKHTMLTOPDF CONFIG
-# -------------------------------
-from jinja2 import Environment, FileSystemLoader
-import pdfkit, os
-
-WKHTMLTOPDF_PATH = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH)
-
-def generate_bonafide_pdf(data):
-    env = Environment(loader=FileSystemLoader("templates"))
-
-    template_map = {
-        "internship": "internship_bonafide.html",
-        "education_loan": "education_loan_bonafide.html",
-        "scholarship": "scholarship_bonafide.html",
-        "general": "general_bonafide.html"
-    }
-
-    template_name = TEMPLATE_MAP.get(data["category"], "general_bonafide.html")
-    template = env.get_template(template_name)
-
-    html_content = template.render(**data)
-
-    os.makedirs("bonafides", exist_ok=True)
-    pdf_path = f"bonafides/bonafide_{data['request_id']}.pdf"
-
-    options = {
-        "page-size": "A4",
-        "encoding": "UTF-8",
-        "enable-local-file-access": "",
-        "quiet": ""
-    }
-
-    pdfkit.from_string(html_content, pdf_path, configuration=config, options=options)
-
-    return pdf_path
-
-
-# -------------------------------
-# EMAIL SENDER
-# -------------------------------
-def send_bonafide_email(to_email: str, pdf_path: str):
-    import smtplib, ssl
-    from email.message import EmailMessage
-
-    msg = EmailMessage()
-    msg["Subject"] = "Bonafide Certificate Approved"
-    msg["From"] = os.getenv("SENDER_MAIL")
-    msg["To"] = to_email
-    msg.set_content(
-        "Dear Student,\n\n"
-        "Your bonafide certificate has been approved.\n"
-        "Please find the attached PDF.\n\n"
-        "Regards,\nCollege Administration"
-    )
-
-    with open(pdf_path, "rb") as f:
-        msg.add_attachment(
-            f.read(),
-            maintype="application",
-            subtype="pdf",
-            filename="bonafide_certificate.pdf"
-        )
-
-    context = ssl.create_default_context()
-
-    with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as smtp:
-        smtp.login(os.getenv("SENDER_MAIL"), os.getenv("APP_PASSWORD"))
-        smtp.send_message(msg)
 
 
 
@@ -691,11 +633,7 @@ def apply_bonafide(
     reg_no = user["reg_no"]
 
     student = db.execute(
-        text("""
-            SELECT department, section, year_of_study
-            FROM students
-            WHERE reg_no = :reg_no
-        """),
+        st.BONAFIDE_APPLY_STUDENT,
         {"reg_no": reg_no}
     ).fetchone()
 
@@ -714,10 +652,10 @@ def apply_bonafide(
 
     # 🔽 HOD logic unchanged
     if year_of_study == 1:
-        hod = db.execute(text("SELECT hod_id FROM hods WHERE is_first_year = TRUE")).fetchone()
+        hod = db.execute(st.BONAFIDE_FIRST_YEAR_HOD).fetchone()
     else:
         hod = db.execute(
-            text("SELECT hod_id FROM hods WHERE department = :department AND is_first_year = FALSE"),
+            st.BONAFIDE_DEPT_HOD,
             {"department": department}
         ).fetchone()
 
@@ -732,11 +670,7 @@ def apply_bonafide(
             raise HTTPException(400, "Invalid date range")
 
     db.execute(
-        text("""
-            INSERT INTO bonafide_requests
-            (reg_no, hod_id, category, purpose, intern_start_date, intern_end_date, advisor_status, hod_status)
-            VALUES (:reg_no, :hod_id, :category, :purpose, :intern_start_date, :intern_end_date, 'PENDING', 'PENDING')
-        """),
+        st.BONAFIDE_INSERT,
         {
             "reg_no": reg_no,
             "hod_id": hod.hod_id,
@@ -764,28 +698,7 @@ def advisor_pending_bonafide(
     advisor_id = user.get("advisor_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                b.request_id,
-                s.name AS student_name,
-                s.reg_no,
-                s.department,
-                s.section,
-                s.year_of_study,
-                b.category,
-                b.purpose,
-                b.intern_start_date,
-                b.intern_end_date,
-                b.advisor_status
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no = b.reg_no
-            JOIN section_advisors sa
-              ON sa.advisor_id = :advisor_id
-             AND sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE b.advisor_status = 'PENDING'
-        """),
+        st.BONAFIDE_ADVISOR_PENDING,
         {"advisor_id": advisor_id}
     ).mappings().all()
 
@@ -809,14 +722,7 @@ def advisor_review(
         raise HTTPException(400, "Invalid status")
 
     result = db.execute(
-        text("""
-            UPDATE bonafide_requests
-            SET advisor_status = :status,
-                acted_advisor_id = :advisor_id,
-                advisor_reviewed_at = CURRENT_TIMESTAMP
-            WHERE request_id = :rid
-            AND advisor_status = 'PENDING'
-        """),
+        st.BONAFIDE_ADVISOR_REVIEW,
         {"status": review.status, "advisor_id": advisor_id, "rid": request_id}
     )
 
@@ -836,27 +742,7 @@ def advisor_bonafide_history(user=Depends(get_current_user), db: Session = Depen
     advisor_id = user.get("advisor_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                b.request_id,
-                s.name AS student_name,
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                b.category,
-                b.purpose,
-                b.advisor_status,
-                b.advisor_reviewed_at
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no = b.reg_no
-            JOIN section_advisors sa
-              ON sa.advisor_id = :advisor_id
-             AND sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE b.advisor_status <> 'PENDING'
-            ORDER BY b.advisor_reviewed_at DESC
-        """),
+        st.BONAFIDE_ADVISOR_HISTORY,
         {"advisor_id": advisor_id}
     ).mappings().all()
 
@@ -872,69 +758,12 @@ def hod_pending_bonafide(user=Depends(get_current_user), db: Session = Depends(g
     hod_id = user.get("hod_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                b.request_id,
-                s.name AS student_name,
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                b.category,
-                b.purpose,
-                b.advisor_status,
-                b.hod_status
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no = b.reg_no
-            WHERE b.hod_id = :hid
-            AND b.advisor_status = 'APPROVED'
-            AND b.hod_status = 'PENDING'
-        """),
+        st.BONAFIDE_HOD_PENDING,
         {"hid": hod_id}
     ).mappings().all()
 
     return result
 
-def fetch_bonafide_certificate_data(db: Session, request_id: int):
-    data = db.execute(text("""
-        SELECT
-            s.name,
-            s.reg_no,
-            s.department,
-            s.section,
-            s.year_of_study,
-            s.email,
-            s.gender,
-            s.residence_type,
-
-            b.request_id,
-            b.purpose,
-            b.category,
-            b.intern_start_date,
-            b.intern_end_date,
-            b.applied_at,
-            b.advisor_status,
-            b.hod_status
-
-        FROM bonafide_requests b
-        JOIN students s ON s.reg_no = b.reg_no
-        WHERE b.request_id = :rid
-    """), {"rid": request_id}).mappings().first()
-
-    if not data:
-        raise HTTPException(404, "Bonafide request not found")
-
-    data = dict(data)
-
-    # Derived fields
-    year_map = {1: "I", 2: "II", 3: "III", 4: "IV"}
-    data["year_roman"] = year_map.get(data["year_of_study"], "")
-    data["course"] = data["department"]
-    data["academic_year"] = f"{data['applied_at'].year}-{data['applied_at'].year + 1}"
-    data["logo_path"] = os.path.abspath("static/logo.jpg")
-
-    return data
-
-
 @app.get("/bonafide/certificate/{request_id}")
 def get_bonafide_certificate_data(
     request_id: int,
@@ -944,7 +773,7 @@ def get_bonafide_certificate_data(
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    data = fetch_bonafide_certificate_data(request_id, db)
+    data = fetch_bonafide_certificate_data(db, request_id)
 
     if not data:
         raise HTTPException(404, "Bonafide request not found")
@@ -952,6 +781,93 @@ def get_bonafide_certificate_data(
     return data
 
 
+# Issued PDFs only change if the template or the request data does, and
+# then their ETag changes with them
+DOCUMENT_MAX_AGE_SECONDS = int(os.getenv("DOCUMENT_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# Downloads go through short-lived signed links, so a PDF can be opened
+# or embedded without putting the session token in a URL. Expiry is
+# rounded up to the next DOCUMENT_LINK_TTL_SECONDS boundary (a link lives
+# between one and two TTLs): links minted close together are the same
+# URL, and the browser's cached copy of the PDF is reused.
+DOCUMENT_LINK_TTL_SECONDS = int(os.getenv("DOCUMENT_LINK_TTL_SECONDS", "300"))
+
+
+def document_link_signature(doc_type: str, doc_id: int, expires: int) -> str:
+    message = f"document-link:{doc_type}/{doc_id}/{expires}".encode("utf-8")
+    return hmac.new(SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+@app.get("/documents/{doc_type}/{doc_id}/link")
+def document_link(
+    doc_type: str,
+    doc_id: int,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    doc_type = doc_type.lower()
+    _, reg_no = load_document(db, doc_type, doc_id)
+
+    if not can_access_document(db, user, doc_type, doc_id, reg_no):
+        raise HTTPException(403, "Not allowed")
+
+    now = int(datetime.now().timestamp())
+    expires = (now // DOCUMENT_LINK_TTL_SECONDS + 2) * DOCUMENT_LINK_TTL_SECONDS
+    signature = document_link_signature(doc_type, doc_id, expires)
+
+    return {
+        "url": f"/documents/{doc_type}/{doc_id}.pdf?exp={expires}&sig={signature}",
+        "expires_at": datetime.fromtimestamp(expires).isoformat(),
+    }
+
+
+@app.get("/documents/{doc_type}/{doc_id}.pdf")
+def download_document(
+    doc_type: str,
+    doc_id: int,
+    request: Request,
+    exp: int = Query(...),
+    sig: str = Query(...),
+    db: Session = Depends(get_db)
+):
+    # Access was checked when the link was minted (document_link)
+    doc_type = doc_type.lower()
+    if exp < datetime.now().timestamp() or not hmac.compare_digest(
+        sig, document_link_signature(doc_type, doc_id, exp)
+    ):
+        raise HTTPException(403, "Download link invalid or expired")
+
+    doc, _ = load_document(db, doc_type, doc_id)
+
+    # Nothing below needs the database; don't hold a connection through
+    # a render
+    db.close()
+
+    stamp = Stamp(f'"{document_key(doc)}"', None)
+    cache_control = f"private, max-age={DOCUMENT_MAX_AGE_SECONDS}"
+    cached = not_modified("documents", request, None, stamp, cache_control)
+    if cached:
+        return cached
+
+    try:
+        pdf_path = render_document(doc)
+    except RendererBusy:
+        raise HTTPException(503, "Document renderer busy, try again shortly", headers={"Retry-After": "5"})
+    except RenderTimeout:
+        raise HTTPException(503, "Document took too long to render", headers={"Retry-After": "30"})
+    except RenderError:
+        raise HTTPException(500, "Document could not be rendered")
+
+    # FileResponse streams the file and answers Range requests
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename=doc.filename,
+        content_disposition_type="inline",
+        headers=validator_headers(stamp, cache_control),
+    )
+
+
 
 
 
@@ -965,31 +881,25 @@ def hod_review(request_id: int, review: BonafideReview, user=Depends(get_current
         raise HTTPException(400, "Invalid status")
 
     result = db.execute(
-        text("""
-            UPDATE bonafide_requests
-            SET hod_status = :status,
-                hod_reviewed_at = CURRENT_TIMESTAMP
-            WHERE request_id = :rid
-            AND advisor_status = 'APPROVED'
-            AND hod_status = 'PENDING'
-        """),
+        st.BONAFIDE_HOD_REVIEW,
         {"status": review.status, "rid": request_id}
     )
 
     if result.rowcount == 0:
         raise HTTPException(404, "Not eligible")
 
-    # PDF + mail logic unchanged
+    # PDF + mail: rendered and sent by the job worker once this commits
+    job_id = None
     if review.status == "APPROVED":
-        cert_data = fetch_bonafide_certificate_data(db,request_id)
-        pdf_path = generate_bonafide_pdf(cert_data)
-        send_bonafide_email(cert_data["email"], pdf_path)
+        job_id = enqueue(db, "bonafide.certificate", {"request_id": request_id}, "BONAFIDE", request_id)
 
     db.commit()
-    return {"message": f"HOD {review.status.lower()} successfully"}
+    return {"message": f"HOD {review.status.lower()} successfully", "job_id": job_id}
 
 @app.get("/bonafide/hod/history")
 def hod_bonafide_history(
+    response: Response,
+    page: Page = Depends(),
     user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -1000,30 +910,13 @@ def hod_bonafide_history(
     hod_id = user.get("hod_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                b.request_id,
-                s.name AS student_name,      -- 👤 Student name
-                s.reg_no,                    -- 🆔 Register number
-                s.department,
-                s.section,                   -- 🏫 Class section
-                s.year_of_study,             -- 🎓 Year
-                b.category,
-                b.purpose,
-                b.intern_start_date,
-                b.intern_end_date,
-                b.advisor_status,
-                b.hod_status,
-                b.hod_reviewed_at
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no = b.reg_no
-            WHERE b.hod_id = :hid
-            AND b.hod_status <> 'PENDING'      -- Only reviewed ones
-            ORDER BY b.hod_reviewed_at DESC
-        """),
-        {"hid": hod_id}
+        page.statement(st.BONAFIDE_HOD_HISTORY),
+        page.params(hid=hod_id)
     ).mappings().all()
 
+    result, next_cursor = page.cut(result, "hod_reviewed_at", "request_id")
+    set_next_cursor(response, next_cursor)
+
     return result
 
 
@@ -1031,128 +924,6 @@ def hod_bonafide_history(
 #--- Outpass Application Endpoints ---
 #-----------------------------------------------
 
-from jinja2 import Environment, FileSystemLoader
-from datetime import datetime
-import os
-import pdfkit
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
-PDF_DIR = os.path.join(BASE_DIR, "generated_pdfs")
-
-os.makedirs(PDF_DIR, exist_ok=True)
-
-env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
-
-def generate_outpass_pdf(outpass: dict):
-    template = env.get_template("hostel_outpass.html")
-
-    logo_fs_path = os.path.join(BASE_DIR, "static", "logo2.jpeg")
-    verified_fs_path = os.path.join(BASE_DIR, "static", "verified.jpeg")
-
-    logo_path = "file:///" + logo_fs_path.replace("\\", "/")
-    verified_path = "file:///" + verified_fs_path.replace("\\", "/")
-
-    html_content = template.render(
-        name=outpass["name"],
-        date=datetime.now().strftime("%d-%m-%Y"),
-        department=outpass["department"],
-        year_of_study=outpass["year_of_study"],
-        room_no=outpass["room_no"],
-        parent_mobile=outpass["parent_mobile"],
-        student_mobile=outpass["contact_number"],
-        purpose=outpass["purpose"],
-        out_date=outpass["out_date"],
-        in_date=outpass["in_date"],
-        out_time=outpass["out_time"],
-        in_time=outpass["in_time"],
-        logo_path=logo_path,
-        verified_path=verified_path
-    )
-
-    pdf_path = os.path.join(
-        PDF_DIR, f"outpass_{outpass['outpass_id']}.pdf"
-    )
-
-    options = {
-        "page-size": "A4",
-        "encoding": "UTF-8",
-        "enable-local-file-access": None
-    }
-
-    pdfkit.from_string(
-        html_content,
-        pdf_path,
-        configuration=config,
-        options=options
-    )
-
-    return pdf_path
-
-def generate_leave_pdf(outpass: dict) -> str:
-    """
-    Generates Leave PDF for multi-day hostel outpass
-    Returns absolute pdf path
-    """
-
-    template = env.get_template("hostel_leaveform.html")
-
-    # -------------------------------------------------
-    # FILE SYSTEM PATHS (wkhtmltopdf compatible)
-    # -------------------------------------------------
-    logo_fs_path = os.path.join(BASE_DIR, "static", "logo2.jpeg")
-    verified_fs_path = os.path.join(BASE_DIR, "static", "verified.jpeg")
-
-    logo_path = "file:///" + logo_fs_path.replace("\\", "/")
-    verified_path = "file:///" + verified_fs_path.replace("\\", "/")
-
-    # -------------------------------------------------
-    # RENDER HTML
-    # -------------------------------------------------
-    html_content = template.render(
-        name=outpass["name"],
-        department=outpass["department"],
-        year_of_study=outpass["year_of_study"],
-        room_no=outpass["room_no"],
-        parent_mobile=outpass["parent_mobile"],
-        student_mobile=outpass["contact_number"],
-        purpose=outpass["purpose"],
-        out_date=outpass["out_date"],
-        in_date=outpass["in_date"],
-        out_time=outpass["out_time"],
-        in_time=outpass["in_time"],
-        logo_path=logo_path,
-        verified_path=verified_path
-    )
-
-    # -------------------------------------------------
-    # PDF OUTPUT PATH
-    # -------------------------------------------------
-    pdf_path = os.path.join(
-        PDF_DIR, f"leave_{outpass['outpass_id']}.pdf"
-    )
-
-    # -------------------------------------------------
-    # PDF OPTIONS
-    # -------------------------------------------------
-    options = {
-        "page-size": "A4",
-        "encoding": "UTF-8",
-        "enable-local-file-access": None
-    }
-
-    # -------------------------------------------------
-    # GENERATE PDF
-    # -------------------------------------------------
-    pdfkit.from_string(
-        html_content,
-        pdf_path,
-        configuration=config,
-        options=options
-    )
-
-    return pdf_path
-
 @app.post("/outpass/apply")
 def apply_outpass(
     data: OutpassApply,
@@ -1170,12 +941,7 @@ def apply_outpass(
     # FETCH STUDENT
     # ----------------------------
     student = db.execute(
-        text("""
-            SELECT department, section, year_of_study,
-                   residence_type, email
-            FROM students
-            WHERE reg_no = :reg_no
-        """),
+        st.OUTPASS_APPLY_STUDENT,
         {"reg_no": reg_no}
     ).fetchone()
 
@@ -1226,37 +992,6 @@ def apply_outpass(
     else:
         days = 1
 
-    # ----------------------------
-    # ISSUE 4: OVERLAP CHECK
-    # ----------------------------
-    overlap = db.execute(
-        text("""
-            SELECT 1
-            FROM outpass_requests
-            WHERE reg_no = :reg_no
-              AND (
-                    advisor_status IN ('PENDING','APPROVED')
-                 OR hod_status     IN ('PENDING','APPROVED')
-                 OR warden_status  IN ('PENDING','APPROVED')
-              )
-              AND (
-                    out_date <= :new_in_date
-                AND COALESCE(in_date, out_date) >= :new_out_date
-              )
-        """),
-        {
-            "reg_no": reg_no,
-            "new_out_date": data.out_date,
-            "new_in_date": data.in_date or data.out_date
-        }
-    ).first()
-
-    if overlap:
-        raise HTTPException(
-            status_code=409,
-            detail="Outpass already exists for the selected dates"
-        )
-
     # ----------------------------
     # DAY SCHOLAR RULES
     # ----------------------------
@@ -1311,37 +1046,27 @@ def apply_outpass(
     # ----------------------------
     # INSERT OUTPASS
     # ----------------------------
-    db.execute(
-        text("""
-            INSERT INTO outpass_requests (
-                reg_no, year_of_study,
-                out_date, out_time,
-                in_date, in_time,
-                purpose,
-                contact_number,
-                parent_mobile,
-                hostel_id, floor_id, room_no,
-                advisor_status, hod_status, warden_status
-            )
-            VALUES (
-                :reg_no, :year_of_study,
-                :out_date, :out_time,
-                :in_date, :in_time,
-                :purpose,
-                :contact_number,
-                :parent_mobile,
-                :hostel_id, :floor_id, :room_no,
-                'PENDING','PENDING','PENDING'
-            )
-        """),
-        {
-            **data.dict(),
-            "reg_no": reg_no,
-            "year_of_study": student.year_of_study
-        }
-    )
+    # ISSUE 4: overlapping active outpasses are rejected by the insert
+    # itself (outpass_requests_no_overlap, migrations/0011_request_date_ranges.sql)
+    try:
+        db.execute(
+            st.OUTPASS_INSERT,
+            {
+                **data.dict(),
+                "reg_no": reg_no,
+                "year_of_study": student.year_of_study
+            }
+        )
 
-    db.commit()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if violates(e, "outpass_requests_no_overlap"):
+            raise HTTPException(
+                status_code=409,
+                detail="Outpass already exists for the selected dates"
+            )
+        raise
 
     return {
         "message": "Outpass submitted successfully",
@@ -1362,30 +1087,7 @@ def advisor_pending_outpass(
     advisor_id = user.get("advisor_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                o.outpass_id,
-                s.name AS student_name,
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                s.residence_type,
-                o.out_date,
-                o.out_time,
-                o.in_date,
-                o.in_time,
-                o.purpose,
-                o.contact_number
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            JOIN section_advisors sa
-              ON sa.advisor_id = :advisor_id
-             AND sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE o.advisor_status = 'PENDING'
-            ORDER BY o.outpass_id DESC
-        """),
+        st.OUTPASS_ADVISOR_PENDING,
         {"advisor_id": advisor_id}
     ).mappings().all()
 
@@ -1410,13 +1112,7 @@ def advisor_review_outpass(
 
     # 1️⃣ UPDATE ADVISOR STATUS (same logic)
     result = db.execute(
-        text("""
-            UPDATE outpass_requests
-            SET advisor_status = :status,
-                acted_advisor_id = :advisor_id
-            WHERE outpass_id = :oid
-            AND advisor_status = 'PENDING'
-        """),
+        st.OUTPASS_ADVISOR_REVIEW,
         {
             "status": review.status,
             "advisor_id": advisor_id,
@@ -1427,36 +1123,32 @@ def advisor_review_outpass(
     if result.rowcount == 0:
         raise HTTPException(409, "Already reviewed by another advisor")
 
-    db.commit()  # same flow
-
     # 2️⃣ FETCH STUDENT EMAIL (unchanged logic)
     outpass = db.execute(
-        text("""
-            SELECT o.out_date, s.email
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.outpass_id = :oid
-        """),
+        st.OUTPASS_ADVISOR_REVIEW_MAIL,
         {"oid": outpass_id}
     ).mappings().first()
 
     if not outpass:
         raise HTTPException(404, "Outpass not found")
 
-    # 3️⃣ MAIL ONLY IF REJECTED (same)
+    # 3️⃣ MAIL ONLY IF REJECTED (same), queued with the status change
+    job_id = None
     if review.status == "REJECTED":
-        send_mail_with_pdfs(
-            to_email=outpass["email"],
-            subject="Outpass Rejected",
-            body=(
+        job_id = enqueue_job(db, mail_job(
+            outpass["email"],
+            "Outpass Rejected",
+            (
                 f"Your outpass request has been rejected by Advisor.\n\n"
                 f"Outpass ID : {outpass_id}\n"
                 f"Date       : {outpass['out_date']}"
             ),
-            pdf_paths=[]
-        )
+            "OUTPASS", outpass_id
+        ))
 
-    return {"message": f"Advisor {review.status.lower()} successfully"}
+    db.commit()
+
+    return {"message": f"Advisor {review.status.lower()} successfully", "job_id": job_id}
 
 @app.get("/outpass/hod/pending")
 def hod_pending_outpass(
@@ -1470,25 +1162,7 @@ def hod_pending_outpass(
     hod_id = user.get("hod_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                o.outpass_id,
-                s.name AS student_name,   -- 👤 clearer naming
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                s.residence_type,
-                o.out_date,
-                o.out_time,
-                o.purpose
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            JOIN hods h ON h.department = s.department
-            WHERE h.hod_id = :hod_id
-              AND o.advisor_status = 'APPROVED'
-              AND o.hod_status = 'PENDING'
-            ORDER BY o.outpass_id DESC
-        """),
+        st.OUTPASS_HOD_PENDING,
         {"hod_id": hod_id}
     ).mappings().all()
 
@@ -1512,72 +1186,40 @@ def hod_review_outpass(
 
     # 1️⃣ UPDATE HOD STATUS (DB FIRST) — SAME LOGIC
     result = db.execute(
-        text("""
-            UPDATE outpass_requests
-            SET hod_status = :status,
-                acted_hod_id = :hid
-            WHERE outpass_id = :oid
-            AND advisor_status = 'APPROVED'
-            AND hod_status = 'PENDING'
-        """),
+        st.OUTPASS_HOD_REVIEW,
         {"status": review.status, "hid": hod_id, "oid": outpass_id}
     )
 
     if result.rowcount == 0:
         raise HTTPException(409, "Not eligible for HOD review")
 
-    db.commit()  # ✅ commit immediately (same as yours)
-
     # 2️⃣ FETCH OUTPASS + STUDENT (UNCHANGED)
-    outpass = db.execute(
-        text("""
-            SELECT
-                o.*,
-                s.name,
-                s.department,
-                s.year_of_study,
-                s.residence_type,
-                s.email
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.outpass_id = :oid
-        """),
-        {"oid": outpass_id}
-    ).mappings().first()
+    outpass = db.execute(st.OUTPASS_DOCUMENT, {"oid": outpass_id}).mappings().first()
+
+    # PDFs and mails are queued with the status change and sent by the
+    # job worker once it commits
+    job_id = None
 
     # 3️⃣ DAY SCHOLAR → FINAL (PDF + MAIL) — SAME
     if review.status == "APPROVED" and outpass["residence_type"] == "DAY_SCHOLAR":
-        try:
-            outpass_pdf = generate_outpass_pdf(outpass)
-
-            send_mail_with_pdfs(
-                to_email=outpass["email"],
-                subject="Outpass Approved",
-                body=(
-                    f"Your outpass request has been approved.\n\n"
-                    f"Outpass ID : {outpass_id}\n"
-                    f"Date       : {outpass['out_date']}\n"
-                    f"Time       : {outpass['out_time']}"
-                ),
-                pdf_paths=[outpass_pdf]
-            )
-        except Exception as e:
-            print("HOD mail/pdf error:", e)
+        job_id = enqueue(db, "outpass.approved", {"outpass_id": outpass_id, "by": "hod"}, "OUTPASS", outpass_id)
 
     # 4️⃣ REJECTION MAIL — SAME
     if review.status == "REJECTED":
-        send_mail_with_pdfs(
-            to_email=outpass["email"],
-            subject="Outpass Rejected",
-            body=(
+        job_id = enqueue_job(db, mail_job(
+            outpass["email"],
+            "Outpass Rejected",
+            (
                 f"Your outpass request has been rejected by HOD.\n\n"
                 f"Outpass ID : {outpass_id}\n"
                 f"Date: {outpass['out_date']}"
             ),
-            pdf_paths=[]
-        )
+            "OUTPASS", outpass_id
+        ))
 
-    return {"message": f"HOD {review.status.lower()} successfully"}
+    db.commit()
+
+    return {"message": f"HOD {review.status.lower()} successfully", "job_id": job_id}
 
 
 @app.get("/outpass/warden/pending")
@@ -1593,27 +1235,7 @@ def warden_pending_outpass(
     print("WARDEN ID:", warden_id)
 
     result = db.execute(
-        text("""
-            SELECT
-                o.outpass_id,
-                s.name AS student_name,   -- 👤 added
-                s.reg_no,
-                s.year_of_study,
-                s.section,
-                o.out_date,
-                o.out_time,
-                o.in_date,
-                o.in_time,
-                o.room_no,
-                o.purpose
-            FROM outpass_requests o
-            JOIN hostel_floors hf ON hf.floor_id = o.floor_id
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE hf.warden_id = :warden_id
-              AND UPPER(o.hod_status) = 'APPROVED'
-              AND COALESCE(o.warden_status, 'PENDING') = 'PENDING'
-            ORDER BY o.outpass_id DESC
-        """),
+        st.OUTPASS_WARDEN_PENDING,
         {"warden_id": warden_id}
     ).mappings().all()
 
@@ -1640,14 +1262,7 @@ def warden_review_outpass(
     # 1️⃣ UPDATE STATUS FIRST (UNCHANGED LOGIC)
     # -------------------------------------------------
     result = db.execute(
-        text("""
-            UPDATE outpass_requests
-            SET warden_status = :status,
-                acted_warden_id = :wid
-            WHERE outpass_id = :oid
-            AND hod_status = 'APPROVED'
-            AND warden_status = 'PENDING'
-        """),
+        st.OUTPASS_WARDEN_REVIEW,
         {
             "status": review.status,
             "wid": warden_id,
@@ -1658,76 +1273,30 @@ def warden_review_outpass(
     if result.rowcount == 0:
         raise HTTPException(409, "Not eligible for warden review")
 
-    db.commit()  # ✅ same as your flow
-
-    # -------------------------------------------------
-    # 2️⃣ FETCH OUTPASS + STUDENT DATA (UNCHANGED)
-    # -------------------------------------------------
-    outpass = db.execute(
-        text("""
-            SELECT
-                o.*,
-                s.name,
-                s.department,
-                s.year_of_study,
-                s.email
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.outpass_id = :oid
-        """),
-        {"oid": outpass_id}
-    ).mappings().first()
-
-    # -------------------------------------------------
-    # 3️⃣ CALCULATE DAYS (UNCHANGED)
-    # -------------------------------------------------
-    if outpass["in_date"]:
-        days = (outpass["in_date"] - outpass["out_date"]).days + 1
-    else:
-        days = 1
-
     # -------------------------------------------------
-    # 4️⃣ GENERATE PDFs + SEND MAIL (UNCHANGED)
+    # 2️⃣ QUEUE PDFs + MAIL (sent by the job worker once this commits;
+    #    it also works out whether a leave form is needed)
     # -------------------------------------------------
     if review.status == "APPROVED":
-        try:
-            pdfs = []
-
-            outpass_pdf = generate_outpass_pdf(outpass)
-            pdfs.append(outpass_pdf)
-
-            if days > 1:
-                leave_pdf = generate_leave_pdf(outpass)
-                pdfs.append(leave_pdf)
-
-            send_mail_with_pdfs(
-                to_email=outpass["email"],
-                subject="Outpass Approved" if days == 1 else "Outpass & Leave Approved",
-                body=(
-                    f"Your request has been approved.\n\n"
-                    f"Outpass ID : {outpass_id}\n"
-                    f"From Date  : {outpass['out_date']}\n"
-                    f"To Date    : {outpass['in_date']}"
-                ),
-                pdf_paths=pdfs
-            )
-
-        except Exception as e:
-            print("PDF / Mail error:", e)
+        job_id = enqueue(db, "outpass.approved", {"outpass_id": outpass_id, "by": "warden"}, "OUTPASS", outpass_id)
 
     if review.status == "REJECTED":
-        send_mail_with_pdfs(
-            to_email=outpass["email"],
-            subject="Outpass Rejected",
-            body=(
+        outpass = db.execute(st.OUTPASS_DOCUMENT, {"oid": outpass_id}).mappings().first()
+
+        job_id = enqueue_job(db, mail_job(
+            outpass["email"],
+            "Outpass Rejected",
+            (
                 f"Your outpass request has been rejected by Warden.\n\n"
                 f"Outpass ID : {outpass_id}\n"
                 f"Date: {outpass['out_date']}"
             ),
-            pdf_paths=[]
-        )
+            "OUTPASS", outpass_id
+        ))
 
-    return {"message": f"Warden {review.status.lower()} successfully"}
+    db.commit()
+
+    return {"message": f"Warden {review.status.lower()} successfully", "job_id": job_id}
 
 
 
@@ -1790,11 +1359,7 @@ def apply_od(
 
     # 1️⃣ Fetch student
     student = db.execute(
-        text("""
-            SELECT department, year_of_study
-            FROM students
-            WHERE reg_no = :reg_no
-        """),
+        st.OD_APPLY_STUDENT,
         {"reg_no": reg_no}
     ).fetchone()
 
@@ -1823,21 +1388,7 @@ def apply_od(
 
     # 6️⃣ Insert OD request
     result = db.execute(
-        text("""
-            INSERT INTO od_requests (
-                reg_no, from_date, to_date,
-                start_time, end_time,
-                purpose, place,
-                advisor_status, hod_status
-            )
-            VALUES (
-                :reg_no, :from_date, :to_date,
-                :start_time, :end_time,
-                :purpose, :place,
-                'PENDING', 'PENDING'
-            )
-            RETURNING od_id
-        """),
+        st.OD_INSERT,
         {
             "reg_no": reg_no,
             "from_date": data.from_date,
@@ -1862,10 +1413,7 @@ def apply_od(
             f.write(file.file.read())
 
         db.execute(
-            text("""
-                INSERT INTO od_proofs (od_id, file_path)
-                VALUES (:od_id, :file_path)
-            """),
+            st.OD_PROOF_INSERT,
             {"od_id": od_id, "file_path": file_path}
         )
 
@@ -1889,29 +1437,7 @@ def advisor_pending_od(
     advisor_id = user.get("advisor_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                o.od_id,
-                s.name AS student_name,
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                o.from_date,
-                o.to_date,
-                o.start_time,
-                o.end_time,
-                o.purpose,
-                o.place
-            FROM od_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            JOIN section_advisors sa
-              ON sa.advisor_id = :advisor_id
-             AND sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE o.advisor_status = 'PENDING'
-            ORDER BY o.od_id DESC
-        """),
+        st.OD_ADVISOR_PENDING,
         {"advisor_id": advisor_id}
     ).mappings().all()
 
@@ -1936,14 +1462,7 @@ def advisor_review_od(
 
     # 1️⃣ UPDATE STATUS (same logic)
     result = db.execute(
-        text("""
-            UPDATE od_requests
-            SET advisor_status = :status,
-                acted_advisor_id = :advisor_id,   -- stored securely
-                advisor_reviewed_at = CURRENT_TIMESTAMP
-            WHERE od_id = :oid
-              AND advisor_status = 'PENDING'
-        """),
+        st.OD_ADVISOR_REVIEW,
         {
             "status": review.status,
             "advisor_id": advisor_id,
@@ -1953,30 +1472,27 @@ def advisor_review_od(
 
     # 2️⃣ Fetch student email (unchanged)
     od = db.execute(
-        text("""
-            SELECT s.email
-            FROM od_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.od_id = :oid
-        """),
+        st.OD_ADVISOR_REVIEW_MAIL,
         {"oid": od_id}
     ).mappings().first()
 
-    # 3️⃣ Send mail ONLY if advisor rejects (same behavior)
-    if review.status == "REJECTED":
-        send_mail_with_pdfs(
-            to_email=od["email"],
-            subject="OD Rejected by Advisor",
-            body="Your OD request has been rejected by your advisor.",
-            pdf_paths=[]
-        )
-
     if result.rowcount == 0:
         raise HTTPException(409, "Already reviewed")
 
+    # 3️⃣ Send mail ONLY if advisor rejects (same behavior), via the job
+    #    worker once this commits
+    job_id = None
+    if review.status == "REJECTED":
+        job_id = enqueue_job(db, mail_job(
+            od["email"],
+            "OD Rejected by Advisor",
+            "Your OD request has been rejected by your advisor.",
+            "OD", od_id
+        ))
+
     db.commit()
 
-    return {"message": f"Advisor {review.status.lower()} OD"}
+    return {"message": f"Advisor {review.status.lower()} OD", "job_id": job_id}
 
 
 @app.get("/od/hod/pending")
@@ -1991,27 +1507,7 @@ def hod_pending_od(
     hod_id = user.get("hod_id")
 
     result = db.execute(
-        text("""
-            SELECT
-                o.od_id,
-                s.name AS student_name,   -- 👤 Added
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                o.from_date,
-                o.to_date,
-                o.start_time,
-                o.end_time,
-                o.purpose,
-                o.place
-            FROM od_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            JOIN hods h ON h.department = s.department
-            WHERE h.hod_id = :hid
-              AND o.advisor_status = 'APPROVED'
-              AND o.hod_status = 'PENDING'
-            ORDER BY o.od_id DESC
-        """),
+        st.OD_HOD_PENDING,
         {"hid": hod_id}
     ).mappings().all()
 
@@ -2035,16 +1531,7 @@ def hod_review_od(
 
     # 1️⃣ UPDATE OD STATUS (UNCHANGED LOGIC)
     result = db.execute(
-        text("""
-            UPDATE od_requests
-            SET hod_status = :status,
-                hod_remark = :remark,
-                acted_hod_id = :hod_id,              -- stored securely
-                hod_reviewed_at = CURRENT_TIMESTAMP
-            WHERE od_id = :oid
-              AND advisor_status = 'APPROVED'
-              AND hod_status = 'PENDING'
-        """),
+        st.OD_HOD_REVIEW,
         {
             "status": review.status,
             "remark": review.remark,
@@ -2058,29 +1545,24 @@ def hod_review_od(
 
     # 2️⃣ FETCH STUDENT EMAIL (UNCHANGED)
     od = db.execute(
-        text("""
-            SELECT s.email
-            FROM od_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.od_id = :oid
-        """),
+        st.OD_HOD_REVIEW_MAIL,
         {"oid": od_id}
     ).mappings().first()
 
-    # 3️⃣ FINAL MAIL (UNCHANGED BEHAVIOR)
-    send_mail_with_pdfs(
-        to_email=od["email"],
-        subject=f"OD {review.status}",
-        body=(
+    # 3️⃣ FINAL MAIL (UNCHANGED BEHAVIOR), via the job worker once this commits
+    job_id = enqueue_job(db, mail_job(
+        od["email"],
+        f"OD {review.status}",
+        (
             f"Your OD request has been {review.status.lower()}."
             + (f"\n\nRemark: {review.remark}" if review.remark else "")
         ),
-        pdf_paths=[]
-    )
+        "OD", od_id
+    ))
 
     db.commit()
 
-    return {"message": f"HOD {review.status.lower()} OD"}
+    return {"message": f"HOD {review.status.lower()} OD", "job_id": job_id}
 
 
 #-----------------------------------------------
@@ -2208,11 +1690,7 @@ def create_complaint(
     # INSERT INTO DATABASE (UNCHANGED)
     # ------------------------
     db.execute(
-        text("""
-            INSERT INTO complaints
-            (reg_no, complaint_text, department, attachment_path, attachment_name)
-            VALUES (:reg_no, :text, :dept, :path, :name)
-        """),
+        st.COMPLAINT_INSERT,
         {
             "reg_no": reg_no,        # 🔐 secure
             "text": complaint_text,
@@ -2232,6 +1710,8 @@ def create_complaint(
 
 @app.get("/dept/complaints")
 def get_department_complaints(
+    response: Response,
+    page: Page = Depends(),
     user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -2239,52 +1719,66 @@ def get_department_complaints(
     if user["role"].lower() != "incharge":
         raise HTTPException(403, "Only department in‑charge allowed")
 
-    incharge_id = user.get("incharge_id")
+    # 1️⃣ Department for this in‑charge comes from token claims
+    department = user.get("department") if user.get("incharge_id") else None
 
-    # 1️⃣ Find department for this in‑charge (same logic)
-    incharge = db.execute(
-        text("""
-            SELECT department
-            FROM department_incharges
-            WHERE incharge_id = :id
-        """),
-        {"id": incharge_id}
-    ).mappings().first()
-
-    if not incharge:
+    if not department:
         raise HTTPException(404, "Department in‑charge not found")
 
-    department = incharge["department"]
-
     # 2️⃣ Fetch complaints (added student info)
     complaints = db.execute(
-        text("""
-            SELECT
-                c.complaint_id,
-                s.name AS student_name,
-                s.reg_no,
-                s.section,
-                s.year_of_study,
-                c.complaint_text,
-                c.department,
-                c.status,
-                c.attachment_name,
-                c.created_at
-            FROM complaints c
-            JOIN students s ON s.reg_no = c.reg_no
-            WHERE c.department = :dept
-            ORDER BY c.created_at DESC
-        """),
-        {"dept": department}
+        page.statement(st.COMPLAINT_DEPT_PAGE),
+        page.params(dept=department)
     ).mappings().all()
 
+    complaints, next_cursor = page.cut(complaints, "created_at", "complaint_id")
+    set_next_cursor(response, next_cursor)
+
+    total = db.execute(
+        st.COMPLAINT_DEPT_COUNT,
+        {"dept": department}
+    ).scalar()
+
     return {
         "department": department,
-        "total": len(complaints),
+        "total": total,
+        "next_cursor": next_cursor,
         "complaints": complaints
     }
 
 
+@app.get("/dept/complaints/export")
+def export_department_complaints(
+    request: Request,
+    format: str = "csv",
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    status: Optional[str] = None,
+    user=Depends(get_current_user)
+):
+    # 🔐 Only department in‑charge allowed
+    if user["role"].lower() != "incharge":
+        raise HTTPException(403, "Only department in‑charge allowed")
+
+    department = user.get("department") if user.get("incharge_id") else None
+
+    if not department:
+        raise HTTPException(404, "Department in‑charge not found")
+
+    status = status.upper() if status else None
+
+    if status and status not in {"OPEN", "IN_PROGRESS", "RESOLVED"}:
+        raise HTTPException(400, "Invalid status")
+
+    return export_response(
+        read_engine(request.state),
+        st.DEPT_COMPLAINTS_EXPORT,
+        {"dept": department, "status": status, "from_date": from_date, "to_date": to_date},
+        format,
+        f"complaints-{department}",
+    )
+
+
 @app.put("/dept/complaints/update/{complaint_id}")
 def update_complaint_status(
     complaint_id: int,
@@ -2296,37 +1790,24 @@ def update_complaint_status(
     if user["role"].lower() != "incharge":
         raise HTTPException(403, "Only department in‑charge allowed")
 
-    incharge_id = user.get("incharge_id")
     status = status.upper()
 
     if status not in {"OPEN", "IN_PROGRESS", "RESOLVED"}:
         raise HTTPException(400, "Invalid status")
 
-    # 1️⃣ Get in‑charge department (same logic)
-    incharge = db.execute(
-        text("""
-            SELECT department
-            FROM department_incharges
-            WHERE incharge_id = :id
-        """),
-        {"id": incharge_id}
-    ).mappings().first()
+    # 1️⃣ In‑charge department from token claims
+    department = user.get("department") if user.get("incharge_id") else None
 
-    if not incharge:
+    if not department:
         raise HTTPException(404, "In‑charge not found")
 
     # 2️⃣ Update only if complaint belongs to same department (UNCHANGED)
     result = db.execute(
-        text("""
-            UPDATE complaints
-            SET status = :status
-            WHERE complaint_id = :cid
-              AND department = :dept
-        """),
+        st.COMPLAINT_STATUS_UPDATE,
         {
             "status": status,
             "cid": complaint_id,
-            "dept": incharge["department"]
+            "dept": department
         }
     )
 
@@ -2358,45 +1839,7 @@ def get_recent_requests(
 
     reg_no = user["reg_no"]
 
-    query = text("""
-        SELECT leave_id AS id, 'LEAVE' AS type, applied_at AS created_at, status
-        FROM leave_requests WHERE reg_no=:reg_no
-
-        UNION ALL
-
-        SELECT request_id AS id, 'BONAFIDE', applied_at,
-               CASE
-                   WHEN advisor_status='REJECTED' OR hod_status='REJECTED' THEN 'REJECTED'
-                   WHEN advisor_status='APPROVED' AND hod_status='APPROVED' THEN 'APPROVED'
-                   ELSE 'PENDING'
-               END
-        FROM bonafide_requests WHERE reg_no=:reg_no
-
-        UNION ALL
-
-        SELECT outpass_id AS id, 'OUTPASS', created_at,
-               CASE
-                   WHEN advisor_status='REJECTED' OR hod_status='REJECTED' OR warden_status='REJECTED' THEN 'REJECTED'
-                   WHEN advisor_status='APPROVED' AND hod_status='APPROVED' AND warden_status='APPROVED' THEN 'APPROVED'
-                   ELSE 'PENDING'
-               END
-        FROM outpass_requests WHERE reg_no=:reg_no
-
-        UNION ALL
-
-        SELECT od_id AS id, 'OD', created_at,
-               CASE
-                   WHEN advisor_status='REJECTED' OR hod_status='REJECTED' THEN 'REJECTED'
-                   WHEN advisor_status='APPROVED' AND hod_status='APPROVED' THEN 'APPROVED'
-                   ELSE 'PENDING'
-               END
-        FROM od_requests WHERE reg_no=:reg_no
-
-        ORDER BY created_at DESC
-        LIMIT :limit
-    """)
-
-    rows = db.execute(query, {"reg_no": reg_no, "limit": limit}).fetchall()
+    rows = db.execute(st.STUDENT_FEED_RECENT, {"reg_no": reg_no, "limit": limit}).fetchall()
 
     return [
         {
@@ -2417,80 +1860,7 @@ def get_dashboard_stats(
     # 🔥 JWT returns dict, not object
     reg_no = current_user["reg_no"]
 
-    query = text("""
-        SELECT
-            SUM(total)    AS total,
-            SUM(pending)  AS pending,
-            SUM(approved) AS approved,
-            SUM(rejected) AS rejected
-        FROM (
-
-            -- LEAVE (single status column)
-            SELECT COUNT(*) AS total,
-                   COUNT(*) FILTER (WHERE status='PENDING')  AS pending,
-                   COUNT(*) FILTER (WHERE status='APPROVED') AS approved,
-                   COUNT(*) FILTER (WHERE status='REJECTED') AS rejected
-            FROM leave_requests
-            WHERE reg_no = :reg_no
-
-            UNION ALL
-
-            -- BONAFIDE (advisor + HOD)
-            SELECT COUNT(*),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='PENDING' OR hod_status='PENDING'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='APPROVED' AND hod_status='APPROVED'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='REJECTED' OR hod_status='REJECTED'
-                   )
-            FROM bonafide_requests
-            WHERE reg_no = :reg_no
-
-            UNION ALL
-
-            -- OUTPASS (advisor + HOD + warden)
-            SELECT COUNT(*),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='PENDING'
-                          OR hod_status='PENDING'
-                          OR warden_status='PENDING'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='APPROVED'
-                          AND hod_status='APPROVED'
-                          AND warden_status='APPROVED'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='REJECTED'
-                          OR hod_status='REJECTED'
-                          OR warden_status='REJECTED'
-                   )
-            FROM outpass_requests
-            WHERE reg_no = :reg_no
-
-            UNION ALL
-
-            -- OD (advisor + HOD)
-            SELECT COUNT(*),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='PENDING' OR hod_status='PENDING'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='APPROVED' AND hod_status='APPROVED'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='REJECTED' OR hod_status='REJECTED'
-                   )
-            FROM od_requests
-            WHERE reg_no = :reg_no
-
-        ) t
-    """)
-
-    result = db.execute(query, {"reg_no": reg_no}).fetchone()
+    result = db.execute(st.STUDENT_STATS, {"reg_no": reg_no}).fetchone()
 
     return {
         "pending": result.pending or 0,
@@ -2503,7 +1873,7 @@ def get_dashboard_stats(
 @app.get("/student/dashboard-stats")
 def get_dashboard_stats(
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     # 🔐 Only students
     if user["role"].lower() != "student":
@@ -2511,80 +1881,7 @@ def get_dashboard_stats(
 
     reg_no = user["reg_no"]
 
-    query = text("""
-        SELECT
-            SUM(total)    AS total,
-            SUM(pending)  AS pending,
-            SUM(approved) AS approved,
-            SUM(rejected) AS rejected
-        FROM (
-
-            -- LEAVE (single status column)
-            SELECT COUNT(*) AS total,
-                   COUNT(*) FILTER (WHERE status='PENDING')  AS pending,
-                   COUNT(*) FILTER (WHERE status='APPROVED') AS approved,
-                   COUNT(*) FILTER (WHERE status='REJECTED') AS rejected
-            FROM leave_requests
-            WHERE reg_no = :reg_no
-
-            UNION ALL
-
-            -- BONAFIDE (advisor + HOD)
-            SELECT COUNT(*),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='PENDING' OR hod_status='PENDING'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='APPROVED' AND hod_status='APPROVED'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='REJECTED' OR hod_status='REJECTED'
-                   )
-            FROM bonafide_requests
-            WHERE reg_no = :reg_no
-
-            UNION ALL
-
-            -- OUTPASS (advisor + HOD + warden)
-            SELECT COUNT(*),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='PENDING'
-                          OR hod_status='PENDING'
-                          OR warden_status='PENDING'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='APPROVED'
-                          AND hod_status='APPROVED'
-                          AND warden_status='APPROVED'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='REJECTED'
-                          OR hod_status='REJECTED'
-                          OR warden_status='REJECTED'
-                   )
-            FROM outpass_requests
-            WHERE reg_no = :reg_no
-
-            UNION ALL
-
-            -- OD (advisor + HOD)
-            SELECT COUNT(*),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='PENDING' OR hod_status='PENDING'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='APPROVED' AND hod_status='APPROVED'
-                   ),
-                   COUNT(*) FILTER (
-                       WHERE advisor_status='REJECTED' OR hod_status='REJECTED'
-                   )
-            FROM od_requests
-            WHERE reg_no = :reg_no
-
-        ) t
-    """)
-
-    result = db.execute(query, {"reg_no": reg_no}).fetchone()
+    result = db.execute(st.STUDENT_STATS, {"reg_no": reg_no}).fetchone()
 
     return {
         "pending": result.pending or 0,
@@ -2596,8 +1893,10 @@ def get_dashboard_stats(
 
 @app.get("/student/requests")
 def get_all_student_requests(
+    response: Response,
+    page: Page = Depends(),
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     # 🔐 Only students
     if user["role"].lower() != "student":
@@ -2605,51 +1904,19 @@ def get_all_student_requests(
 
     reg_no = user["reg_no"]
 
-    query = text("""
-        SELECT leave_id AS id, 'LEAVE' AS type, applied_at AS created_at, status
-        FROM leave_requests WHERE reg_no=:reg_no
-
-        UNION ALL
-
-        SELECT request_id AS id, 'BONAFIDE', applied_at,
-               CASE
-                   WHEN advisor_status='REJECTED' OR hod_status='REJECTED' THEN 'REJECTED'
-                   WHEN advisor_status='APPROVED' AND hod_status='APPROVED' THEN 'APPROVED'
-                   ELSE 'PENDING'
-               END
-        FROM bonafide_requests WHERE reg_no=:reg_no
-
-        UNION ALL
-
-        SELECT outpass_id AS id, 'OUTPASS', created_at,
-               CASE
-                   WHEN advisor_status='REJECTED' OR hod_status='REJECTED' OR warden_status='REJECTED' THEN 'REJECTED'
-                   WHEN advisor_status='APPROVED' AND hod_status='APPROVED' AND warden_status='APPROVED' THEN 'APPROVED'
-                   ELSE 'PENDING'
-               END
-        FROM outpass_requests WHERE reg_no=:reg_no
-
-        UNION ALL
-
-        SELECT od_id AS id, 'OD', created_at,
-               CASE
-                   WHEN advisor_status='REJECTED' OR hod_status='REJECTED' THEN 'REJECTED'
-                   WHEN advisor_status='APPROVED' AND hod_status='APPROVED' THEN 'APPROVED'
-                   ELSE 'PENDING'
-               END
-        FROM od_requests WHERE reg_no=:reg_no
-
-        ORDER BY created_at DESC
-    """)
+    rows = db.execute(
+        page.statement(st.STUDENT_FEED_PAGE), page.params(reg_no=reg_no)
+    ).mappings().all()
 
-    rows = db.execute(query, {"reg_no": reg_no}).fetchall()
+    rows, next_cursor = page.cut(rows, "created_at", "type", "id")
+    set_next_cursor(response, next_cursor)
 
     return [
         {
-            "id": r.id,
-            "type": r.type,
-            "created_at": r.created_at,
-            "status": r.status
+            "id": r["id"],
+            "type": r["type"],
+            "created_at": r["created_at"],
+            "status": r["status"]
         }
         for r in rows
     ]
@@ -2662,47 +1929,7 @@ def get_all_requests(
 ):
     reg_no = current_user["reg_no"]
 
-    query = text("""
-        SELECT leave_id AS id,
-       'LEAVE' AS type,
-       applied_at AS created_at,
-       status
-FROM leave_requests
-WHERE reg_no = :reg_no
-
-UNION ALL
-
-SELECT request_id AS id,
-       'BONAFIDE' AS type,
-       applied_at AS created_at,
-       advisor_status AS status
-FROM bonafide_requests
-WHERE reg_no = :reg_no
-
-UNION ALL
-
-SELECT outpass_id AS id,
-       'OUTPASS' AS type,
-       created_at AS created_at,
-       advisor_status AS status
-FROM outpass_requests
-WHERE reg_no = :reg_no
-
-UNION ALL
-
-SELECT od_id AS id,
-       'OD' AS type,
-       created_at AS created_at,
-       advisor_status AS status
-FROM od_requests
-WHERE reg_no = :reg_no
-
-ORDER BY created_at DESC
-LIMIT :limit
-
-    """)
-
-    rows = db.execute(query, {"reg_no": reg_no, "limit": 50}).fetchall()
+    rows = db.execute(st.STUDENT_FEED_RECENT, {"reg_no": reg_no, "limit": 50}).fetchall()
 
 
     return [
@@ -2724,226 +1951,80 @@ from sqlalchemy import text
 
 @app.get("/advisor/history")
 def advisor_full_history(
+    response: Response,
+    page: Page = Depends(),
     payload=Depends(get_current_user_soft),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
+    aid = payload.get("advisor_id")
+    dept = payload.get("department")
 
-    advisor = db.execute(
-        text("SELECT advisor_id, department FROM advisors WHERE email = :email"),
-        {"email": email}
-    ).fetchone()
-
-    if not advisor:
+    if not aid:
         raise HTTPException(403, "Not an advisor")
 
-    aid = advisor.advisor_id
-    dept = advisor.department
+    # One keyset (reviewed_at, type, request_id) across the four lists:
+    # each query reads at most a page past the cursor, the merged rows
+    # are cut to one page and split back by type.
+    params = page.params(aid=aid, dept=dept)
 
     # ---------------- LEAVE HISTORY ----------------
-    leaves = db.execute(text("""
-        SELECT
-            l.leave_id AS request_id,
-            'LEAVE' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            l.start_date,
-            l.end_date,
-            l.category,
-            l.status,
-            l.reviewed_at AS reviewed_at
-        FROM leave_requests l
-        JOIN students s ON s.reg_no = l.reg_no
-        WHERE l.acted_advisor_id = :aid
-          AND l.status <> 'PENDING'
-        ORDER BY l.reviewed_at DESC
-    """), {"aid": aid}).mappings().all()
+    leaves = db.execute(page.statement(st.ADVISOR_HISTORY_LEAVES), params).mappings().all()
 
     # ---------------- BONAFIDE HISTORY ----------------
-    bonafides = db.execute(text("""
-        SELECT
-            b.request_id AS request_id,
-            'BONAFIDE' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            b.category,
-            b.purpose,
-            b.advisor_status AS status,
-            b.advisor_reviewed_at AS reviewed_at
-        FROM bonafide_requests b
-        JOIN students s ON s.reg_no = b.reg_no
-        WHERE b.acted_advisor_id = :aid
-          AND b.advisor_status <> 'PENDING'
-        ORDER BY b.advisor_reviewed_at DESC
-    """), {"aid": aid}).mappings().all()
+    bonafides = db.execute(page.statement(st.ADVISOR_HISTORY_BONAFIDES), params).mappings().all()
 
     # ---------------- OUTPASS HISTORY ----------------
-    outpasses = db.execute(text("""
-        SELECT
-            o.outpass_id AS request_id,
-            'OUTPASS' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            o.out_date,
-            o.purpose,
-            o.advisor_status AS status,
-            o.created_at AS reviewed_at   -- fallback since review time not stored
-        FROM outpass_requests o
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE o.acted_advisor_id = :aid
-          AND o.advisor_status <> 'PENDING'
-        ORDER BY o.created_at DESC
-    """), {"aid": aid}).mappings().all()
+    outpasses = db.execute(page.statement(st.ADVISOR_HISTORY_OUTPASSES), params).mappings().all()
 
     # ---------------- OD HISTORY ----------------
-    ods = db.execute(text("""
-        SELECT
-            o.od_id AS request_id,
-            'OD' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            o.from_date,
-            o.to_date,
-            o.purpose,
-            o.advisor_status AS status,
-            o.advisor_reviewed_at AS reviewed_at
-        FROM od_requests o
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE o.advisor_status <> 'PENDING'
-          AND s.department = :dept
-        ORDER BY o.advisor_reviewed_at DESC
-    """), {"dept": dept}).mappings().all()
+    ods = db.execute(page.statement(st.ADVISOR_HISTORY_ODS), params).mappings().all()
+
+    merged = sorted(
+        [*leaves, *bonafides, *outpasses, *ods],
+        key=lambda r: (r["reviewed_at"], r["type"], r["request_id"]),
+        reverse=True,
+    )
+    merged, next_cursor = page.cut(merged, "reviewed_at", "type", "request_id")
+    set_next_cursor(response, next_cursor)
 
     return {
-        "leaves": leaves,
-        "bonafides": bonafides,
-        "outpasses": outpasses,
-        "ods": ods
+        "leaves": [r for r in merged if r["type"] == "LEAVE"],
+        "bonafides": [r for r in merged if r["type"] == "BONAFIDE"],
+        "outpasses": [r for r in merged if r["type"] == "OUTPASS"],
+        "ods": [r for r in merged if r["type"] == "OD"],
+        "next_cursor": next_cursor
     }
 
 
 @app.get("/advisor/pending")
 def advisor_pending_requests(
+    request: Request,
+    response: Response,
     payload=Depends(get_current_user_soft),
     db: Session = Depends(get_db)
 ):
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
+    aid = payload.get("advisor_id")
 
-    advisor = db.execute(
-        text("SELECT advisor_id FROM advisors WHERE email = :email"),
-        {"email": email}
-    ).fetchone()
-
-    if not advisor:
+    if not aid:
         raise HTTPException(403, "Not an advisor")
 
-    aid = advisor.advisor_id
-
-    # 🔹 Students under this advisor
-    student_filter = """
-        s.reg_no IN (
-            SELECT s.reg_no
-            FROM students s
-            JOIN section_advisors sa
-              ON sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE sa.advisor_id = :aid
-        )
-    """
+    params = {"aid": aid}
 
-    # ---------------- LEAVE PENDING ----------------
-    leaves = db.execute(text(f"""
-        SELECT
-            l.leave_id AS request_id,
-            'LEAVE' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            l.start_date,
-            l.end_date,
-            l.category,
-            l.applied_at AS created_at
-        FROM leave_requests l
-        JOIN students s ON s.reg_no = l.reg_no
-        WHERE l.status = 'PENDING'
-          AND {student_filter}
-        ORDER BY l.applied_at DESC
-    """), {"aid": aid}).mappings().all()
-
-    # ---------------- BONAFIDE PENDING ----------------
-    bonafides = db.execute(text(f"""
-        SELECT
-            b.request_id AS request_id,
-            'BONAFIDE' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            b.category,
-            b.purpose,
-            b.applied_at AS created_at
-        FROM bonafide_requests b
-        JOIN students s ON s.reg_no = b.reg_no
-        WHERE b.advisor_status = 'PENDING'
-          AND {student_filter}
-        ORDER BY b.applied_at DESC
-    """), {"aid": aid}).mappings().all()
-
-    # ---------------- OUTPASS PENDING ----------------
-    outpasses = db.execute(text(f"""
-        SELECT
-            o.outpass_id AS request_id,
-            'OUTPASS' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            o.out_date,
-            o.out_time,
-            o.purpose,
-            o.created_at
-        FROM outpass_requests o
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE o.advisor_status = 'PENDING'
-          AND {student_filter}
-        ORDER BY o.created_at DESC
-    """), {"aid": aid}).mappings().all()
-
-    # ---------------- OD PENDING ----------------
-    ods = db.execute(text(f"""
-        SELECT
-            o.od_id AS request_id,
-            'OD' AS type,
-            s.name,
-            s.reg_no,
-            s.section,
-            s.year_of_study,
-            o.from_date,
-            o.to_date,
-            o.purpose,
-            o.created_at
-        FROM od_requests o
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE o.advisor_status = 'PENDING'
-          AND {student_filter}
-        ORDER BY o.created_at DESC
-    """), {"aid": aid}).mappings().all()
+    stamp = version_stamp(db, st.ADVISOR_QUEUE_VERSION, params)
+    cached = not_modified("advisor.pending", request, response, stamp)
+    if cached:
+        return cached
+
+    leaves = db.execute(st.ADVISOR_PENDING_LEAVES, params).mappings().all()
+    bonafides = db.execute(st.ADVISOR_PENDING_BONAFIDES, params).mappings().all()
+    outpasses = db.execute(st.ADVISOR_PENDING_OUTPASSES, params).mappings().all()
+    ods = db.execute(st.ADVISOR_PENDING_ODS, params).mappings().all()
 
     return {
         "leaves": leaves,
@@ -2963,17 +2044,10 @@ def advisor_review_request(
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
-
-    advisor = db.execute(
-        text("SELECT advisor_id FROM advisors WHERE email = :email"),
-        {"email": email}
-    ).fetchone()
+    aid = payload.get("advisor_id")
 
-    if not advisor:
+    if not aid:
         raise HTTPException(403, "Not an advisor")
-
-    aid = advisor.advisor_id
     status = data.get("status")
 
     if status not in ["APPROVED", "REJECTED"]:
@@ -2981,16 +2055,7 @@ def advisor_review_request(
 
     # ================= LEAVE =================
     if req_type == "leave":
-        result = db.execute(text("""
-            UPDATE leave_requests
-            SET status = :status,
-                advisor_remark = :remark,
-                acted_advisor_id = :aid,
-                reviewed_at = CURRENT_TIMESTAMP,
-                advisor_reviewed_at = CURRENT_TIMESTAMP
-            WHERE leave_id = :id
-              AND status = 'PENDING'
-        """), {
+        result = db.execute(st.ADVISOR_REVIEW_LEAVE, {
             "status": status,
             "remark": data.get("advisor_remark"),
             "aid": aid,
@@ -2999,14 +2064,7 @@ def advisor_review_request(
 
     # ================= BONAFIDE =================
     elif req_type == "bonafide":
-        result = db.execute(text("""
-            UPDATE bonafide_requests
-            SET advisor_status = :status,
-                acted_advisor_id = :aid,
-                advisor_reviewed_at = CURRENT_TIMESTAMP
-            WHERE request_id = :id
-              AND advisor_status = 'PENDING'
-        """), {
+        result = db.execute(st.ADVISOR_REVIEW_BONAFIDE, {
             "status": status,
             "aid": aid,
             "id": req_id
@@ -3014,13 +2072,7 @@ def advisor_review_request(
 
     # ================= OUTPASS =================
     elif req_type == "outpass":
-        result = db.execute(text("""
-            UPDATE outpass_requests
-            SET advisor_status = :status,
-                acted_advisor_id = :aid
-            WHERE outpass_id = :id
-              AND advisor_status = 'PENDING'
-        """), {
+        result = db.execute(st.ADVISOR_REVIEW_OUTPASS, {
             "status": status,
             "aid": aid,
             "id": req_id
@@ -3028,13 +2080,7 @@ def advisor_review_request(
 
     # ================= OD =================
     elif req_type == "od":
-        result = db.execute(text("""
-            UPDATE od_requests
-            SET advisor_status = :status,
-                advisor_reviewed_at = CURRENT_TIMESTAMP
-            WHERE od_id = :id
-              AND advisor_status = 'PENDING'
-        """), {
+        result = db.execute(st.ADVISOR_REVIEW_OD, {
             "status": status,
             "id": req_id
         })
@@ -3049,308 +2095,283 @@ def advisor_review_request(
     return {"message": f"{req_type.upper()} {status} successfully"}
 
 
-@app.get("/advisor/dashboard-stats")
-def advisor_dashboard_stats(
-    payload=Depends(get_current_user_soft),
+# -------------------------------------------------
+# BULK REVIEW (see bulk_review.py)
+# -------------------------------------------------
+def review_notification_jobs(role: str, rows: list[dict]) -> list[Job]:
+    """The mail / PDF jobs the single review endpoints queue, for each updated row."""
+    jobs = []
+
+    for row in rows:
+        rtype, status, rid = row["type"], row["status"], row["item_id"]
+
+        if rtype == "LEAVE":
+            jobs.append(mail_job(
+                row["email"],
+                f"Leave {status}",
+                f"Your leave request has been {status.lower()} by your advisor.",
+                rtype, rid
+            ))
+
+        elif rtype == "BONAFIDE":
+            if role == "hod" and status == "APPROVED":
+                jobs.append(Job("bonafide.certificate", {"request_id": rid}, rtype, rid))
+
+        elif rtype == "OD":
+            if role == "hod":
+                jobs.append(mail_job(
+                    row["email"],
+                    f"OD {status}",
+                    (
+                        f"Your OD request has been {status.lower()}."
+                        + (f"\n\nRemark: {row['remark']}" if row["remark"] else "")
+                    ),
+                    rtype, rid
+                ))
+            elif status == "REJECTED":
+                jobs.append(mail_job(
+                    row["email"],
+                    "OD Rejected by Advisor",
+                    "Your OD request has been rejected by your advisor.",
+                    rtype, rid
+                ))
+
+        elif rtype == "OUTPASS":
+            if status == "REJECTED":
+                jobs.append(mail_job(
+                    row["email"],
+                    "Outpass Rejected",
+                    (
+                        f"Your outpass request has been rejected by {role.capitalize()}.\n\n"
+                        f"Outpass ID : {rid}\n"
+                        f"Date: {row['out_date']}"
+                    ),
+                    rtype, rid
+                ))
+            elif role == "warden" or (role == "hod" and row["residence_type"] == "DAY_SCHOLAR"):
+                jobs.append(Job("outpass.approved", {"outpass_id": rid, "by": role}, rtype, rid))
+
+    return jobs
+
+
+def run_bulk_review(role: str, actor_id, items, db: Session):
+    for attempt in (1, 2):
+        try:
+            results, updated = apply_bulk_review(db, role, actor_id, items)
+
+            # Queued in the same transaction, one INSERT for the whole batch
+            queued = enqueue_many(db, review_notification_jobs(role, updated))
+            db.commit()
+            break
+        except DBAPIError as e:
+            db.rollback()
+            # Picked as the deadlock victim: the whole batch rolled back,
+            # so run it again once
+            if attempt == 2 or not deadlocked(e):
+                raise
+
+    job_ids = {(job["request_type"], job["request_id"]): job["id"] for job in queued}
+    for result in results:
+        if result["result"] == "updated":
+            result["job_id"] = job_ids.get((result["type"], result["id"]))
+
+    return summarize(results)
+
+
+@app.post("/advisor/review/bulk")
+def advisor_bulk_review(
+    items: List[BulkReviewItem],
+    user=Depends(get_current_user),
     db: Session = Depends(get_db)
+):
+    # 🔐 Only advisors allowed
+    if user["role"].lower() != "advisor":
+        raise HTTPException(403, "Only advisors allowed")
+
+    return run_bulk_review("advisor", user.get("advisor_id"), items, db)
+
+
+@app.post("/hod/review/bulk")
+def hod_bulk_review(
+    items: List[BulkReviewItem],
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # 🔐 Only HOD allowed
+    if user["role"].lower() != "hod":
+        raise HTTPException(403, "Only HOD allowed")
+
+    return run_bulk_review("hod", user.get("hod_id"), items, db)
+
+
+@app.post("/warden/review/bulk")
+def warden_bulk_review(
+    items: List[BulkReviewItem],
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    # 🔐 Only Warden allowed
+    if user["role"].lower() != "warden":
+        raise HTTPException(403, "Only wardens allowed")
+
+    return run_bulk_review("warden", user.get("warden_id"), items, db)
+
+
+# -------------------------------------------------
+# JOB STATE (PDF / mail jobs queued by the reviews)
+# -------------------------------------------------
+@app.get("/jobs/{job_id}")
+def get_job_state(
+    job_id: int,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if user["role"].lower() not in ("advisor", "hod", "warden"):
+        raise HTTPException(403, "Only approvers allowed")
+
+    job = db.execute(st.JOB_STATE, {"id": job_id}).mappings().first()
+    if not job:
+        raise HTTPException(404, "Job not found")
+
+    return job
+
+
+@app.get("/requests/{rtype}/{rid}/jobs")
+def get_request_jobs(
+    rtype: str,
+    rid: int,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if user["role"].lower() not in ("advisor", "hod", "warden"):
+        raise HTTPException(403, "Only approvers allowed")
+
+    rtype = rtype.upper()
+    if rtype not in st.REVIEW_TABLES:
+        raise HTTPException(400, "Invalid request type")
+
+    return db.execute(st.REQUEST_JOBS, {"rtype": rtype, "rid": rid}).mappings().all()
+
+
+@app.get("/advisor/dashboard-stats")
+async def advisor_dashboard_stats(
+    request: Request,
+    payload=Depends(get_current_user_async)
 ):
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
+    aid = payload.get("advisor_id")
 
-    advisor = db.execute(text("""
-        SELECT advisor_id, department
-        FROM advisors
-        WHERE email = :email
-    """), {"email": email}).fetchone()
-
-    if not advisor:
+    if not aid:
         raise HTTPException(403, "Not an advisor")
 
-    aid = advisor.advisor_id
-
-    # Students handled by advisor
-    student_filter = """
-        s.reg_no IN (
-            SELECT s.reg_no
-            FROM students s
-            JOIN section_advisors sa
-              ON sa.department = s.department
-             AND sa.section = s.section
-             AND sa.year_of_study = s.year_of_study
-            WHERE sa.advisor_id = :aid
-        )
-    """
+    rows = await fetch_all(
+        st.ADVISOR_STATS, {"aid": aid}, bind=async_read_engine(request.state)
+    )
 
-    total = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT leave_id FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no WHERE {student_filter}
-            UNION ALL
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE {student_filter}
-        ) x
-    """), {"aid": aid}).scalar()
-
-    pending = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT leave_id FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no WHERE l.status='PENDING' AND {student_filter}
-            UNION ALL
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE b.advisor_status='PENDING' AND {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='PENDING' AND {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='PENDING' AND {student_filter}
-        ) x
-    """), {"aid": aid}).scalar()
-
-    approved = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT leave_id FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no WHERE l.status='APPROVED' AND {student_filter}
-            UNION ALL
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE b.advisor_status='APPROVED' AND {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='APPROVED' AND {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='APPROVED' AND {student_filter}
-        ) x
-    """), {"aid": aid}).scalar()
-
-    rejected = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT leave_id FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no WHERE l.status='REJECTED' AND {student_filter}
-            UNION ALL
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE b.advisor_status='REJECTED' AND {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='REJECTED' AND {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='REJECTED' AND {student_filter}
-        ) x
-    """), {"aid": aid}).scalar()
+    return rows[0]
 
-    return {
-        "total": total,
-        "pending": pending,
-        "approved": approved,
-        "rejected": rejected
-    }
+@app.get("/advisor/events")
+async def advisor_events(request: Request, payload=Depends(get_stream_user)):
+    if not payload.get("advisor_id"):
+        raise HTTPException(403, "Not an advisor")
+
+    scopes = [
+        f"section:{s['department']}:{s['section']}:{s['year_of_study']}"
+        for s in payload.get("sections") or []
+    ]
+
+    return sse_response(event_hub, request, scopes)
 
 @app.get("/advisor/pending-preview")
-def advisor_pending_preview(
-    payload=Depends(get_current_user_soft),
-    db: Session = Depends(get_db)
+async def advisor_pending_preview(
+    payload=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
-    aid = db.execute(text("SELECT advisor_id FROM advisors WHERE email=:e"),
-                     {"e": email}).scalar()
-
-    student_filter = """
-        s.reg_no IN (
-            SELECT s.reg_no
-            FROM students s
-            JOIN section_advisors sa
-              ON sa.department=s.department
-             AND sa.section=s.section
-             AND sa.year_of_study=s.year_of_study
-            WHERE sa.advisor_id=:aid
-        )
-    """
+    aid = payload.get("advisor_id")
 
-    data = db.execute(text(f"""
-        SELECT * FROM (
-            SELECT 'LEAVE' type, l.leave_id id, s.name, l.applied_at dt
-            FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no
-            WHERE l.status='PENDING' AND {student_filter}
-
-            UNION ALL
-            SELECT 'BONAFIDE', b.request_id, s.name, b.applied_at
-            FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no
-            WHERE b.advisor_status='PENDING' AND {student_filter}
-
-            UNION ALL
-            SELECT 'OUTPASS', o.outpass_id, s.name, o.created_at
-            FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.advisor_status='PENDING' AND {student_filter}
-
-            UNION ALL
-            SELECT 'OD', o.od_id, s.name, o.created_at
-            FROM od_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.advisor_status='PENDING' AND {student_filter}
-        ) x
-        ORDER BY dt DESC
-        LIMIT 5
-    """), {"aid": aid}).mappings().all()
+    if not aid:
+        raise HTTPException(403, "Not an advisor")
+
+    data = (await db.execute(st.ADVISOR_PENDING_PREVIEW, {"aid": aid})).mappings().all()
 
     return data
 
 @app.get("/advisor/request-breakdown")
-def advisor_request_breakdown(
-    payload=Depends(get_current_user_soft),
-    db: Session = Depends(get_db)
+async def advisor_request_breakdown(
+    request: Request,
+    payload=Depends(get_current_user_async)
 ):
-    email = payload.get("sub") or payload.get("email")
-    aid = db.execute(text("SELECT advisor_id FROM advisors WHERE email=:e"),
-                     {"e": email}).scalar()
-
-    student_filter = """
-        s.reg_no IN (
-            SELECT s.reg_no FROM students s
-            JOIN section_advisors sa
-            ON sa.department=s.department
-            AND sa.section=s.section
-            AND sa.year_of_study=s.year_of_study
-            WHERE sa.advisor_id=:aid
-        )
-    """
+    if not payload:
+        raise HTTPException(401, "Invalid token")
+
+    aid = payload.get("advisor_id")
+
+    if not aid:
+        raise HTTPException(403, "Not an advisor")
+
+    rows = await fetch_all(
+        st.ADVISOR_BREAKDOWN, {"aid": aid}, bind=async_read_engine(request.state)
+    )
+    counts = {r["request_type"]: r["count"] for r in rows}
 
     return {
-        "leave": db.execute(text(f"SELECT COUNT(*) FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no WHERE l.status='PENDING' AND {student_filter}"), {"aid": aid}).scalar(),
-        "bonafide": db.execute(text(f"SELECT COUNT(*) FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE b.advisor_status='PENDING' AND {student_filter}"), {"aid": aid}).scalar(),
-        "outpass": db.execute(text(f"SELECT COUNT(*) FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='PENDING' AND {student_filter}"), {"aid": aid}).scalar(),
-        "od": db.execute(text(f"SELECT COUNT(*) FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE o.advisor_status='PENDING' AND {student_filter}"), {"aid": aid}).scalar(),
+        "leave": counts.get("LEAVE", 0),
+        "bonafide": counts.get("BONAFIDE", 0),
+        "outpass": counts.get("OUTPASS", 0),
+        "od": counts.get("OD", 0),
     }
 
 @app.get("/hod/dashboard-stats")
-def hod_dashboard_stats(payload=Depends(get_current_user_soft), db: Session = Depends(get_db)):
-    email = payload.get("sub") or payload.get("email")
-
-    hod = db.execute(text("SELECT hod_id, department FROM hods WHERE email=:e"),
-                     {"e": email}).mappings().first()
+async def hod_dashboard_stats(request: Request, payload=Depends(get_current_user_async)):
+    if not payload:
+        raise HTTPException(401, "Invalid token")
 
-    if not hod:
+    if not payload.get("hod_id"):
         raise HTTPException(403, "Not HOD")
 
-    dept = hod["department"]
-
-    student_filter = "s.department = :dept"
-
-    total = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE {student_filter}
-        ) x
-    """), {"dept": dept}).scalar()
-
-    pending = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no
-            WHERE b.advisor_status='APPROVED' AND b.hod_status='PENDING' AND {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.advisor_status='APPROVED' AND o.hod_status='PENDING' AND {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.advisor_status='APPROVED' AND o.hod_status='PENDING' AND {student_filter}
-        ) x
-    """), {"dept": dept}).scalar()
-
-    approved = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no
-            WHERE b.hod_status='APPROVED' AND {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.hod_status='APPROVED' AND {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.hod_status='APPROVED' AND {student_filter}
-        ) x
-    """), {"dept": dept}).scalar()
-
-    rejected = db.execute(text(f"""
-        SELECT COUNT(*) FROM (
-            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no
-            WHERE b.hod_status='REJECTED' AND {student_filter}
-            UNION ALL
-            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.hod_status='REJECTED' AND {student_filter}
-            UNION ALL
-            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.hod_status='REJECTED' AND {student_filter}
-        ) x
-    """), {"dept": dept}).scalar()
-
-    return {"total": total, "pending": pending, "approved": approved, "rejected": rejected}
+    dept = payload.get("department")
+
+    rows = await fetch_all(
+        st.HOD_STATS, {"dept": dept}, bind=async_read_engine(request.state)
+    )
+
+    return rows[0]
+
+@app.get("/hod/events")
+async def hod_events(request: Request, payload=Depends(get_stream_user)):
+    dept = payload.get("department") if payload.get("hod_id") else None
+
+    if not dept:
+        raise HTTPException(403, "Not a HOD")
+
+    return sse_response(event_hub, request, [f"dept:{dept}"])
 
 @app.get("/hod/pending")
 def hod_pending_preview(
+    request: Request,
+    response: Response,
     payload=Depends(get_current_user_soft),
     db: Session = Depends(get_db)
 ):
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
-
-    dept = db.execute(
-        text("SELECT department FROM hods WHERE email=:e"),
-        {"e": email}
-    ).scalar()
+    dept = payload.get("department") if payload.get("hod_id") else None
 
     if not dept:
         raise HTTPException(403, "Not a HOD")
 
-    data = db.execute(text("""
-        SELECT * FROM (
-
-            -- 🔵 BONAFIDE
-            SELECT 
-                'BONAFIDE' AS type,
-                b.request_id AS id,
-                s.name,
-                s.reg_no,
-                s.department,
-                b.applied_at AS dt
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no = b.reg_no
-            WHERE b.hod_status = 'PENDING'
-              AND b.advisor_status = 'APPROVED'
-              AND s.department = :dept
-
-            UNION ALL
-
-            -- 🟠 OUTPASS
-            SELECT 
-                'OUTPASS',
-                o.outpass_id,
-                s.name,
-                s.reg_no,
-                s.department,
-                o.created_at
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.hod_status = 'PENDING'
-              AND o.advisor_status = 'APPROVED'
-              AND s.department = :dept
-
-            UNION ALL
-
-            -- 🟢 OD
-            SELECT 
-                'OD',
-                o.od_id,
-                s.name,
-                s.reg_no,
-                s.department,
-                o.created_at
-            FROM od_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.hod_status = 'PENDING'
-              AND o.advisor_status = 'APPROVED'
-              AND s.department = :dept
-
-        ) x
-        ORDER BY dt DESC
-    """), {"dept": dept}).mappings().all()
+    stamp = version_stamp(db, st.HOD_QUEUE_VERSION, {"dept": dept})
+    cached = not_modified("hod.pending", request, response, stamp)
+    if cached:
+        return cached
+
+    data = db.execute(st.HOD_PENDING_PREVIEW, {"dept": dept}).mappings().all()
 
     return data
 
@@ -3363,126 +2384,116 @@ def hod_request_breakdown(
     if not payload:
         raise HTTPException(401, "Invalid token")
 
-    email = payload.get("sub") or payload.get("email")
-
-    # Get HOD department
-    hod = db.execute(text("""
-        SELECT department FROM hods WHERE email = :email
-    """), {"email": email}).fetchone()
-
-    if not hod:
+    if not payload.get("hod_id"):
         raise HTTPException(403, "Not HOD")
 
-    dept = hod.department
+    # HOD department from token claims
+    dept = payload.get("department")
+
+    counts = dict(db.execute(st.HOD_BREAKDOWN, {"dept": dept}).all())
 
     return {
-        "bonafide": db.execute(text("""
-            SELECT COUNT(*) FROM bonafide_requests b
-            JOIN students s ON s.reg_no = b.reg_no
-            WHERE s.department = :dept
-            AND b.advisor_status = 'APPROVED'
-            AND b.hod_status = 'PENDING'
-        """), {"dept": dept}).scalar(),
-
-        "outpass": db.execute(text("""
-            SELECT COUNT(*) FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE s.department = :dept
-            AND o.advisor_status = 'APPROVED'
-            AND o.hod_status = 'PENDING'
-        """), {"dept": dept}).scalar(),
-
-        "od": db.execute(text("""
-            SELECT COUNT(*) FROM od_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE s.department = :dept
-            AND o.advisor_status = 'APPROVED'
-            AND o.hod_status = 'PENDING'
-        """), {"dept": dept}).scalar(),
+        "bonafide": counts.get("BONAFIDE", 0),
+        "outpass": counts.get("OUTPASS", 0),
+        "od": counts.get("OD", 0),
     }
+
 @app.get("/hod/history")
-def hod_history(payload=Depends(get_current_user_soft), db: Session = Depends(get_db)):
-    email = payload.get("sub") or payload.get("email")
+def hod_history(
+    response: Response,
+    page: Page = Depends(),
+    payload=Depends(get_current_user_soft),
+    db: Session = Depends(get_read_db)
+):
+    if not payload:
+        raise HTTPException(401, "Invalid token")
 
-    dept = db.execute(
-        text("SELECT department FROM hods WHERE email=:e"),
-        {"e": email}
-    ).scalar()
+    dept = payload.get("department") if payload.get("hod_id") else None
 
-    data = db.execute(text("""
-        SELECT * FROM (
-            SELECT 'BONAFIDE' AS type,
-                   b.request_id AS id,
-                   s.name,
-                   s.reg_no,
-                   b.hod_status AS status,
-                   b.hod_reviewed_at AS acted_on
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no=b.reg_no
-            WHERE s.department=:dept AND b.hod_status != 'PENDING'
-
-            UNION ALL
-
-            SELECT 'OUTPASS',
-                   o.outpass_id,
-                   s.name,
-                   s.reg_no,
-                   o.hod_status,
-                   o.hod_reviewed_at
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no=o.reg_no
-            WHERE s.department=:dept AND o.hod_status != 'PENDING'
-
-            UNION ALL
-
-            SELECT 'OD',
-                   o.od_id,
-                   s.name,
-                   s.reg_no,
-                   o.hod_status,
-                   o.hod_reviewed_at
-            FROM od_requests o
-            JOIN students s ON s.reg_no=o.reg_no
-            WHERE s.department=:dept AND o.hod_status != 'PENDING'
-        ) x
-        ORDER BY acted_on DESC
-    """), {"dept": dept}).mappings().all()
+    if not dept:
+        raise HTTPException(403, "Not a HOD")
+
+    data = db.execute(page.statement(st.HOD_HISTORY), page.params(dept=dept)).mappings().all()
+
+    data, next_cursor = page.cut(data, "acted_on", "type", "id")
+    set_next_cursor(response, next_cursor)
 
     return data
 
 
+@app.get("/hod/export")
+def hod_export(
+    request: Request,
+    format: str = "csv",
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    request_type: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = None,
+    payload=Depends(get_current_user_soft)
+):
+    if not payload:
+        raise HTTPException(401, "Invalid token")
+
+    dept = payload.get("department") if payload.get("hod_id") else None
+
+    if not dept:
+        raise HTTPException(403, "Not a HOD")
+
+    request_type = request_type.upper() if request_type else None
+    status = status.upper() if status else None
+
+    if request_type and request_type not in {"BONAFIDE", "OUTPASS", "OD"}:
+        raise HTTPException(400, "Invalid request type")
+
+    if status and status not in {"APPROVED", "REJECTED"}:
+        raise HTTPException(400, "Invalid status")
+
+    return export_response(
+        read_engine(request.state),
+        st.HOD_EXPORT,
+        {
+            "dept": dept,
+            "rtype": request_type,
+            "status": status,
+            "from_date": from_date,
+            "to_date": to_date,
+        },
+        format,
+        f"hod-history-{dept}",
+    )
+
+
 @app.get("/hod/request/{rtype}/{rid}")
-def get_request_detail(rtype: str, rid: int, db: Session = Depends(get_db)):
+def get_request_detail(
+    rtype: str,
+    rid: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+
+    if rtype.lower() in ("bonafide", "outpass", "od"):
+        stamp = version_stamp(db, st.REQUEST_VERSION, {"rtype": rtype.upper(), "rid": rid})
+        cached = not_modified("hod.request", request, response, stamp)
+        if cached:
+            return cached
 
     if rtype.lower() == "bonafide":
-        data = db.execute(text("""
-            SELECT b.*, s.name, s.reg_no, s.department
-            FROM bonafide_requests b
-            JOIN students s ON s.reg_no=b.reg_no
-            WHERE b.request_id=:id
-        """), {"id": rid}).mappings().first()
+        data = db.execute(st.REQUEST_DETAIL_BONAFIDE, {"id": rid}).mappings().first()
 
     elif rtype.lower() == "outpass":
-        data = db.execute(text("""
-            SELECT o.*, s.name, s.reg_no, s.department
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.outpass_id=:id
-        """), {"id": rid}).mappings().first()
+        data = db.execute(st.REQUEST_DETAIL_OUTPASS, {"id": rid}).mappings().first()
 
     elif rtype.lower() == "od":
-        data = db.execute(text("""
-            SELECT o.*, s.name, s.reg_no, s.department
-            FROM od_requests o
-            JOIN students s ON s.reg_no=o.reg_no
-            WHERE o.od_id=:id
-        """), {"id": rid}).mappings().first()
+        data = db.execute(st.REQUEST_DETAIL_OD, {"id": rid}).mappings().first()
 
     return data
 
 @app.get("/outpass/detail/{outpass_id}")
 def get_outpass_detail(
     outpass_id: int,
+    request: Request,
+    response: Response,
     payload=Depends(get_current_user_soft),
     db: Session = Depends(get_db)
 ):
@@ -3490,46 +2501,13 @@ def get_outpass_detail(
 
     if role not in ["student", "advisor","hod", "warden"]:
         raise HTTPException(403, "Not allowed")
+
+    stamp = version_stamp(db, st.REQUEST_VERSION, {"rtype": "OUTPASS", "rid": outpass_id})
+    cached = not_modified("outpass.detail", request, response, stamp)
+    if cached:
+        return cached
     data = db.execute(
-        text("""
-            SELECT
-                o.outpass_id AS id,
-                'outpass' AS type,
-
-                -- 👤 Student Info
-                s.name AS studentName,
-                s.reg_no AS rollNumber,
-                s.department,
-                s.email AS studentEmail,
-                o.year_of_study,
-
-                -- 📄 Outpass Details
-                o.out_date AS outDate,
-                o.out_time AS outTime,
-                o.in_date AS inDate,
-                o.in_time AS inTime,
-                o.purpose,
-                o.contact_number AS contactNumber,
-                o.parent_mobile AS parentContact,
-
-                -- 🏨 Hostel Info
-                o.hostel_id AS hostelId,
-                o.floor_id AS floorId,
-                o.room_no AS roomNumber,
-
-                -- 📊 Status Info
-                o.advisor_status AS advisorStatus,
-                o.hod_status AS hodStatus,
-                o.warden_status AS wardenStatus,
-
-                -- ⏱ Dates
-                o.created_at AS createdAt,
-                o.hod_reviewed_at AS hodActedAt
-
-            FROM outpass_requests o
-            JOIN students s ON s.reg_no = o.reg_no
-            WHERE o.outpass_id = :id
-        """),
+        st.OUTPASS_DETAIL,
         {"id": outpass_id}
     ).mappings().first()
 
@@ -3543,25 +2521,18 @@ def get_outpass_detail(
 
 
 @app.get("/bonafide/detail/{request_id}")
-def get_bonafide_detail(request_id: int, db: Session = Depends(get_db)):
-    data = db.execute(text("""
-        SELECT
-            b.request_id AS id,
-            'bonafide' AS type,
-            s.name AS name,
-            s.reg_no AS rollNo,
-            s.department,
-            b.category,
-            b.purpose,
-            b.applied_at AS submittedAt, 
-            b.intern_start_date AS internshipStartDate,
-            b.intern_end_date AS internshipEndDate, -- ✅ FIX
-            b.hod_status AS status,
-            b.advisor_status
-        FROM bonafide_requests b
-        JOIN students s ON s.reg_no = b.reg_no
-        WHERE b.request_id = :id
-    """), {"id": request_id}).mappings().first()
+def get_bonafide_detail(
+    request_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    stamp = version_stamp(db, st.REQUEST_VERSION, {"rtype": "BONAFIDE", "rid": request_id})
+    cached = not_modified("bonafide.detail", request, response, stamp)
+    if cached:
+        return cached
+
+    data = db.execute(st.BONAFIDE_DETAIL, {"id": request_id}).mappings().first()
 
     if not data:
         raise HTTPException(404, "Request not found")
@@ -3571,131 +2542,137 @@ def get_bonafide_detail(request_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/od/detail/{od_id}")
-def get_od_detail(od_id: int, db: Session = Depends(get_db)):
-    data = db.execute(text("""
-        SELECT
-            o.od_id AS id,
-            'od' AS type,
-            s.name AS name,
-            s.reg_no AS rollNo,
-            s.department,
-            o.from_date AS fromDate,        -- ✅ FIX
-            o.to_date AS toDate,            -- ✅ FIX
-            o.start_time AS startTime,
-            o.end_time AS endTime,
-            o.place,
-            o.purpose,
-            o.created_at AS submittedAt,    -- ✅ FIX
-            o.hod_status AS status,
-            o.advisor_status
-        FROM od_requests o
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE o.od_id = :id
-    """), {"id": od_id}).mappings().first()
+def get_od_detail(
+    od_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    stamp = version_stamp(db, st.REQUEST_VERSION, {"rtype": "OD", "rid": od_id})
+    cached = not_modified("od.detail", request, response, stamp)
+    if cached:
+        return cached
+
+    data = db.execute(st.OD_DETAIL, {"id": od_id}).mappings().first()
 
     if not data:
         raise HTTPException(404, "Request not found")
 
     return data
 
+@app.get("/warden/events")
+async def warden_events(request: Request, payload=Depends(get_stream_user)):
+    if not payload.get("warden_id"):
+        raise HTTPException(403, "Not a warden")
+
+    return sse_response(event_hub, request, ["warden:*"])
+
 @app.get("/warden/pending-preview")
-def warden_pending_preview(payload=Depends(get_current_user_soft), db: Session = Depends(get_db)):
+def warden_pending_preview(
+    request: Request,
+    response: Response,
+    payload=Depends(get_current_user_soft),
+    db: Session = Depends(get_db)
+):
     email = payload.get("sub") or payload.get("email")
 
+    stamp = version_stamp(db, st.WARDEN_QUEUE_VERSION, {})
+    cached = not_modified("warden.pending-preview", request, response, stamp)
+    if cached:
+        return cached
+
     # Only hostel students' outpass + advisor & HOD already approved
-    data = db.execute(text("""
-        SELECT
-            o.outpass_id AS id,
-            'outpass' AS type,
-            s.name,
-            s.reg_no AS rollNo,
-            s.department,
-            o.out_date AS outDate,
-            o.out_time AS outTime,
-            o.in_date AS inDate,
-            o.in_time AS inTime,
-            o.contact_number AS contact,
-            o.parent_mobile AS parentMobile,
-            o.purpose,
-            o.created_at AS submittedAt,
-            o.hod_status,
-            o.advisor_status,
-            o.warden_status
-        FROM outpass_requests o
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE s.residence_type = 'HOSTEL'
-          AND o.advisor_status = 'APPROVED'
-          AND o.hod_status = 'APPROVED'
-          AND o.warden_status = 'PENDING'
-        ORDER BY o.created_at DESC
-    """)).mappings().all()
+    data = db.execute(st.WARDEN_PENDING_PREVIEW).mappings().all()
 
     return data
 
 @app.get("/warden/dashboard-stats")
 def warden_dashboard_stats(
     payload=Depends(get_current_user_soft),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    email = payload.get("sub") or payload.get("email")
-
-    # (Optional) ensure this user is a warden
-    warden = db.execute(
-        text("SELECT warden_id FROM wardens WHERE email=:e"),
-        {"e": email}
-    ).first()
+    if not payload:
+        raise HTTPException(401, "Invalid token")
 
-    if not warden:
+    # ensure this user is a warden
+    if not payload.get("warden_id"):
         raise HTTPException(403, "Not a warden")
 
-    stats = db.execute(text("""
-        SELECT
-            COUNT(*) AS total,
-            COUNT(*) FILTER (WHERE warden_status = 'PENDING') AS pending,
-            COUNT(*) FILTER (WHERE warden_status = 'APPROVED') AS approved,
-            COUNT(*) FILTER (WHERE warden_status = 'REJECTED') AS rejected
-        FROM outpass_requests
-        WHERE advisor_status = 'APPROVED' AND hod_status = 'APPROVED'
-    """)).mappings().first()
+    stats = db.execute(st.WARDEN_STATS).mappings().first()
 
     return stats
 
 @app.get("/warden/history")
 def warden_history(
+    response: Response,
+    page: Page = Depends(),
     user=Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if user["role"].lower() != "warden":
         raise HTTPException(403, "Only wardens allowed")
 
     warden_id = user.get("warden_id")
 
-    data = db.execute(text("""
-        SELECT
-            o.outpass_id AS id,
-            'outpass' AS type,
-            s.name AS studentName,
-            s.reg_no AS rollNumber,
-            s.department,
-            o.out_date AS outDate,
-            o.in_date AS inDate,
-            o.purpose,
-            o.warden_status AS status,
-            o.created_at AS submittedAt,   -- request created
-            o.out_date AS actedAt          -- TEMP: since no updated_at column
-        FROM outpass_requests o
-        JOIN hostel_floors hf ON hf.floor_id = o.floor_id
-        JOIN students s ON s.reg_no = o.reg_no
-        WHERE hf.warden_id = :wid
-          AND o.hod_status = 'APPROVED'
-          AND o.warden_status IN ('APPROVED','REJECTED')
-        ORDER BY o.outpass_id DESC
-    """), {"wid": warden_id}).mappings().all()
+    data = db.execute(page.statement(st.WARDEN_HISTORY), page.params(wid=warden_id)).mappings().all()
+
+    # No review timestamp on outpasses; outpass_id is the keyset
+    data, next_cursor = page.cut(data, "id")
+    set_next_cursor(response, next_cursor)
 
     return data
+
+
+@app.get("/warden/print-run")
+def warden_print_run(
+    request: Request,
+    day: Optional[date] = Query(None, alias="date"),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if user["role"].lower() != "warden":
+        raise HTTPException(403, "Only wardens allowed")
+
+    warden_id = user.get("warden_id")
+    day = day or date.today()
+
+    outpasses = db.execute(st.WARDEN_PRINT_RUN, {"wid": warden_id, "day": day}).mappings().all()
+    if not outpasses:
+        raise HTTPException(404, f"No approved outpasses for {day}")
+
+    docs = print_run_documents(outpasses)
+    db.close()
+
+    # The merged PDF's key covers every outpass in it: a new approval or
+    # any change to one of them is a new key, a new ETag and a re-render
+    stamp = Stamp(f'"{documents_key(docs)}"', None)
+    cached = not_modified("warden.print_run", request, None, stamp)
+    if cached:
+        return cached
+
+    try:
+        pdf_path = render_documents(docs, f"print_run_{warden_id}_{day}.pdf")
+    except RendererBusy:
+        raise HTTPException(503, "Document renderer busy, try again shortly", headers={"Retry-After": "5"})
+    except RenderTimeout:
+        raise HTTPException(503, "Print run took too long to render", headers={"Retry-After": "30"})
+    except RenderError:
+        raise HTTPException(500, "Print run could not be rendered")
+
+    return FileResponse(
+        pdf_path,
+        media_type="application/pdf",
+        filename=os.path.basename(pdf_path),
+        content_disposition_type="inline",
+        headers=validator_headers(stamp),
+    )
+
+
 @app.get("/leave/detail/{leave_id}")
 def get_leave_detail(
     leave_id: int,
+    request: Request,
+    response: Response,
     payload=Depends(get_current_user_soft),   # works for student & advisor tokens
     db: Session = Depends(get_db)
 ):
@@ -3705,36 +2682,13 @@ def get_leave_detail(
     if role not in ["student", "advisor"]:
         raise HTTPException(403, "Not allowed")
 
+    stamp = version_stamp(db, st.REQUEST_VERSION, {"rtype": "LEAVE", "rid": leave_id})
+    cached = not_modified("leave.detail", request, response, stamp)
+    if cached:
+        return cached
+
     data = db.execute(
-        text("""
-            SELECT
-                l.leave_id AS id,
-                'leave' AS type,
-
-                -- 👤 Student Info
-                s.name AS studentName,
-                s.reg_no AS rollNumber,
-                s.department,
-                s.email AS studentEmail,
-
-                -- 📄 Leave Details
-                l.category,
-                l.start_date AS startDate,
-                l.end_date AS endDate,
-                l.reason,
-
-                -- 📊 Status Info
-                l.status,
-                l.advisor_remark AS advisorComment,
-
-                -- ⏱ Dates
-                l.applied_at AS createdAt,
-                l.advisor_reviewed_at AS advisorActedAt
-
-            FROM leave_requests l
-            JOIN students s ON s.reg_no = l.reg_no
-            WHERE l.leave_id = :id
-        """),
+        st.LEAVE_DETAIL,
         {"id": leave_id}
     ).mappings().first()
 
@@ -0,0 +1,194 @@
+"""
+Archive tier for closed requests (migrations/0012_request_archive.sql).
+
+Closed requests older than ARCHIVE_AFTER_SEMESTERS move from the live
+request tables to <table>_archive, partitioned by academic year. The
+live tables then only hold open requests and recent history, which is
+all the queues, history pages and stats ever read. Deleting a live row
+runs the usual triggers, so request_feed, request_counters and the
+version stamps drop archived requests as well.
+
+Rows move in batches of ARCHIVE_BATCH_ROWS, one transaction each, with
+DELETE ... RETURNING feeding the INSERT so a row is never in both
+tiers. Rows locked by a running review are skipped until the next run.
+"""
+
+import os
+from datetime import date
+from typing import NamedTuple
+
+from sqlalchemy import text
+
+ARCHIVE_AFTER_SEMESTERS = int(os.getenv("ARCHIVE_AFTER_SEMESTERS", "4"))
+ARCHIVE_BATCH_ROWS = int(os.getenv("ARCHIVE_BATCH_ROWS", "5000"))
+
+# New archive partitions go here when set (e.g. a tablespace on cheaper disks)
+ARCHIVE_TABLESPACE = os.getenv("ARCHIVE_TABLESPACE")
+
+# Academic years (and the two semesters in them) start in June
+ACADEMIC_YEAR_START_MONTH = 6
+
+
+class ArchiveSpec(NamedTuple):
+    table: str
+    key: str
+    stamp: str                       # partition column
+    closed: str                      # SQL predicate for rows that may be archived
+    children: tuple = ()             # (table, column referencing key)
+
+
+ARCHIVE_TABLES = (
+    ArchiveSpec("leave_requests", "leave_id", "applied_at", "overall_status <> 'PENDING'"),
+    ArchiveSpec("bonafide_requests", "request_id", "applied_at", "overall_status <> 'PENDING'"),
+    ArchiveSpec("outpass_requests", "outpass_id", "created_at", "overall_status <> 'PENDING'"),
+    ArchiveSpec(
+        "od_requests", "od_id", "created_at", "overall_status <> 'PENDING'",
+        children=(("od_proofs", "od_id"),),
+    ),
+    ArchiveSpec("complaints", "complaint_id", "created_at", "status = 'RESOLVED'"),
+)
+
+
+# -------------------------------------------------
+# ACADEMIC CALENDAR
+# -------------------------------------------------
+def academic_year(day: date) -> int:
+    """The year an academic year starts in: June 2024 - May 2025 is 2024."""
+    return day.year if day.month >= ACADEMIC_YEAR_START_MONTH else day.year - 1
+
+
+def academic_year_bounds(year: int) -> tuple[date, date]:
+    return date(year, ACADEMIC_YEAR_START_MONTH, 1), date(year + 1, ACADEMIC_YEAR_START_MONTH, 1)
+
+
+def archive_cutoff(semesters: int, today: date | None = None) -> date:
+    """Start of the semester `semesters` before the current one."""
+    today = today or date.today()
+    months = today.year * 12 + today.month - ACADEMIC_YEAR_START_MONTH
+    start = (months // 6 - semesters) * 6 + ACADEMIC_YEAR_START_MONTH - 1
+    return date(start // 12, start % 12 + 1, 1)
+
+
+# -------------------------------------------------
+# PARTITIONS
+# -------------------------------------------------
+def partition_name(spec: ArchiveSpec, year: int) -> str:
+    return f"{spec.table}_archive_{year}"
+
+
+def ensure_partitions(conn, spec: ArchiveSpec, first_year: int, last_year: int) -> list[str]:
+    """Create the missing yearly archive partitions; returns the names created."""
+    created = []
+
+    for year in range(first_year, last_year + 1):
+        name = partition_name(spec, year)
+        if conn.execute(text("SELECT to_regclass(:n)"), {"n": name}).scalar():
+            continue
+
+        start, end = academic_year_bounds(year)
+        tablespace = f" TABLESPACE {ARCHIVE_TABLESPACE}" if ARCHIVE_TABLESPACE else ""
+        conn.execute(text(
+            f"CREATE TABLE {name} PARTITION OF {spec.table}_archive "
+            f"FOR VALUES FROM ('{start}') TO ('{end}'){tablespace}"
+        ))
+        created.append(name)
+
+    return created
+
+
+def create_partitions(engine, years_ahead: int = 1) -> list[str]:
+    """
+    Archive partitions from the oldest live row's academic year through
+    years_ahead past the current one, so archive runs never have to
+    create one.
+    """
+    created = []
+    last_year = academic_year(date.today()) + years_ahead
+
+    for spec in ARCHIVE_TABLES:
+        with engine.begin() as conn:
+            oldest = conn.execute(text(f"SELECT MIN({spec.stamp}) FROM {spec.table}")).scalar()
+            first_year = academic_year(oldest) if oldest else academic_year(date.today())
+            created += ensure_partitions(conn, spec, first_year, last_year)
+
+    return created
+
+
+# -------------------------------------------------
+# MOVING ROWS
+# -------------------------------------------------
+def _columns(conn, table: str) -> list[str]:
+    return list(conn.execute(text("""
+        SELECT column_name
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :t
+        ORDER BY ordinal_position
+    """), {"t": table}).scalars())
+
+
+def _move_sql(conn, table: str, where: str) -> str:
+    columns = _columns(conn, table)
+    missing = set(columns) - set(_columns(conn, f"{table}_archive"))
+    if missing:
+        raise RuntimeError(f"{table}_archive is missing columns: {', '.join(sorted(missing))}")
+
+    cols = ", ".join(f'"{c}"' for c in columns)
+    return f"""
+        WITH moved AS (
+            DELETE FROM {table}
+            WHERE {where}
+            RETURNING {cols}
+        )
+        INSERT INTO {table}_archive ({cols})
+        SELECT {cols} FROM moved
+    """
+
+
+def archive_table(engine, spec: ArchiveSpec, cutoff: date, batch_rows: int = ARCHIVE_BATCH_ROWS) -> int:
+    """Move spec's closed rows from before cutoff to its archive; returns the count."""
+    with engine.begin() as conn:
+        oldest = conn.execute(
+            text(f"SELECT MIN({spec.stamp}) FROM {spec.table} WHERE {spec.closed} AND {spec.stamp} < :cutoff"),
+            {"cutoff": cutoff},
+        ).scalar()
+        if oldest is None:
+            return 0
+
+        ensure_partitions(conn, spec, academic_year(oldest), academic_year(cutoff))
+
+        move_rows = text(_move_sql(conn, spec.table, f"{spec.key} = ANY(:ids) AND {spec.closed}"))
+        move_children = [
+            text(_move_sql(conn, child, f"{column} = ANY(:ids)")) for child, column in spec.children
+        ]
+
+    pick = text(f"""
+        SELECT {spec.key}
+        FROM {spec.table}
+        WHERE {spec.closed}
+          AND {spec.stamp} < :cutoff
+        ORDER BY {spec.stamp}
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    """)
+
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            ids = list(conn.execute(pick, {"cutoff": cutoff, "n": batch_rows}).scalars())
+            if not ids:
+                break
+
+            # Children first: their foreign keys point at the live rows
+            for statement in move_children:
+                conn.execute(statement, {"ids": ids})
+            moved += conn.execute(move_rows, {"ids": ids}).rowcount
+
+        if len(ids) < batch_rows:
+            break
+
+    return moved
+
+
+def archive_requests(engine, semesters: int = ARCHIVE_AFTER_SEMESTERS) -> dict[str, int]:
+    cutoff = archive_cutoff(semesters)
+    return {spec.table: archive_table(engine, spec, cutoff) for spec in ARCHIVE_TABLES}
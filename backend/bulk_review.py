@@ -0,0 +1,108 @@
+"""
+Bulk approve / reject for the advisor, HOD and warden inboxes.
+
+A bulk review applies every item in one transaction: the items are
+grouped by request type and each group is one set-based UPDATE ...
+RETURNING (statements.BULK_REVIEW), with the same eligibility guards as
+the single review endpoints. Items the UPDATE did not return were
+already reviewed by someone else, are not at this approver's stage yet,
+or don't exist; they are reported per item rather than failing the
+batch.
+
+Each group first locks its rows in id order (statements.BULK_REVIEW_LOCK)
+and the groups run in a fixed type order, so overlapping batches can't
+deadlock each other. A deadlock with some other statement is retried
+once by the caller (database.deadlocked).
+
+The caller queues the mail / PDF jobs for the updated rows in the same
+transaction (jobs.py) and commits once.
+"""
+
+import os
+
+from fastapi import HTTPException
+
+import statements as st
+
+BULK_REVIEW_MAX_ITEMS = int(os.getenv("BULK_REVIEW_MAX_ITEMS", "200"))
+
+REVIEW_STATUSES = ("APPROVED", "REJECTED")
+
+
+def apply_bulk_review(db, role: str, actor_id, items) -> tuple[list[dict], list[dict]]:
+    """
+    Run the bulk UPDATEs for role on db (not committed).
+
+    Returns (results, updated): one result per item in request order,
+    and the updated rows, each with its "type", "status" and "remark"
+    from the item.
+    """
+    if len(items) > BULK_REVIEW_MAX_ITEMS:
+        raise HTTPException(400, f"At most {BULK_REVIEW_MAX_ITEMS} items per bulk review")
+
+    statements = st.BULK_REVIEW[role]
+    results = []
+    groups: dict[str, dict[int, dict]] = {}
+
+    for item in items:
+        rtype = item.type.upper()
+        result = {"type": rtype, "id": item.id, "status": item.status}
+        results.append(result)
+
+        if rtype not in statements:
+            result.update(result="invalid", detail="Invalid request type")
+        elif item.status not in REVIEW_STATUSES:
+            result.update(result="invalid", detail="Invalid status")
+        elif item.id in groups.get(rtype, {}):
+            result.update(result="invalid", detail="Duplicate item")
+        else:
+            groups.setdefault(rtype, {})[item.id] = {"result": result, "remark": item.remark}
+
+    updated = []
+    for rtype, group in sorted(groups.items()):
+        ids = list(group)
+        db.execute(st.BULK_REVIEW_LOCK[rtype], {"ids": ids})
+        rows = db.execute(statements[rtype], {
+            "ids": ids,
+            "statuses": [group[i]["result"]["status"] for i in ids],
+            "remarks": [group[i]["remark"] for i in ids],
+            "actor": actor_id,
+        }).mappings().all()
+
+        for row in rows:
+            entry = group.pop(row["item_id"])
+            entry["result"]["result"] = "updated"
+            updated.append({
+                **row,
+                "type": rtype,
+                "status": entry["result"]["status"],
+                "remark": entry["remark"],
+            })
+
+        if not group:
+            continue
+
+        # Skipped by the guards: report where each one stands now
+        states = {
+            row["item_id"]: row
+            for row in db.execute(st.REQUEST_STATES[rtype], {"ids": list(group)}).mappings()
+        }
+        for item_id, entry in group.items():
+            state = states.get(item_id)
+            if state is None:
+                entry["result"]["result"] = "not_found"
+            else:
+                entry["result"].update(
+                    result="conflict",
+                    overall_status=state["overall_status"],
+                    current_stage=state["current_stage"],
+                )
+
+    return results, updated
+
+
+def summarize(results: list[dict]) -> dict:
+    counts = {"updated": 0, "conflict": 0, "not_found": 0, "invalid": 0}
+    for result in results:
+        counts[result["result"]] += 1
+    return {"results": results, **counts}
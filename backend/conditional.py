@@ -0,0 +1,100 @@
+"""
+Conditional GET for the approver queues and request detail endpoints.
+
+Each response depends on a few version stamps in request_versions
+(migrations/0009_request_versions.sql), bumped by triggers on every
+apply and review. The endpoint looks the stamps up first - one small
+query that doesn't touch the request tables - and turns them into an
+ETag / Last-Modified pair. When the client's If-None-Match already
+carries that ETag it gets a 304 and the queue query and JSON encoding
+are skipped.
+
+Issued PDFs (/documents/...) use the same check with their cache key as
+the ETag and a long max-age instead of no-cache.
+"""
+
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Bump when a response shape changes so clients drop their cached copies
+RESPONSE_VERSION = "1"
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class Stamp(NamedTuple):
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def version_stamp(db, statement, params: dict) -> Stamp:
+    row = db.execute(statement, params).first()
+    return Stamp(f'W/"{RESPONSE_VERSION}-{row.tag}"', row.modified)
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison: W/"x" and "x" are the same validator
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def validator_headers(stamp: Stamp, cache_control: str = "private, no-cache") -> dict:
+    headers = {"ETag": stamp.etag, "Cache-Control": cache_control}
+    if stamp.last_modified is not None:
+        modified = stamp.last_modified
+        if modified.tzinfo is None:
+            modified = modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(
+            modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def not_modified(
+    name: str,
+    request: Request,
+    response: Response | None,
+    stamp: Stamp,
+    cache_control: str = "private, no-cache",
+):
+    """
+    Put the validators on response and return a 304 Response if the
+    client's copy is current, else None (build the body as usual).
+    """
+    headers = validator_headers(stamp, cache_control)
+    if_none_match = request.headers.get("if-none-match")
+    hit = bool(if_none_match) and _matches(if_none_match, stamp.etag)
+
+    with _stats_lock:
+        entry = _stats.setdefault(name, {"requests": 0, "conditional": 0, "not_modified": 0})
+        entry["requests"] += 1
+        entry["conditional"] += bool(if_none_match)
+        entry["not_modified"] += hit
+
+    if hit:
+        return Response(status_code=304, headers=headers)
+
+    if response is not None:
+        response.headers.update(headers)
+    return None
+
+
+def conditional_stats() -> dict:
+    with _stats_lock:
+        snapshot = {name: dict(entry) for name, entry in _stats.items()}
+
+    for entry in snapshot.values():
+        entry["hit_rate"] = (
+            round(entry["not_modified"] / entry["requests"], 3) if entry["requests"] else 0.0
+        )
+
+    return snapshot
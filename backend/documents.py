@@ -0,0 +1,314 @@
+"""
+Documents and mail for reviewed requests: the bonafide certificate, the
+hostel outpass and leave form PDFs (Jinja2 templates from the shared
+template service in template_service.py, the PDF conversion done by the
+renderer pool in renderer.py), and the SMTP senders.
+
+Generated PDFs live in the content-addressed cache (pdf_cache.py):
+generating a document whose template and data haven't changed returns
+the PDF rendered last time.
+
+Kept out of app.py so the job worker (worker.py) can render and send
+without importing the web app.
+"""
+
+import os
+import smtplib
+from email.message import EmailMessage
+from typing import NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+import statements as st
+from pdf_cache import cache_key, pdf_cache
+from renderer import render_pdf
+from template_service import render_template, templates
+
+
+TEMPLATE_MAP = {
+    "SCHOLARSHIP": "scholarship_bonafide.html",
+    "EDUCATIONAL_LOAN": "educational_loan_bonafide.html",
+    "INTERNSHIP": "internship_bonafide.html",
+    "GENERAL": "general_bonafide.html"
+}
+
+
+class Document(NamedTuple):
+    template: str
+    filename: str
+    context: dict
+    options: dict
+
+
+def document_key(doc: Document) -> str:
+    return cache_key(doc.template, templates.version(doc.template), doc.context, doc.options)
+
+
+def render_document(doc: Document) -> str:
+    """Path of the PDF for doc, rendered only on a cache miss."""
+    def render(pdf_path):
+        render_pdf(render_template(doc.template, **doc.context), pdf_path, doc.options)
+
+    return pdf_cache.get_or_render(document_key(doc), doc.filename, render)
+
+
+def documents_key(docs: list[Document]) -> str:
+    """Key of the merged PDF of docs: changes when any one of them does."""
+    return cache_key("merged", ",".join(document_key(doc) for doc in docs), {}, {})
+
+
+def render_documents(docs: list[Document], filename: str) -> str:
+    """Path of one multi-page PDF of docs, rendered in a single renderer call on a cache miss."""
+    def render(pdf_path):
+        pages = [render_template(doc.template, **doc.context) for doc in docs]
+        render_pdf(pages, pdf_path, docs[0].options)
+
+    return pdf_cache.get_or_render(documents_key(docs), filename, render)
+
+
+def bonafide_document(data) -> Document:
+    template_name = TEMPLATE_MAP.get(data["category"], "general_bonafide.html")
+
+    options = {
+        "page-size": "A4",
+        "encoding": "UTF-8",
+        "enable-local-file-access": "",
+        "quiet": ""
+    }
+
+    return Document(template_name, f"bonafide_{data['request_id']}.pdf", data, options)
+
+
+def generate_bonafide_pdf(data):
+    return render_document(bonafide_document(data))
+
+
+# -------------------------------
+# EMAIL SENDER
+# -------------------------------
+def send_bonafide_email(to_email: str, pdf_path: str):
+    import smtplib, ssl
+    from email.message import EmailMessage
+
+    msg = EmailMessage()
+    msg["Subject"] = "Bonafide Certificate Approved"
+    msg["From"] = os.getenv("SENDER_MAIL")
+    msg["To"] = to_email
+    msg.set_content(
+        "Dear Student,\n\n"
+        "Your bonafide certificate has been approved.\n"
+        "Please find the attached PDF.\n\n"
+        "Regards,\nCollege Administration"
+    )
+
+    with open(pdf_path, "rb") as f:
+        msg.add_attachment(
+            f.read(),
+            maintype="application",
+            subtype="pdf",
+            filename="bonafide_certificate.pdf"
+        )
+
+    context = ssl.create_default_context()
+
+    with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as smtp:
+        smtp.login(os.getenv("SENDER_MAIL"), os.getenv("APP_PASSWORD"))
+        smtp.send_message(msg)
+
+
+# -------------------------------
+# HOSTEL OUTPASS / LEAVE FORM
+# -------------------------------
+def outpass_days(outpass) -> int:
+    if outpass["in_date"]:
+        return (outpass["in_date"] - outpass["out_date"]).days + 1
+    return 1
+
+
+def outpass_document(outpass) -> Document:
+    # Dated by when the outpass was raised rather than when it is
+    # rendered, so a re-render of the same outpass is a cache hit
+    context = dict(
+        name=outpass["name"],
+        date=outpass["created_at"].strftime("%d-%m-%Y"),
+        department=outpass["department"],
+        year_of_study=outpass["year_of_study"],
+        room_no=outpass["room_no"],
+        parent_mobile=outpass["parent_mobile"],
+        student_mobile=outpass["contact_number"],
+        purpose=outpass["purpose"],
+        out_date=outpass["out_date"],
+        in_date=outpass["in_date"],
+        out_time=outpass["out_time"],
+        in_time=outpass["in_time"]
+    )
+
+    options = {
+        "page-size": "A4",
+        "encoding": "UTF-8",
+        "enable-local-file-access": None
+    }
+
+    return Document("hostel_outpass.html", f"outpass_{outpass['outpass_id']}.pdf", context, options)
+
+def generate_outpass_pdf(outpass: dict):
+    return render_document(outpass_document(outpass))
+
+def leave_document(outpass) -> Document:
+    """
+    Leave form for a multi-day hostel outpass
+    """
+
+    # -------------------------------------------------
+    # TEMPLATE DATA (logo / verified images come from the template service)
+    # -------------------------------------------------
+    context = dict(
+        name=outpass["name"],
+        department=outpass["department"],
+        year_of_study=outpass["year_of_study"],
+        room_no=outpass["room_no"],
+        parent_mobile=outpass["parent_mobile"],
+        student_mobile=outpass["contact_number"],
+        purpose=outpass["purpose"],
+        out_date=outpass["out_date"],
+        in_date=outpass["in_date"],
+        out_time=outpass["out_time"],
+        in_time=outpass["in_time"]
+    )
+
+    # -------------------------------------------------
+    # PDF OPTIONS
+    # -------------------------------------------------
+    options = {
+        "page-size": "A4",
+        "encoding": "UTF-8",
+        "enable-local-file-access": None
+    }
+
+    return Document("hostel_leaveform.html", f"leave_{outpass['outpass_id']}.pdf", context, options)
+
+def generate_leave_pdf(outpass: dict) -> str:
+    """
+    Generates Leave PDF for multi-day hostel outpass
+    Returns absolute pdf path
+    """
+    return render_document(leave_document(outpass))
+
+
+# -------------------------------
+# MAIL
+# -------------------------------
+def send_mail_with_pdfs(to_email, subject, body, pdf_paths: list[str]):
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = os.getenv("SENDER_MAIL")
+    msg["To"] = to_email
+    msg.set_content(body)
+
+    for path in pdf_paths:
+        if path:
+            with open(path, "rb") as f:
+                msg.add_attachment(
+                    f.read(),
+                    maintype="application",
+                    subtype="pdf",
+                    filename=os.path.basename(path)
+                )
+
+    with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
+        smtp.login(
+            os.getenv("SENDER_MAIL"),
+            os.getenv("APP_PASSWORD")
+        )
+        smtp.send_message(msg)
+
+
+def fetch_bonafide_certificate_data(db: Session, request_id: int):
+    data = db.execute(st.BONAFIDE_DOCUMENT, {"rid": request_id}).mappings().first()
+
+    if not data:
+        raise HTTPException(404, "Bonafide request not found")
+
+    data = dict(data)
+
+    # Derived fields
+    year_map = {1: "I", 2: "II", 3: "III", 4: "IV"}
+    data["year_roman"] = year_map.get(data["year_of_study"], "")
+    data["course"] = data["department"]
+    data["academic_year"] = f"{data['applied_at'].year}-{data['applied_at'].year + 1}"
+
+    return data
+
+
+# -------------------------------
+# ISSUED DOCUMENTS (download)
+# -------------------------------
+DOCUMENT_TYPES = ("bonafide", "outpass", "leave")
+
+
+def outpass_issued(outpass) -> bool:
+    # A day scholar's outpass is final at the HOD (no warden stage), and
+    # its overall_status never moves to APPROVED
+    if outpass["residence_type"] == "DAY_SCHOLAR":
+        return outpass["hod_status"] == "APPROVED"
+    return outpass["overall_status"] == "APPROVED"
+
+
+def load_document(db: Session, doc_type: str, doc_id: int) -> tuple[Document, str]:
+    """The issued document doc_type / doc_id and the reg_no it belongs to."""
+    if doc_type == "bonafide":
+        data = fetch_bonafide_certificate_data(db, doc_id)
+        if data["hod_status"] != "APPROVED":
+            raise HTTPException(409, "Bonafide certificate not issued yet")
+        return bonafide_document(data), data["reg_no"]
+
+    if doc_type not in DOCUMENT_TYPES:
+        raise HTTPException(404, "Unknown document type")
+
+    outpass = db.execute(st.OUTPASS_DOCUMENT, {"oid": doc_id}).mappings().first()
+    if outpass is None:
+        raise HTTPException(404, "Outpass request not found")
+    if not outpass_issued(outpass):
+        raise HTTPException(409, "Outpass not approved yet")
+
+    if doc_type == "outpass":
+        return outpass_document(outpass), outpass["reg_no"]
+
+    # Leave forms are issued with the warden's approval of a multi-day outpass
+    if outpass["warden_status"] != "APPROVED" or outpass_days(outpass) <= 1:
+        raise HTTPException(404, "No leave form for this outpass")
+    return leave_document(outpass), outpass["reg_no"]
+
+
+# Token claim holding each staff role's id
+STAFF_ID_CLAIMS = {"advisor": "advisor_id", "hod": "hod_id", "warden": "warden_id"}
+
+
+def can_access_document(db: Session, user: dict, doc_type: str, doc_id: int, reg_no: str) -> bool:
+    """Whether user may download doc_type / doc_id, which belongs to reg_no."""
+    role = (user.get("role") or "").lower()
+    if role == "student":
+        return user.get("reg_no") == reg_no
+
+    claim = STAFF_ID_CLAIMS.get(role)
+    if claim is None or not user.get(claim):
+        return False
+    # Wardens only see outpasses (and their leave forms)
+    if role == "warden" and doc_type == "bonafide":
+        return False
+
+    return bool(db.execute(
+        st.DOCUMENT_ACCESS[role],
+        {"uid": user[claim], "reg_no": reg_no, "doc_id": doc_id},
+    ).scalar())
+
+
+def print_run_documents(outpasses) -> list[Document]:
+    """Outpass, and leave form past one day, for each warden-approved outpass."""
+    docs = []
+    for outpass in outpasses:
+        docs.append(outpass_document(outpass))
+        if outpass_days(outpass) > 1:
+            docs.append(leave_document(outpass))
+    return docs
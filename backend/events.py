@@ -0,0 +1,338 @@
+"""
+Server-Sent Events for the approver inboxes.
+
+Postgres sends every inbox event (migrations/0010_request_events.sql) on
+the request_events NOTIFY channel. Each worker keeps ONE asyncpg
+connection LISTENing on it and fans the events out in-process to the
+subscribed streams by scope, so open tabs cost a queue each rather than
+a database connection or a poll.
+
+A stream sends a comment line every SSE_HEARTBEAT_SECONDS to keep
+proxies from closing it. Events carry their request_events id; a client
+that reconnects with Last-Event-ID (EventSource does this by itself) is
+replayed what it missed from the request_events table first. The same
+replay covers events missed while the listener itself was reconnecting,
+and a subscriber too slow to keep up is disconnected and catches up
+the same way.
+
+request_events ids are taken at INSERT, not at commit, so events arrive
+out of id order whenever two transactions commit the other way round.
+Ids are therefore never used as a high-water mark: streams (and the
+listener) remember the ids they recently sent and skip only those, and
+a replay also looks back SSE_REPLAY_LOOKBACK_SECONDS before the
+Last-Event-ID for lower ids that committed later. A reconnecting client
+may see an event twice; events are hints to refetch, so that is
+harmless, where a dropped one is not.
+
+The same connection listens on identity.IDENTITY_CHANNEL and drops the
+worker's cached identity claims for advisors whose sections changed.
+"""
+
+import asyncio
+import json
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+
+import asyncpg
+from fastapi.responses import StreamingResponse
+
+import statements as st
+from database import async_engine, fetch_all, libpq_dsn
+from identity import IDENTITY_CHANNEL, invalidate_identity
+
+EVENTS_CHANNEL = "request_events"
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "256"))
+SSE_REPLAY_LIMIT = int(os.getenv("SSE_REPLAY_LIMIT", "500"))
+
+# Longer than any apply / review transaction: how late an event can
+# commit after a higher id was already sent
+SSE_REPLAY_LOOKBACK_SECONDS = float(os.getenv("SSE_REPLAY_LOOKBACK_SECONDS", "60"))
+
+# Event ids remembered per stream (and by the listener) for dedupe
+SSE_DEDUPE_WINDOW = int(os.getenv("SSE_DEDUPE_WINDOW", "1024"))
+
+# Put on a subscriber's queue when it overflowed; the stream then ends
+_OVERFLOW = object()
+
+
+class RecentIds:
+    """The last `size` event ids seen, for dedupe without a high-water mark."""
+
+    def __init__(self, size: int = SSE_DEDUPE_WINDOW):
+        self._order = deque()
+        self._ids = set()
+        self._size = size
+
+    def __contains__(self, event_id) -> bool:
+        return event_id in self._ids
+
+    def add(self, event_id) -> bool:
+        """Remember event_id; False if it was already there."""
+        if event_id in self._ids:
+            return False
+        self._ids.add(event_id)
+        self._order.append(event_id)
+        if len(self._order) > self._size:
+            self._ids.discard(self._order.popleft())
+        return True
+
+
+class Subscriber:
+    def __init__(self, scopes):
+        self.scopes = frozenset(scopes)
+        self.queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        self.overflowed = False
+        self.sent = RecentIds()
+
+    def push(self, event: dict) -> bool:
+        if self.overflowed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(_OVERFLOW)
+            return False
+
+
+class EventHub:
+    """One LISTEN connection per worker, fanned out to every subscriber."""
+
+    def __init__(self, dsn: str, channel: str = EVENTS_CHANNEL):
+        self.dsn = libpq_dsn(dsn)
+        self.channel = channel
+        self._by_scope: dict[str, set[Subscriber]] = {}
+        self._task: asyncio.Task | None = None
+        self._last_id = 0
+        self._seen = RecentIds()
+        self._stats = {
+            "subscribers": 0,
+            "notifications": 0,
+            "delivered": 0,
+            "overflows": 0,
+            "replayed": 0,
+            "reconnects": 0,
+            "connected": False,
+        }
+
+    # -------------------------------------------------
+    # LISTENER
+    # -------------------------------------------------
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                await conn.add_listener(self.channel, self._on_notify)
+                await conn.add_listener(IDENTITY_CHANNEL, self._on_identity)
+
+                # Section changes may have been missed while disconnected
+                invalidate_identity()
+
+                # Anything committed while we were not listening,
+                # including lower ids that committed late; _dispatch
+                # skips the ones already delivered
+                if self._last_id:
+                    rows = await conn.fetch(
+                        """
+                        SELECT * FROM request_events
+                        WHERE id > $1
+                           OR created_at >= (SELECT created_at FROM request_events WHERE id = $1)
+                                            - make_interval(secs => $2)
+                        ORDER BY id
+                        """,
+                        self._last_id, SSE_REPLAY_LOOKBACK_SECONDS,
+                    )
+                    for row in rows:
+                        self._dispatch(_event_from_row(row))
+
+                self._stats["connected"] = True
+                backoff = 1
+
+                # Notifications arrive via the callback; this only
+                # notices a dead connection
+                while True:
+                    await asyncio.sleep(SSE_HEARTBEAT_SECONDS)
+                    await conn.fetchval("SELECT 1")
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Event listener error:", e)
+            finally:
+                self._stats["connected"] = False
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+            self._stats["reconnects"] += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _on_notify(self, conn, pid, channel, payload):
+        self._stats["notifications"] += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        self._dispatch(event)
+
+    def _on_identity(self, conn, pid, channel, payload):
+        # Empty payload: no email to go by, drop every entry
+        invalidate_identity(payload or None)
+
+    def _dispatch(self, event: dict):
+        if not self._seen.add(event["id"]):
+            return
+        self._last_id = max(self._last_id, event["id"])
+
+        targets = set()
+        for scope in event.get("scopes") or ():
+            targets.update(self._by_scope.get(scope, ()))
+
+        for subscriber in targets:
+            was_overflowed = subscriber.overflowed
+            if subscriber.push(event):
+                self._stats["delivered"] += 1
+            elif not was_overflowed:
+                self._stats["overflows"] += 1
+
+    # -------------------------------------------------
+    # SUBSCRIBERS
+    # -------------------------------------------------
+    @asynccontextmanager
+    async def subscribe(self, scopes):
+        self.start()
+        subscriber = Subscriber(scopes)
+
+        for scope in subscriber.scopes:
+            self._by_scope.setdefault(scope, set()).add(subscriber)
+        self._stats["subscribers"] += 1
+
+        try:
+            yield subscriber
+        finally:
+            for scope in subscriber.scopes:
+                subs = self._by_scope.get(scope)
+                if subs is not None:
+                    subs.discard(subscriber)
+                    if not subs:
+                        del self._by_scope[scope]
+            self._stats["subscribers"] -= 1
+
+    async def replay(self, scopes, after_id: int) -> list[dict]:
+        """
+        Events for scopes that may have committed after after_id was
+        sent, oldest first: every higher id, and lower ids from the
+        lookback window.
+        """
+        # Pooled primary connection: events are written there and a burst
+        # of reconnecting clients must not each open a connection
+        rows = await fetch_all(
+            st.REQUEST_EVENTS_SINCE,
+            {
+                "after_id": after_id,
+                "scopes": list(scopes),
+                "lookback": SSE_REPLAY_LOOKBACK_SECONDS,
+                "limit": SSE_REPLAY_LIMIT,
+            },
+            bind=async_engine,
+        )
+
+        self._stats["replayed"] += len(rows)
+        return [_event_from_row(row) for row in rows]
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["scopes"] = len(self._by_scope)
+        stats["last_event_id"] = self._last_id
+        return stats
+
+
+def _event_from_row(row) -> dict:
+    event = dict(row)
+    event["scopes"] = list(event["scopes"])
+    if not isinstance(event["created_at"], str):
+        event["created_at"] = event["created_at"].isoformat()
+    return event
+
+
+def format_event(event: dict) -> str:
+    data = {
+        "type": event["request_type"],
+        "id": event["request_id"],
+        "status": event["status"],
+        "stage": event["stage"],
+        "at": event["created_at"],
+    }
+    return f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(data)}\n\n"
+
+
+async def event_stream(hub: EventHub, request, scopes, last_event_id: int | None):
+    """Body of an SSE response: replay, then live events and heartbeats."""
+    async with hub.subscribe(scopes) as subscriber:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+
+        sent = subscriber.sent
+        if last_event_id is not None:
+            sent.add(last_event_id)
+            missed = await hub.replay(scopes, last_event_id)
+            for event in missed:
+                if sent.add(event["id"]):
+                    yield format_event(event)
+
+            # Gone too long to replay everything: reload the whole inbox
+            if len(missed) >= SSE_REPLAY_LIMIT:
+                yield "event: resync\ndata: {}\n\n"
+
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=SSE_HEARTBEAT_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+
+            if event is _OVERFLOW:
+                # The client reconnects with Last-Event-ID and replays
+                return
+
+            # Already sent during the replay
+            if not sent.add(event["id"]):
+                continue
+
+            yield format_event(event)
+
+
+def sse_response(hub: EventHub, request, scopes):
+    raw = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        last_event_id = int(raw) if raw else None
+    except ValueError:
+        last_event_id = None
+
+    return StreamingResponse(
+        event_stream(hub, request, scopes, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,73 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Rows are read through a server-side cursor (stream_results + yield_per)
+and written out one batch at a time, so an export holds at most
+EXPORT_BATCH_ROWS rows in memory however large it is.
+
+The generator opens its own connection: the request's session is closed
+by the time the response body is being sent.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import date, datetime, time
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_chunk(rows, columns=None) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if columns is not None:
+        writer.writerow(columns)
+    writer.writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def stream_rows(bind, statement, params: dict, fmt: str):
+    with bind.connect() as conn:
+        result = conn.execution_options(
+            stream_results=True, yield_per=EXPORT_BATCH_ROWS
+        ).execute(statement, params)
+
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            yield _csv_chunk([], columns)
+
+        for batch in result.partitions():
+            if fmt == "csv":
+                yield _csv_chunk(batch)
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+                    for row in batch
+                ).encode("utf-8")
+
+
+def export_response(bind, statement, params: dict, fmt: str, filename: str):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(400, f"format must be one of {', '.join(EXPORT_FORMATS)}")
+
+    return StreamingResponse(
+        stream_rows(bind, statement, params, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
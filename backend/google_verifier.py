@@ -0,0 +1,231 @@
+"""
+Google ID token verification with a pooled HTTP session and an
+in-process cache of Google's signing certificates.
+
+google.oauth2.id_token.verify_oauth2_token() opens a new HTTP session and
+downloads the certs on every call. Here the certs are fetched once, kept
+for the Cache-Control max-age Google sends, and refreshed in the
+background shortly before they expire, so a login only pays for the
+signature check.
+
+When the certs do have to be fetched on a login, one thread fetches and
+the others wait for its result instead of each calling Google. If the
+key server is down, the last certs are served past their max-age (Google
+overlaps its keys by days) while the background thread keeps retrying
+every MIN_REFRESH_INTERVAL.
+
+Set GOOGLE_CERTS_URL to point the verifier at a local stand-in key server
+(same JSON shape: {"kid": "-----BEGIN CERTIFICATE-----..."}).
+"""
+
+import os
+import re
+import threading
+import time
+
+import requests as http
+from requests.adapters import HTTPAdapter
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt as google_jwt
+
+GOOGLE_CERTS_URL = os.getenv(
+    "GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs"
+)
+GOOGLE_ISSUERS = {"accounts.google.com", "https://accounts.google.com"}
+
+DEFAULT_MAX_AGE = 3600          # used when Cache-Control is missing
+REFRESH_MARGIN = 300            # refresh this many seconds before expiry
+MIN_REFRESH_INTERVAL = 30       # never hammer the key server
+CLOCK_SKEW = 10
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def _parse_max_age(cache_control: str | None) -> int:
+    if not cache_control:
+        return DEFAULT_MAX_AGE
+    match = _MAX_AGE_RE.search(cache_control)
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class GoogleTokenVerifier:
+    def __init__(self, client_id: str | None, certs_url: str = GOOGLE_CERTS_URL,
+                 pool_size: int = 10, timeout: float = 5.0):
+        self.client_id = client_id
+        self.certs_url = certs_url
+        self.timeout = timeout
+
+        # One pooled session for the lifetime of the process
+        self.session = http.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._certs: dict[str, str] = {}
+        self._expires_at = 0.0
+        self._last_fetch = 0.0
+        self._last_attempt = 0.0
+        self._generation = 0            # bumped as each fetch ends, ok or not
+        self._refresher: threading.Thread | None = None
+        self._stop = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "cert_fetches": 0,
+            "cert_fetch_errors": 0,
+            "stale_served": 0,
+            "verified": 0,
+            "rejected": 0,
+            "verify_time_total_ms": 0.0,
+            "verify_time_max_ms": 0.0,
+        }
+
+    # -------------------------------------------------
+    # CERT CACHE
+    # -------------------------------------------------
+    def _fetch_certs(self) -> dict[str, str]:
+        self._bump("cert_fetches")
+        with self._lock:
+            self._last_attempt = time.time()
+
+        try:
+            response = self.session.get(self.certs_url, timeout=self.timeout)
+            response.raise_for_status()
+            certs = response.json()
+        except (http.RequestException, ValueError):
+            self._bump("cert_fetch_errors")
+            with self._lock:
+                self._generation += 1
+            raise
+
+        max_age = _parse_max_age(response.headers.get("Cache-Control"))
+
+        with self._lock:
+            self._certs = certs
+            self._expires_at = time.time() + max_age
+            self._last_fetch = time.time()
+            self._generation += 1
+
+        return certs
+
+    def _get_certs(self, kid: str | None = None) -> dict[str, str]:
+        with self._lock:
+            certs = self._certs
+            fresh = time.time() < self._expires_at
+            attempted = self._last_attempt
+            generation = self._generation
+
+        # A kid we don't know usually means Google rotated keys early
+        if certs and fresh and (kid is None or kid in certs):
+            self._bump("cache_hits")
+            return certs
+
+        # Fetched (or failed to) moments ago: don't hammer the key server
+        if certs and time.time() - attempted < MIN_REFRESH_INTERVAL:
+            self._bump("cache_hits" if fresh else "stale_served")
+            return certs
+
+        self._bump("cache_misses")
+        self._ensure_refresher()
+
+        with self._fetch_lock:
+            # Another login fetched while this one waited: use its result
+            with self._lock:
+                if self._generation != generation:
+                    if not self._certs:
+                        raise google_exceptions.TransportError("Google certs unavailable")
+                    return self._certs
+
+            try:
+                return self._fetch_certs()
+            except Exception:
+                if not certs:
+                    raise
+                self._bump("stale_served")
+                return certs
+
+    def _ensure_refresher(self):
+        if self._refresher and self._refresher.is_alive():
+            return
+
+        self._refresher = threading.Thread(
+            target=self._refresh_loop, name="google-certs-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                wait = self._expires_at - REFRESH_MARGIN - time.time()
+
+            if self._stop.wait(max(wait, MIN_REFRESH_INTERVAL)):
+                return
+
+            try:
+                self._fetch_certs()
+            except Exception as e:
+                print("Google cert refresh error:", e)
+
+    def stop(self):
+        self._stop.set()
+        self.session.close()
+
+    # -------------------------------------------------
+    # VERIFY
+    # -------------------------------------------------
+    def verify(self, token: str):
+        """Return the token claims, or None if the token is not valid."""
+        started = time.perf_counter()
+        try:
+            header = google_jwt.decode_header(token)
+            certs = self._get_certs(header.get("kid"))
+
+            claims = google_jwt.decode(
+                token,
+                certs=certs,
+                audience=self.client_id,
+                clock_skew_in_seconds=CLOCK_SKEW,
+            )
+
+            if claims.get("iss") not in GOOGLE_ISSUERS:
+                raise google_exceptions.GoogleAuthError("Wrong issuer")
+
+            self._bump("verified")
+            return claims
+
+        except Exception:
+            self._bump("rejected")
+            return None
+
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._stats_lock:
+                self._stats["verify_time_total_ms"] += elapsed_ms
+                self._stats["verify_time_max_ms"] = max(
+                    self._stats["verify_time_max_ms"], elapsed_ms
+                )
+
+    # -------------------------------------------------
+    # METRICS
+    # -------------------------------------------------
+    def _bump(self, key: str):
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._lock:
+            stats["cached_keys"] = len(self._certs)
+            stats["cache_expires_in"] = max(0, round(self._expires_at - time.time()))
+
+        calls = stats["verified"] + stats["rejected"]
+        stats["verify_time_avg_ms"] = (
+            round(stats["verify_time_total_ms"] / calls, 3) if calls else 0.0
+        )
+        stats["certs_url"] = self.certs_url
+        return stats
@@ -0,0 +1,165 @@
+"""
+Approver identity claims.
+
+At login the role-specific ids (advisor_id, hod_id, warden_id,
+incharge_id), the department and an advisor's section assignments are
+resolved once and minted into the JWT. Tokens carrying the current
+IDENTITY_VERSION are trusted as-is; older tokens are resolved from the
+database and kept in a short TTL cache keyed by email.
+
+The SSE streams subscribe by these claims for as long as they stay
+open, so they take them from the cache rather than the token (see
+stream_identity). Changes to section_advisors arrive on IDENTITY_CHANNEL
+(migrations/0018_identity_notify.sql) and each worker's event listener
+passes them to invalidate_identity.
+"""
+
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Bump when the set of identity claims changes so old tokens fall back
+IDENTITY_VERSION = 1
+IDENTITY_CACHE_TTL = 300
+IDENTITY_CHANNEL = "identity_changed"
+
+IDENTITY_QUERIES = {
+    "advisor": text("""
+        SELECT
+            a.advisor_id,
+            a.department,
+            COALESCE(
+                json_agg(
+                    json_build_object(
+                        'department', sa.department,
+                        'section', sa.section,
+                        'year_of_study', sa.year_of_study
+                    )
+                ) FILTER (WHERE sa.advisor_id IS NOT NULL),
+                '[]'
+            ) AS sections
+        FROM advisors a
+        LEFT JOIN section_advisors sa ON sa.advisor_id = a.advisor_id
+        WHERE a.email = :email
+        GROUP BY a.advisor_id, a.department
+    """),
+    "hod": text("SELECT hod_id, department FROM hods WHERE email = :email"),
+    "warden": text("SELECT warden_id FROM wardens WHERE email = :email"),
+    "incharge": text("""
+        SELECT incharge_id, department
+        FROM department_incharges
+        WHERE email = :email
+    """),
+}
+
+_cache: dict[str, tuple[float, dict]] = {}
+_cache_lock = threading.Lock()
+
+
+def resolve_identity(db: Session, email: str, role: str) -> dict:
+    """Look up the identity claims for a user. Students need none."""
+    query = IDENTITY_QUERIES.get(role)
+    if query is None:
+        return {}
+
+    row = db.execute(query, {"email": email}).mappings().first()
+    return _remember(email, dict(row) if row else {})
+
+
+async def resolve_identity_async(engine, email: str, role: str) -> dict:
+    """resolve_identity on an AsyncEngine, for the async endpoints."""
+    query = IDENTITY_QUERIES.get(role)
+    if query is None:
+        return {}
+
+    async with engine.connect() as conn:
+        row = (await conn.execute(query, {"email": email})).mappings().first()
+    return _remember(email, dict(row) if row else {})
+
+
+def _remember(email: str, claims: dict) -> dict:
+    with _cache_lock:
+        _cache[email] = (time.monotonic() + IDENTITY_CACHE_TTL, claims)
+    return claims
+
+
+def cached_identity(email: str) -> dict | None:
+    """Cached claims for email, or None when missing or expired."""
+    with _cache_lock:
+        cached = _cache.get(email)
+
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def identity_claims(db: Session, email: str, role: str) -> dict:
+    """Claims for a token minted before IDENTITY_VERSION, via the TTL cache."""
+    claims = cached_identity(email)
+    if claims is not None:
+        return claims
+
+    return resolve_identity(db, email, role)
+
+
+def apply_identity(payload: dict, db: Session) -> dict:
+    """Fill identity claims into a decoded token payload in place."""
+    if payload.get("idv") == IDENTITY_VERSION:
+        return payload
+
+    role = (payload.get("role") or "").lower()
+    email = payload.get("sub") or payload.get("email")
+
+    if email and role in IDENTITY_QUERIES:
+        for key, value in identity_claims(db, email, role).items():
+            payload.setdefault(key, value)
+
+    return payload
+
+
+async def apply_identity_async(payload: dict, engine) -> dict:
+    """apply_identity without a sync Session (see resolve_identity_async)."""
+    if payload.get("idv") == IDENTITY_VERSION:
+        return payload
+
+    role = (payload.get("role") or "").lower()
+    email = payload.get("sub") or payload.get("email")
+
+    if email and role in IDENTITY_QUERIES:
+        claims = cached_identity(email)
+        if claims is None:
+            claims = await resolve_identity_async(engine, email, role)
+        for key, value in claims.items():
+            payload.setdefault(key, value)
+
+    return payload
+
+
+def stream_identity(payload: dict, session_factory) -> dict:
+    """
+    Overwrite the identity claims of a stream's token with the current
+    ones; a session is only opened on a cache miss.
+    """
+    role = (payload.get("role") or "").lower()
+    email = payload.get("sub") or payload.get("email")
+
+    if not email or role not in IDENTITY_QUERIES:
+        return payload
+
+    claims = cached_identity(email)
+    if claims is None:
+        with session_factory() as db:
+            claims = resolve_identity(db, email, role)
+
+    payload.update(claims)
+    return payload
+
+
+def invalidate_identity(email: str | None = None):
+    with _cache_lock:
+        if email is None:
+            _cache.clear()
+        else:
+            _cache.pop(email, None)
@@ -0,0 +1,64 @@
+"""
+Postgres-backed job queue (migrations/0013_jobs.sql).
+
+Review endpoints enqueue their PDF / mail work on the request's own
+session, before committing: the job row commits or rolls back together
+with the status UPDATE, and the worker (worker.py) is woken by a NOTIFY
+on the jobs channel once it does. Jobs carry ids rather than documents;
+the worker reads the current row when it runs.
+
+    kind                  payload
+    mail                  to, subject, body
+    bonafide.certificate  request_id       render + mail the certificate
+    outpass.approved      outpass_id, by   render + mail the outpass
+                                           (and leave form), by hod | warden
+"""
+
+import json
+import os
+from typing import NamedTuple, Optional
+
+import statements as st
+
+JOBS_CHANNEL = "jobs"
+
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "30"))
+JOB_MAX_BACKOFF_SECONDS = float(os.getenv("JOB_MAX_BACKOFF_SECONDS", "3600"))
+
+# A running job whose worker hasn't finished it by then is requeued
+JOB_LOCK_TIMEOUT_SECONDS = float(os.getenv("JOB_LOCK_TIMEOUT_SECONDS", "600"))
+
+
+class Job(NamedTuple):
+    kind: str
+    payload: dict
+    request_type: Optional[str] = None
+    request_id: Optional[int] = None
+
+
+def mail_job(to_email: str, subject: str, body: str, request_type=None, request_id=None) -> Job:
+    return Job("mail", {"to": to_email, "subject": subject, "body": body}, request_type, request_id)
+
+
+def enqueue_many(db, jobs: list[Job]) -> list[dict]:
+    """Insert jobs on db (not committed); returns their id, request_type, request_id."""
+    if not jobs:
+        return []
+
+    rows = db.execute(st.JOB_ENQUEUE, {
+        "kinds": [job.kind for job in jobs],
+        "payloads": [json.dumps(job.payload, default=str) for job in jobs],
+        "request_types": [job.request_type for job in jobs],
+        "request_ids": [job.request_id for job in jobs],
+    }).mappings().all()
+    db.execute(st.JOB_NOTIFY)
+
+    return [dict(row) for row in rows]
+
+
+def enqueue_job(db, job: Job) -> int:
+    return enqueue_many(db, [job])[0]["id"]
+
+
+def enqueue(db, kind: str, payload: dict, request_type=None, request_id=None) -> int:
+    return enqueue_job(db, Job(kind, payload, request_type, request_id))
@@ -0,0 +1,232 @@
+"""
+Maintenance commands.
+
+    python manage.py migrate [status]           # apply pending migrations (run before starting the app)
+    python manage.py refresh-advisor-students   # rebuild advisor_students
+    python manage.py refresh-request-feed       # rebuild request_feed
+    python manage.py reconcile-counters [--fix] # report / repair request_counters drift
+    python manage.py prune-request-events [hours] # drop SSE replay events (default 24h)
+    python manage.py prune-jobs [days]          # drop finished jobs (default 14 days)
+    python manage.py prune-pdf-cache            # evict PDFs until under PDF_CACHE_MAX_BYTES
+    python manage.py explain <statement> [key=value ...]
+                                                # EXPLAIN ANALYZE a statements.REGISTRY entry
+    python manage.py create-archive-partitions [years]
+                                                # yearly archive partitions, [years] ahead (default 1)
+    python manage.py archive-requests [semesters] # move closed requests to the archive tier
+    python manage.py bench-renderer [count] [backend]
+                                                # PDFs/sec: the old pdfkit path, then the renderer
+                                                # pool at 1, 4, 8 workers
+"""
+
+import os
+import sys
+import time
+
+from sqlalchemy import text
+
+from database import engine
+
+
+def migrate(command="up", *args):
+    import migrate as migrations
+
+    if command == "status":
+        migrations.status(engine)
+        return
+    names = migrations.upgrade(engine, verbose=True)
+    print(f"{len(names)} migration(s) applied")
+
+
+def refresh_advisor_students(*args):
+    with engine.begin() as conn:
+        conn.execute(text("SELECT refresh_advisor_students()"))
+        count = conn.execute(text("SELECT COUNT(*) FROM advisor_students")).scalar()
+    print(f"advisor_students rebuilt: {count} rows")
+
+
+def refresh_request_feed(*args):
+    with engine.begin() as conn:
+        conn.execute(text("SELECT refresh_request_feed()"))
+        count = conn.execute(text("SELECT COUNT(*) FROM request_feed")).scalar()
+    print(f"request_feed rebuilt: {count} rows")
+
+
+def reconcile_counters(*args):
+    fix = "--fix" in args
+
+    with engine.begin() as conn:
+        drift = conn.execute(text("""
+            SELECT scope_type, scope_id, request_type, status, counted, expected
+            FROM request_counters_drift
+            ORDER BY scope_type, scope_id, request_type, status
+        """)).all()
+
+        for row in drift:
+            print(
+                f"{row.scope_type:8} {row.scope_id:30} {row.request_type:9} "
+                f"{row.status:9} counted={row.counted} expected={row.expected}"
+            )
+        print(f"{len(drift)} drifted counter(s)")
+
+        if drift and fix:
+            conn.execute(text("SELECT refresh_request_counters()"))
+            print("request_counters rebuilt")
+
+    if drift and not fix:
+        sys.exit(2)
+
+
+def prune_request_events(hours="24", *args):
+    with engine.begin() as conn:
+        deleted = conn.execute(
+            text("DELETE FROM request_events WHERE created_at < now() - make_interval(hours => :h)"),
+            {"h": int(hours)}
+        ).rowcount
+    print(f"request_events pruned: {deleted} rows")
+
+
+def prune_jobs(days="14", *args):
+    with engine.begin() as conn:
+        deleted = conn.execute(
+            text("DELETE FROM jobs WHERE finished_at < now() - make_interval(days => :d)"),
+            {"d": int(days)}
+        ).rowcount
+    print(f"jobs pruned: {deleted} rows")
+
+
+def prune_pdf_cache(*args):
+    from pdf_cache import pdf_cache
+
+    removed = pdf_cache.evict()
+    stats = pdf_cache.stats()
+    print(f"PDF cache: {removed} bytes evicted, {stats['entries']} entries, {stats['bytes']} / {stats['max_bytes']} bytes")
+
+
+def explain(name=None, *args):
+    import statements
+
+    if name not in statements.REGISTRY:
+        print("Known statements:")
+        for known in sorted(statements.REGISTRY):
+            print(f"  {known}")
+        sys.exit(1)
+
+    params = dict(arg.split("=", 1) for arg in args)
+    sql = str(statements.REGISTRY[name])
+
+    # EXPLAIN ANALYZE runs the statement; roll back in case it writes
+    with engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars()
+        print("\n".join(plan))
+        conn.rollback()
+
+
+def create_archive_partitions(years="1", *args):
+    import archive
+
+    created = archive.create_partitions(engine, int(years))
+    for name in created:
+        print(f"created {name}")
+    print(f"{len(created)} archive partition(s) created")
+
+
+def archive_requests(semesters=None, *args):
+    import archive
+
+    semesters = int(semesters) if semesters else archive.ARCHIVE_AFTER_SEMESTERS
+    print(f"archiving closed requests from before {archive.archive_cutoff(semesters)}")
+
+    for table, moved in archive.archive_requests(engine, semesters).items():
+        print(f"{table:20} {moved} row(s) archived")
+
+
+def bench_renderer(count="40", backend=None, *args):
+    import tempfile
+    from concurrent.futures import wait
+    from datetime import date
+
+    import renderer
+    from renderer import RendererPool
+    from template_service import render_template
+
+    count = int(count)
+    backend = backend or renderer.RENDERER_BACKEND
+    html = render_template(
+        "hostel_leaveform.html",
+        name="Bench Student",
+        department="CSE",
+        year_of_study=3,
+        room_no="A-101",
+        parent_mobile="9000000000",
+        student_mobile="9000000001",
+        purpose="Renderer benchmark",
+        out_date=date.today(),
+        in_date=date.today(),
+        out_time="09:00",
+        in_time="18:00",
+    )
+    options = {"page-size": "A4", "encoding": "UTF-8", "enable-local-file-access": None}
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Baseline: what every PDF used to cost, pdfkit.from_string (one
+        # wkhtmltopdf process each) in the calling thread
+        try:
+            import pdfkit
+            config = pdfkit.configuration(wkhtmltopdf=renderer.WKHTMLTOPDF_PATH)
+            started = time.perf_counter()
+            for i in range(count):
+                pdfkit.from_string(
+                    html, os.path.join(out_dir, f"bench_pdfkit_{i}.pdf"),
+                    options=options, configuration=config
+                )
+            elapsed = time.perf_counter() - started
+            print(f"pdfkit, in thread: {count / elapsed:7.2f} PDFs/sec  avg {elapsed / count * 1000:.0f} ms")
+        except (ImportError, OSError) as e:
+            print(f"pdfkit, in thread: skipped ({e})")
+
+        for workers in (1, 4, 8):
+            pool = RendererPool(workers=workers, queue_limit=count, backend=backend)
+            try:
+                pool.start()    # warm-up is not part of the measurement
+            except renderer.RenderError as e:
+                print(f"{backend}, {workers} worker(s): skipped ({e})")
+                continue
+
+            started = time.perf_counter()
+            futures = [
+                pool.submit(html, os.path.join(out_dir, f"bench_{workers}_{i}.pdf"), options)
+                for i in range(count)
+            ]
+            wait(futures)
+            elapsed = time.perf_counter() - started
+
+            stats = pool.stats()
+            pool.shutdown()
+            print(
+                f"{backend}, {workers} worker(s): {count / elapsed:7.2f} PDFs/sec  "
+                f"avg {stats['render_ms_avg']:.0f} ms  max {stats['render_ms_max']:.0f} ms  "
+                f"failed {stats['failed'] + stats['timeouts']}"
+            )
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "refresh-advisor-students": refresh_advisor_students,
+    "refresh-request-feed": refresh_request_feed,
+    "reconcile-counters": reconcile_counters,
+    "prune-request-events": prune_request_events,
+    "prune-jobs": prune_jobs,
+    "prune-pdf-cache": prune_pdf_cache,
+    "explain": explain,
+    "create-archive-partitions": create_archive_partitions,
+    "archive-requests": archive_requests,
+    "bench-renderer": bench_renderer,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit(1)
+
+    COMMANDS[sys.argv[1]](*sys.argv[2:])
@@ -0,0 +1,199 @@
+"""
+Versioned schema migrations.
+
+Migrations are plain SQL files in migrations/, named NNNN_description.sql
+and applied in order. Applied versions are recorded in schema_migrations.
+A file whose first line is "-- migrate: no-transaction" runs statement by
+statement in autocommit mode (needed for CREATE INDEX CONCURRENTLY);
+every other file runs in a single transaction.
+
+    python manage.py migrate          # apply pending migrations
+    python manage.py migrate status   # list applied / pending
+
+Run them as a deploy step, before starting the app workers, not from
+the workers themselves (AUTO_MIGRATE is off by default). Several
+migrations build indexes CONCURRENTLY or rewrite tables, and a CREATE
+INDEX CONCURRENTLY waits for every open snapshot, including those of
+other processes waiting to migrate.
+
+Only one process migrates at a time (pg_try_advisory_lock). The others
+either return at once (wait=False, the app's AUTO_MIGRATE) or poll for
+the lock without holding a transaction open.
+
+A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, which
+"IF NOT EXISTS" would then skip forever. Invalid indexes are dropped
+before each no-transaction migration runs, and a migration that leaves
+one behind is not recorded as applied.
+"""
+
+import os
+import re
+import sys
+import time
+
+from sqlalchemy import text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+# Any constant works; keeps two workers from migrating at the same time
+ADVISORY_LOCK_ID = 727_001
+LOCK_POLL_SECONDS = 2
+
+_FILE_RE = re.compile(r"^(\d{4})_[\w-]+\.sql$")
+
+
+def available_migrations() -> list[tuple[str, str]]:
+    found = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = _FILE_RE.match(name)
+        if match:
+            found.append((match.group(1), name))
+    return found
+
+
+def _split_statements(sql: str) -> list[str]:
+    # Migrations end every statement with ";" at end of line. Function
+    # bodies are dollar-quoted and kept whole.
+    statements, current, in_dollar = [], [], False
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith("--")):
+            continue
+        current.append(line)
+        if line.count("$$") % 2:
+            in_dollar = not in_dollar
+        if not in_dollar and line.rstrip().endswith(";"):
+            statements.append("\n".join(current).strip())
+            current = []
+    if "\n".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+
+def _ensure_table(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    VARCHAR(4) PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+
+
+def applied_versions(engine) -> set[str]:
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def invalid_indexes(conn) -> list[str]:
+    return list(conn.execute(text("""
+        SELECT quote_ident(n.nspname) || '.' || quote_ident(c.relname)
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE NOT i.indisvalid
+          AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+    """)).scalars())
+
+
+def _drop_invalid_indexes(conn, verbose: bool):
+    # Safe while we hold the migration lock: no other CONCURRENTLY build
+    # of ours can be in progress
+    for index in invalid_indexes(conn):
+        if verbose:
+            print(f"Dropping invalid index {index}")
+        conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+
+def _acquire_lock(lock_conn, wait: bool) -> bool:
+    # Polled with pg_try_advisory_lock rather than blocking in
+    # pg_advisory_lock: a blocked statement holds a snapshot, and the
+    # migrating process's CREATE INDEX CONCURRENTLY would wait on it
+    while True:
+        got = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID}
+        ).scalar()
+        if got or not wait:
+            return got
+        time.sleep(LOCK_POLL_SECONDS)
+
+
+def upgrade(engine, verbose: bool = False, wait: bool = True) -> list[str] | None:
+    """
+    Apply every pending migration. Returns the names applied, or None if
+    another process holds the migration lock and wait is False.
+    """
+    applied = []
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        if not _acquire_lock(lock_conn, wait):
+            if verbose:
+                print("Another process is running migrations")
+            return None
+        try:
+            done = applied_versions(engine)
+
+            for version, name in available_migrations():
+                if version in done:
+                    continue
+
+                with open(os.path.join(MIGRATIONS_DIR, name), encoding="utf-8") as f:
+                    sql = f.read()
+
+                if verbose:
+                    print(f"Applying {name}")
+
+                if sql.lstrip().startswith(NO_TRANSACTION):
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        _drop_invalid_indexes(conn, verbose)
+                        for statement in _split_statements(sql):
+                            conn.exec_driver_sql(statement)
+
+                        left = invalid_indexes(conn)
+                        if left:
+                            raise RuntimeError(f"{name} left invalid indexes: {', '.join(left)}")
+
+                        conn.execute(
+                            text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                            {"v": version, "n": name}
+                        )
+                else:
+                    with engine.begin() as conn:
+                        for statement in _split_statements(sql):
+                            conn.exec_driver_sql(statement)
+                        conn.execute(
+                            text("INSERT INTO schema_migrations (version, name) VALUES (:v, :n)"),
+                            {"v": version, "n": name}
+                        )
+
+                applied.append(name)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+    return applied
+
+
+def status(engine):
+    done = applied_versions(engine)
+    for version, name in available_migrations():
+        print(f"{'applied' if version in done else 'pending'}  {name}")
+
+    with engine.connect() as conn:
+        for index in invalid_indexes(conn):
+            print(f"INVALID  {index}")
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "up"
+
+    if command == "status":
+        status(engine)
+    elif command == "up":
+        names = upgrade(engine, verbose=True)
+        print(f"{len(names)} migration(s) applied")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,2 @@
+-- google_login upserts users with ON CONFLICT (email)
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email);
@@ -0,0 +1,75 @@
+-- migrate: no-transaction
+-- Indexes behind the pending / history / dashboard queries in app.py.
+-- Built CONCURRENTLY so they can be applied to a live database.
+
+-- ================= IDENTITY LOOKUPS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_email ON students (email);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_advisors_email ON advisors (email);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hods_email ON hods (email);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_wardens_email ON wardens (email);
+
+-- ================= STUDENTS <-> SECTION ADVISORS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_section
+    ON students (department, section, year_of_study) INCLUDE (reg_no);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_section_advisors_advisor
+    ON section_advisors (advisor_id, department, section, year_of_study);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_section_advisors_section
+    ON section_advisors (department, section, year_of_study);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_hostel_floors_warden ON hostel_floors (warden_id);
+
+-- ================= LEAVE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_reg_applied
+    ON leave_requests (reg_no, applied_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_pending
+    ON leave_requests (reg_no, applied_at DESC) WHERE status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_acted_advisor
+    ON leave_requests (acted_advisor_id, reviewed_at DESC) WHERE status <> 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_reg_status
+    ON leave_requests (reg_no, status);
+
+-- ================= BONAFIDE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_reg_applied
+    ON bonafide_requests (reg_no, applied_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_advisor_pending
+    ON bonafide_requests (reg_no, applied_at DESC) WHERE advisor_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_hod_pending
+    ON bonafide_requests (hod_id, applied_at DESC)
+    WHERE advisor_status = 'APPROVED' AND hod_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_acted_advisor
+    ON bonafide_requests (acted_advisor_id, advisor_reviewed_at DESC)
+    WHERE advisor_status <> 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_hod_history
+    ON bonafide_requests (hod_id, hod_reviewed_at DESC) WHERE hod_status <> 'PENDING';
+
+-- ================= OUTPASS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_reg_created
+    ON outpass_requests (reg_no, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_advisor_pending
+    ON outpass_requests (reg_no, created_at DESC) WHERE advisor_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_hod_pending
+    ON outpass_requests (reg_no, created_at DESC)
+    WHERE advisor_status = 'APPROVED' AND hod_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_warden_pending
+    ON outpass_requests (floor_id, outpass_id DESC)
+    WHERE hod_status = 'APPROVED' AND warden_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_warden_history
+    ON outpass_requests (floor_id, outpass_id DESC)
+    WHERE warden_status IN ('APPROVED', 'REJECTED');
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_acted_advisor
+    ON outpass_requests (acted_advisor_id, created_at DESC)
+    WHERE advisor_status <> 'PENDING';
+
+-- ================= OD =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_reg_created
+    ON od_requests (reg_no, created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_advisor_pending
+    ON od_requests (reg_no, created_at DESC) WHERE advisor_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_hod_pending
+    ON od_requests (reg_no, created_at DESC)
+    WHERE advisor_status = 'APPROVED' AND hod_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_advisor_history
+    ON od_requests (advisor_reviewed_at DESC) WHERE advisor_status <> 'PENDING';
+
+-- ================= COMPLAINTS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_complaints_dept_created
+    ON complaints (department, created_at DESC);
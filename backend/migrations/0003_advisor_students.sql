@@ -0,0 +1,88 @@
+-- Advisor -> student assignment, materialized from students x section_advisors.
+-- Replaces the section_advisors subquery every advisor endpoint used to run.
+CREATE TABLE IF NOT EXISTS advisor_students (
+    advisor_id INTEGER NOT NULL,
+    reg_no     VARCHAR(20) NOT NULL,
+    PRIMARY KEY (advisor_id, reg_no)
+);
+
+CREATE INDEX IF NOT EXISTS idx_advisor_students_reg_no ON advisor_students (reg_no);
+
+-- Full rebuild (manage.py refresh-advisor-students)
+CREATE OR REPLACE FUNCTION refresh_advisor_students() RETURNS void AS $$
+BEGIN
+    DELETE FROM advisor_students;
+
+    INSERT INTO advisor_students (advisor_id, reg_no)
+    SELECT DISTINCT sa.advisor_id, s.reg_no
+    FROM students s
+    JOIN section_advisors sa
+      ON sa.department = s.department
+     AND sa.section = s.section
+     AND sa.year_of_study = s.year_of_study
+    WHERE sa.advisor_id IS NOT NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A student moved / joined / left
+CREATE OR REPLACE FUNCTION advisor_students_on_student() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM advisor_students WHERE reg_no = OLD.reg_no;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO advisor_students (advisor_id, reg_no)
+        SELECT sa.advisor_id, NEW.reg_no
+        FROM section_advisors sa
+        WHERE sa.department = NEW.department
+          AND sa.section = NEW.section
+          AND sa.year_of_study = NEW.year_of_study
+          AND sa.advisor_id IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A section was (re)assigned to an advisor
+CREATE OR REPLACE FUNCTION advisor_students_on_section() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM advisor_students ast
+        USING students s
+        WHERE ast.advisor_id = OLD.advisor_id
+          AND ast.reg_no = s.reg_no
+          AND s.department = OLD.department
+          AND s.section = OLD.section
+          AND s.year_of_study = OLD.year_of_study;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.advisor_id IS NOT NULL THEN
+        INSERT INTO advisor_students (advisor_id, reg_no)
+        SELECT NEW.advisor_id, s.reg_no
+        FROM students s
+        WHERE s.department = NEW.department
+          AND s.section = NEW.section
+          AND s.year_of_study = NEW.year_of_study
+        ON CONFLICT DO NOTHING;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_advisor_students_student ON students;
+CREATE TRIGGER trg_advisor_students_student
+    AFTER INSERT OR DELETE OR UPDATE OF reg_no, department, section, year_of_study
+    ON students
+    FOR EACH ROW EXECUTE FUNCTION advisor_students_on_student();
+
+DROP TRIGGER IF EXISTS trg_advisor_students_section ON section_advisors;
+CREATE TRIGGER trg_advisor_students_section
+    AFTER INSERT OR DELETE OR UPDATE
+    ON section_advisors
+    FOR EACH ROW EXECUTE FUNCTION advisor_students_on_section();
+
+SELECT refresh_advisor_students();
@@ -0,0 +1,143 @@
+-- One row per leave / bonafide / outpass / OD request with its overall
+-- status, current stage and who has to act on it next. Kept in sync by
+-- triggers on the four request tables, so every insert and review
+-- transition is reflected without the app having to remember.
+--
+--   stage     ADVISOR | HOD | WARDEN | CLOSED
+--   assignee  section:<dept>:<section>:<year>  (advisor stage)
+--             dept:<dept>                      (HOD stage)
+--             floor:<floor_id>                 (warden stage)
+CREATE TABLE IF NOT EXISTS request_feed (
+    request_type VARCHAR(10) NOT NULL,
+    request_id   INTEGER     NOT NULL,
+    reg_no       VARCHAR(20) NOT NULL,
+    status       VARCHAR(20) NOT NULL,
+    stage        VARCHAR(10) NOT NULL,
+    assignee     TEXT,
+    created_at   TIMESTAMP,
+    updated_at   TIMESTAMP   NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (request_type, request_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_request_feed_reg_created
+    ON request_feed (reg_no, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_request_feed_assignee
+    ON request_feed (assignee, status, created_at DESC);
+
+-- Derive a feed row from a request row (as jsonb, so one function
+-- serves all four tables)
+CREATE OR REPLACE FUNCTION request_feed_row(rtype TEXT, r JSONB) RETURNS request_feed AS $$
+DECLARE
+    f request_feed;
+    a TEXT;
+    h TEXT;
+    w TEXT;
+    st RECORD;
+BEGIN
+    f.request_type := rtype;
+    f.request_id := (r ->> CASE rtype
+                               WHEN 'LEAVE' THEN 'leave_id'
+                               WHEN 'BONAFIDE' THEN 'request_id'
+                               WHEN 'OUTPASS' THEN 'outpass_id'
+                               ELSE 'od_id'
+                           END)::INTEGER;
+    f.reg_no := r ->> 'reg_no';
+    f.created_at := COALESCE(r ->> 'applied_at', r ->> 'created_at')::TIMESTAMP;
+    f.updated_at := CURRENT_TIMESTAMP;
+
+    IF rtype = 'LEAVE' THEN
+        f.status := r ->> 'status';
+        f.stage := CASE WHEN f.status = 'PENDING' THEN 'ADVISOR' ELSE 'CLOSED' END;
+    ELSE
+        a := r ->> 'advisor_status';
+        h := r ->> 'hod_status';
+        w := CASE WHEN rtype = 'OUTPASS'
+                  THEN COALESCE(r ->> 'warden_status', 'PENDING')
+                  ELSE 'APPROVED' END;
+
+        f.status := CASE
+            WHEN a = 'REJECTED' OR h = 'REJECTED' OR w = 'REJECTED' THEN 'REJECTED'
+            WHEN a = 'APPROVED' AND h = 'APPROVED' AND w = 'APPROVED' THEN 'APPROVED'
+            ELSE 'PENDING'
+        END;
+
+        f.stage := CASE
+            WHEN f.status <> 'PENDING' THEN 'CLOSED'
+            WHEN a = 'PENDING' THEN 'ADVISOR'
+            WHEN h = 'PENDING' THEN 'HOD'
+            ELSE 'WARDEN'
+        END;
+    END IF;
+
+    IF f.stage IN ('ADVISOR', 'HOD') THEN
+        SELECT department, section, year_of_study INTO st
+        FROM students WHERE reg_no = f.reg_no;
+
+        f.assignee := CASE f.stage
+            WHEN 'ADVISOR' THEN 'section:' || st.department || ':' || st.section || ':' || st.year_of_study
+            ELSE 'dept:' || st.department
+        END;
+    ELSIF f.stage = 'WARDEN' THEN
+        f.assignee := 'floor:' || (r ->> 'floor_id');
+    END IF;
+
+    RETURN f;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION request_feed_sync() RETURNS trigger AS $$
+DECLARE
+    f request_feed;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        f := request_feed_row(TG_ARGV[0], to_jsonb(OLD));
+        DELETE FROM request_feed
+        WHERE request_type = f.request_type AND request_id = f.request_id;
+        RETURN NULL;
+    END IF;
+
+    f := request_feed_row(TG_ARGV[0], to_jsonb(NEW));
+
+    INSERT INTO request_feed
+    VALUES (f.*)
+    ON CONFLICT (request_type, request_id) DO UPDATE
+    SET reg_no     = EXCLUDED.reg_no,
+        status     = EXCLUDED.status,
+        stage      = EXCLUDED.stage,
+        assignee   = EXCLUDED.assignee,
+        created_at = EXCLUDED.created_at,
+        updated_at = EXCLUDED.updated_at;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_request_feed ON leave_requests;
+CREATE TRIGGER trg_request_feed AFTER INSERT OR UPDATE OR DELETE ON leave_requests
+    FOR EACH ROW EXECUTE FUNCTION request_feed_sync('LEAVE');
+
+DROP TRIGGER IF EXISTS trg_request_feed ON bonafide_requests;
+CREATE TRIGGER trg_request_feed AFTER INSERT OR UPDATE OR DELETE ON bonafide_requests
+    FOR EACH ROW EXECUTE FUNCTION request_feed_sync('BONAFIDE');
+
+DROP TRIGGER IF EXISTS trg_request_feed ON outpass_requests;
+CREATE TRIGGER trg_request_feed AFTER INSERT OR UPDATE OR DELETE ON outpass_requests
+    FOR EACH ROW EXECUTE FUNCTION request_feed_sync('OUTPASS');
+
+DROP TRIGGER IF EXISTS trg_request_feed ON od_requests;
+CREATE TRIGGER trg_request_feed AFTER INSERT OR UPDATE OR DELETE ON od_requests
+    FOR EACH ROW EXECUTE FUNCTION request_feed_sync('OD');
+
+-- Full rebuild (manage.py refresh-request-feed)
+CREATE OR REPLACE FUNCTION refresh_request_feed() RETURNS void AS $$
+BEGIN
+    DELETE FROM request_feed;
+
+    INSERT INTO request_feed SELECT (request_feed_row('LEAVE', to_jsonb(t))).* FROM leave_requests t;
+    INSERT INTO request_feed SELECT (request_feed_row('BONAFIDE', to_jsonb(t))).* FROM bonafide_requests t;
+    INSERT INTO request_feed SELECT (request_feed_row('OUTPASS', to_jsonb(t))).* FROM outpass_requests t;
+    INSERT INTO request_feed SELECT (request_feed_row('OD', to_jsonb(t))).* FROM od_requests t;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_request_feed();
@@ -0,0 +1,167 @@
+-- Dashboard counters, maintained by triggers inside the same transaction
+-- as every apply / review statement.
+--
+--   scope_type  scope_id                     status is the view of
+--   STUDENT     reg_no                       overall status
+--   SECTION     <dept>:<section>:<year>      advisor stage (advisor dashboards)
+--   DEPT        department                   HOD stage: PENDING only once advisor approved, else OTHER
+--   HOSTEL      *                            warden stage of HOD-approved outpasses
+CREATE TABLE IF NOT EXISTS request_counters (
+    scope_type   VARCHAR(10) NOT NULL,
+    scope_id     TEXT        NOT NULL,
+    request_type VARCHAR(10) NOT NULL,
+    status       VARCHAR(20) NOT NULL,
+    count        BIGINT      NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope_type, scope_id, request_type, status)
+);
+
+-- Counter keys a single request row contributes to
+CREATE OR REPLACE FUNCTION request_counter_keys(rtype TEXT, r JSONB)
+RETURNS TABLE (scope_type TEXT, scope_id TEXT, status TEXT) AS $$
+DECLARE
+    f request_feed;
+    st RECORD;
+    a TEXT;
+    h TEXT;
+BEGIN
+    f := request_feed_row(rtype, r);
+
+    SELECT s.department, s.section, s.year_of_study INTO st
+    FROM students s WHERE s.reg_no = f.reg_no;
+
+    scope_type := 'STUDENT'; scope_id := f.reg_no; status := f.status;
+    RETURN NEXT;
+
+    a := CASE WHEN rtype = 'LEAVE' THEN r ->> 'status' ELSE r ->> 'advisor_status' END;
+    scope_type := 'SECTION';
+    scope_id := COALESCE(st.department, '') || ':' || COALESCE(st.section, '') || ':'
+                || COALESCE(st.year_of_study::TEXT, '');
+    status := COALESCE(a, 'OTHER');
+    RETURN NEXT;
+
+    IF rtype <> 'LEAVE' THEN
+        h := r ->> 'hod_status';
+        scope_type := 'DEPT';
+        scope_id := COALESCE(st.department, '');
+        status := CASE
+            WHEN h IN ('APPROVED', 'REJECTED') THEN h
+            WHEN a = 'APPROVED' AND h = 'PENDING' THEN 'PENDING'
+            ELSE 'OTHER'
+        END;
+        RETURN NEXT;
+    END IF;
+
+    IF rtype = 'OUTPASS' AND a = 'APPROVED' AND h = 'APPROVED' THEN
+        scope_type := 'HOSTEL';
+        scope_id := '*';
+        status := COALESCE(r ->> 'warden_status', 'OTHER');
+        RETURN NEXT;
+    END IF;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION request_counters_sync() RETURNS trigger AS $$
+DECLARE
+    old_keys TEXT[] := '{}';
+    new_keys TEXT[] := '{}';
+    k RECORD;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT array_agg(x.scope_type || '|' || x.scope_id || '|' || x.status) INTO old_keys
+        FROM request_counter_keys(TG_ARGV[0], to_jsonb(OLD)) x;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT array_agg(x.scope_type || '|' || x.scope_id || '|' || x.status) INTO new_keys
+        FROM request_counter_keys(TG_ARGV[0], to_jsonb(NEW)) x;
+    END IF;
+
+    -- Updates that don't move the request between buckets are free
+    IF old_keys IS NOT DISTINCT FROM new_keys THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        FOR k IN SELECT * FROM request_counter_keys(TG_ARGV[0], to_jsonb(OLD)) LOOP
+            UPDATE request_counters c
+            SET count = c.count - 1
+            WHERE c.scope_type = k.scope_type
+              AND c.scope_id = k.scope_id
+              AND c.request_type = TG_ARGV[0]
+              AND c.status = k.status;
+        END LOOP;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        FOR k IN SELECT * FROM request_counter_keys(TG_ARGV[0], to_jsonb(NEW)) LOOP
+            INSERT INTO request_counters (scope_type, scope_id, request_type, status, count)
+            VALUES (k.scope_type, k.scope_id, TG_ARGV[0], k.status, 1)
+            ON CONFLICT (scope_type, scope_id, request_type, status)
+            DO UPDATE SET count = request_counters.count + 1;
+        END LOOP;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_request_counters ON leave_requests;
+CREATE TRIGGER trg_request_counters AFTER INSERT OR UPDATE OR DELETE ON leave_requests
+    FOR EACH ROW EXECUTE FUNCTION request_counters_sync('LEAVE');
+
+DROP TRIGGER IF EXISTS trg_request_counters ON bonafide_requests;
+CREATE TRIGGER trg_request_counters AFTER INSERT OR UPDATE OR DELETE ON bonafide_requests
+    FOR EACH ROW EXECUTE FUNCTION request_counters_sync('BONAFIDE');
+
+DROP TRIGGER IF EXISTS trg_request_counters ON outpass_requests;
+CREATE TRIGGER trg_request_counters AFTER INSERT OR UPDATE OR DELETE ON outpass_requests
+    FOR EACH ROW EXECUTE FUNCTION request_counters_sync('OUTPASS');
+
+DROP TRIGGER IF EXISTS trg_request_counters ON od_requests;
+CREATE TRIGGER trg_request_counters AFTER INSERT OR UPDATE OR DELETE ON od_requests
+    FOR EACH ROW EXECUTE FUNCTION request_counters_sync('OD');
+
+-- Counts recomputed from the base tables
+CREATE OR REPLACE VIEW request_counters_expected AS
+SELECT k.scope_type, k.scope_id, t.request_type, k.status, COUNT(*)::BIGINT AS count
+FROM (
+    SELECT 'LEAVE' AS request_type, to_jsonb(x) AS r FROM leave_requests x
+    UNION ALL
+    SELECT 'BONAFIDE', to_jsonb(x) FROM bonafide_requests x
+    UNION ALL
+    SELECT 'OUTPASS', to_jsonb(x) FROM outpass_requests x
+    UNION ALL
+    SELECT 'OD', to_jsonb(x) FROM od_requests x
+) t
+CROSS JOIN LATERAL request_counter_keys(t.request_type, t.r) k
+GROUP BY k.scope_type, k.scope_id, t.request_type, k.status;
+
+-- Rows where the maintained counters drifted from the base tables
+CREATE OR REPLACE VIEW request_counters_drift AS
+SELECT
+    COALESCE(c.scope_type, e.scope_type) AS scope_type,
+    COALESCE(c.scope_id, e.scope_id) AS scope_id,
+    COALESCE(c.request_type, e.request_type) AS request_type,
+    COALESCE(c.status, e.status) AS status,
+    COALESCE(c.count, 0) AS counted,
+    COALESCE(e.count, 0) AS expected
+FROM request_counters c
+FULL OUTER JOIN request_counters_expected e
+  ON e.scope_type = c.scope_type
+ AND e.scope_id = c.scope_id
+ AND e.request_type = c.request_type
+ AND e.status = c.status
+WHERE COALESCE(c.count, 0) <> COALESCE(e.count, 0);
+
+-- Full rebuild (manage.py reconcile-counters --fix)
+CREATE OR REPLACE FUNCTION refresh_request_counters() RETURNS void AS $$
+BEGIN
+    DELETE FROM request_counters;
+
+    INSERT INTO request_counters (scope_type, scope_id, request_type, status, count)
+    SELECT scope_type, scope_id, request_type, status, count
+    FROM request_counters_expected;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_request_counters();
@@ -0,0 +1,120 @@
+-- Stored overall_status / current_stage on every request table, so
+-- "which requests are still open, and with whom" is a plain column
+-- predicate (and indexable, see 0007) instead of a CASE over the
+-- advisor / HOD / warden statuses.
+--
+--   overall_status  PENDING | APPROVED | REJECTED
+--   current_stage   ADVISOR | HOD | WARDEN | CLOSED
+--
+-- Adding a stored generated column rewrites the table once.
+
+-- ================= LEAVE =================
+ALTER TABLE leave_requests
+    ADD COLUMN IF NOT EXISTS overall_status VARCHAR(20)
+        GENERATED ALWAYS AS (status) STORED,
+    ADD COLUMN IF NOT EXISTS current_stage VARCHAR(10)
+        GENERATED ALWAYS AS (
+            CASE WHEN status = 'PENDING' THEN 'ADVISOR' ELSE 'CLOSED' END
+        ) STORED;
+
+-- ================= BONAFIDE =================
+ALTER TABLE bonafide_requests
+    ADD COLUMN IF NOT EXISTS overall_status VARCHAR(20)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN advisor_status = 'REJECTED' OR hod_status = 'REJECTED' THEN 'REJECTED'
+                WHEN advisor_status = 'APPROVED' AND hod_status = 'APPROVED' THEN 'APPROVED'
+                ELSE 'PENDING'
+            END
+        ) STORED,
+    ADD COLUMN IF NOT EXISTS current_stage VARCHAR(10)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN advisor_status = 'REJECTED' OR hod_status = 'REJECTED' THEN 'CLOSED'
+                WHEN advisor_status = 'APPROVED' AND hod_status = 'APPROVED' THEN 'CLOSED'
+                WHEN advisor_status = 'PENDING' THEN 'ADVISOR'
+                ELSE 'HOD'
+            END
+        ) STORED;
+
+-- ================= OUTPASS =================
+ALTER TABLE outpass_requests
+    ADD COLUMN IF NOT EXISTS overall_status VARCHAR(20)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN advisor_status = 'REJECTED' OR hod_status = 'REJECTED'
+                  OR warden_status = 'REJECTED' THEN 'REJECTED'
+                WHEN advisor_status = 'APPROVED' AND hod_status = 'APPROVED'
+                 AND warden_status = 'APPROVED' THEN 'APPROVED'
+                ELSE 'PENDING'
+            END
+        ) STORED,
+    ADD COLUMN IF NOT EXISTS current_stage VARCHAR(10)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN advisor_status = 'REJECTED' OR hod_status = 'REJECTED'
+                  OR warden_status = 'REJECTED' THEN 'CLOSED'
+                WHEN advisor_status = 'APPROVED' AND hod_status = 'APPROVED'
+                 AND warden_status = 'APPROVED' THEN 'CLOSED'
+                WHEN advisor_status = 'PENDING' THEN 'ADVISOR'
+                WHEN hod_status = 'PENDING' THEN 'HOD'
+                ELSE 'WARDEN'
+            END
+        ) STORED;
+
+-- ================= OD =================
+ALTER TABLE od_requests
+    ADD COLUMN IF NOT EXISTS overall_status VARCHAR(20)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN advisor_status = 'REJECTED' OR hod_status = 'REJECTED' THEN 'REJECTED'
+                WHEN advisor_status = 'APPROVED' AND hod_status = 'APPROVED' THEN 'APPROVED'
+                ELSE 'PENDING'
+            END
+        ) STORED,
+    ADD COLUMN IF NOT EXISTS current_stage VARCHAR(10)
+        GENERATED ALWAYS AS (
+            CASE
+                WHEN advisor_status = 'REJECTED' OR hod_status = 'REJECTED' THEN 'CLOSED'
+                WHEN advisor_status = 'APPROVED' AND hod_status = 'APPROVED' THEN 'CLOSED'
+                WHEN advisor_status = 'PENDING' THEN 'ADVISOR'
+                ELSE 'HOD'
+            END
+        ) STORED;
+
+-- ================= REQUEST FEED =================
+-- The feed (and request_counters through it) now reads the stored
+-- columns instead of re-deriving them
+CREATE OR REPLACE FUNCTION request_feed_row(rtype TEXT, r JSONB) RETURNS request_feed AS $$
+DECLARE
+    f request_feed;
+    st RECORD;
+BEGIN
+    f.request_type := rtype;
+    f.request_id := (r ->> CASE rtype
+                               WHEN 'LEAVE' THEN 'leave_id'
+                               WHEN 'BONAFIDE' THEN 'request_id'
+                               WHEN 'OUTPASS' THEN 'outpass_id'
+                               ELSE 'od_id'
+                           END)::INTEGER;
+    f.reg_no := r ->> 'reg_no';
+    f.created_at := COALESCE(r ->> 'applied_at', r ->> 'created_at')::TIMESTAMP;
+    f.updated_at := CURRENT_TIMESTAMP;
+    f.status := r ->> 'overall_status';
+    f.stage := r ->> 'current_stage';
+
+    IF f.stage IN ('ADVISOR', 'HOD') THEN
+        SELECT department, section, year_of_study INTO st
+        FROM students WHERE reg_no = f.reg_no;
+
+        f.assignee := CASE f.stage
+            WHEN 'ADVISOR' THEN 'section:' || st.department || ':' || st.section || ':' || st.year_of_study
+            ELSE 'dept:' || st.department
+        END;
+    ELSIF f.stage = 'WARDEN' THEN
+        f.assignee := 'floor:' || (r ->> 'floor_id');
+    END IF;
+
+    RETURN f;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,45 @@
+-- migrate: no-transaction
+-- Partial indexes on the open (overall_status = 'PENDING') rows, keyed by
+-- current_stage, for the approver queues; plus (reg_no, overall_status)
+-- for per-student filtering by final state. They replace the
+-- per-status-column partial indexes from 0002 that the queues no longer
+-- use.
+
+-- ================= LEAVE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_open_stage
+    ON leave_requests (current_stage, applied_at DESC) INCLUDE (reg_no)
+    WHERE overall_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_reg_overall
+    ON leave_requests (reg_no, overall_status);
+
+-- ================= BONAFIDE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_open_stage
+    ON bonafide_requests (current_stage, applied_at DESC) INCLUDE (reg_no, hod_id)
+    WHERE overall_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_reg_overall
+    ON bonafide_requests (reg_no, overall_status);
+
+-- ================= OUTPASS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_open_stage
+    ON outpass_requests (current_stage, created_at DESC) INCLUDE (reg_no, floor_id)
+    WHERE overall_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_reg_overall
+    ON outpass_requests (reg_no, overall_status);
+
+-- ================= OD =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_open_stage
+    ON od_requests (current_stage, created_at DESC) INCLUDE (reg_no)
+    WHERE overall_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_reg_overall
+    ON od_requests (reg_no, overall_status);
+
+-- ================= SUPERSEDED =================
+DROP INDEX CONCURRENTLY IF EXISTS idx_leave_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_leave_reg_status;
+DROP INDEX CONCURRENTLY IF EXISTS idx_bonafide_advisor_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_bonafide_hod_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_outpass_advisor_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_outpass_hod_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_outpass_warden_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_od_advisor_pending;
+DROP INDEX CONCURRENTLY IF EXISTS idx_od_hod_pending;
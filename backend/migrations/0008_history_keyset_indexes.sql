@@ -0,0 +1,45 @@
+-- migrate: no-transaction
+-- Indexes matching the (reviewed_at, id) keysets the paginated history
+-- and list endpoints sort and seek on (see pagination.py). Review times
+-- fall back to the creation time for rows reviewed before the column
+-- was filled in, so the index keys are the same COALESCE expressions
+-- the queries use.
+
+-- ================= LEAVE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_advisor_keyset
+    ON leave_requests (acted_advisor_id, COALESCE(advisor_reviewed_at, applied_at) DESC, leave_id DESC)
+    WHERE status <> 'PENDING';
+DROP INDEX CONCURRENTLY IF EXISTS idx_leave_acted_advisor;
+
+-- ================= BONAFIDE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_advisor_keyset
+    ON bonafide_requests (acted_advisor_id, COALESCE(advisor_reviewed_at, applied_at) DESC, request_id DESC)
+    WHERE advisor_status <> 'PENDING';
+DROP INDEX CONCURRENTLY IF EXISTS idx_bonafide_acted_advisor;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_hod_keyset
+    ON bonafide_requests (hod_id, COALESCE(hod_reviewed_at, applied_at) DESC, request_id DESC)
+    WHERE hod_status <> 'PENDING';
+DROP INDEX CONCURRENTLY IF EXISTS idx_bonafide_hod_history;
+
+-- ================= OUTPASS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_advisor_keyset
+    ON outpass_requests (acted_advisor_id, created_at DESC, outpass_id DESC)
+    WHERE advisor_status <> 'PENDING';
+DROP INDEX CONCURRENTLY IF EXISTS idx_outpass_acted_advisor;
+
+-- ================= OD =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_advisor_keyset
+    ON od_requests (COALESCE(advisor_reviewed_at, created_at) DESC, od_id DESC)
+    WHERE advisor_status <> 'PENDING';
+DROP INDEX CONCURRENTLY IF EXISTS idx_od_advisor_history;
+
+-- ================= COMPLAINTS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_complaints_dept_keyset
+    ON complaints (department, created_at DESC, complaint_id DESC);
+DROP INDEX CONCURRENTLY IF EXISTS idx_complaints_dept_created;
+
+-- ================= REQUEST FEED =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_request_feed_reg_keyset
+    ON request_feed (reg_no, created_at DESC, request_type DESC, request_id DESC);
+DROP INDEX CONCURRENTLY IF EXISTS idx_request_feed_reg_created;
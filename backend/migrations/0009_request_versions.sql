@@ -0,0 +1,51 @@
+-- Version stamps for conditional GET (see conditional.py). Every change
+-- to a request_feed row - i.e. every apply, review or delete on the four
+-- request tables - bumps the stamps of:
+--
+--   request:<TYPE>:<id>   the request itself (detail endpoints)
+--   <assignee>            the queue it leaves and the queue it joins
+--                         (section:..., dept:..., floor:...)
+--   warden:*              the hostel-wide warden queue, when the request
+--                         enters or leaves the WARDEN stage
+--
+-- Versions come from one sequence, so a stamp never repeats.
+CREATE SEQUENCE IF NOT EXISTS request_version_seq;
+
+CREATE TABLE IF NOT EXISTS request_versions (
+    scope      TEXT        PRIMARY KEY,
+    version    BIGINT      NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION request_versions_sync() RETURNS trigger AS $$
+DECLARE
+    scopes TEXT[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        scopes := scopes
+            || OLD.assignee
+            || ('request:' || OLD.request_type || ':' || OLD.request_id)
+            || CASE WHEN OLD.stage = 'WARDEN' THEN 'warden:*' END::TEXT;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        scopes := scopes
+            || NEW.assignee
+            || ('request:' || NEW.request_type || ':' || NEW.request_id)
+            || CASE WHEN NEW.stage = 'WARDEN' THEN 'warden:*' END::TEXT;
+    END IF;
+
+    INSERT INTO request_versions (scope, version, updated_at)
+    SELECT s, nextval('request_version_seq'), now()
+    FROM (SELECT DISTINCT s FROM unnest(scopes) AS u(s) WHERE s IS NOT NULL) d
+    ON CONFLICT (scope) DO UPDATE
+    SET version = EXCLUDED.version,
+        updated_at = EXCLUDED.updated_at;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_request_versions ON request_feed;
+CREATE TRIGGER trg_request_versions AFTER INSERT OR UPDATE OR DELETE ON request_feed
+    FOR EACH ROW EXECUTE FUNCTION request_versions_sync();
@@ -0,0 +1,82 @@
+-- Inbox events for the approver SSE streams (see events.py). Whenever a
+-- request_feed row joins or leaves an approver queue an event row is
+-- written and its JSON is sent on the request_events channel; NOTIFY is
+-- delivered when the apply / review transaction commits. The table lets
+-- a reconnecting client replay what it missed (Last-Event-ID).
+--
+--   kind    pending   the request entered the queues in scopes
+--           reviewed  the request left the queues in scopes
+--           removed   the request was deleted while in the queues
+--   scopes  request_feed.assignee keys, plus warden:* for the
+--           hostel-wide warden queue (same keys as request_versions)
+CREATE TABLE IF NOT EXISTS request_events (
+    id           BIGSERIAL   PRIMARY KEY,
+    kind         VARCHAR(10) NOT NULL,
+    request_type VARCHAR(10) NOT NULL,
+    request_id   INTEGER     NOT NULL,
+    status       VARCHAR(20),
+    stage        VARCHAR(10),
+    scopes       TEXT[]      NOT NULL,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_request_events_created ON request_events (created_at);
+
+CREATE OR REPLACE FUNCTION request_event_scopes(f request_feed) RETURNS TEXT[] AS $$
+    SELECT CASE
+        WHEN f.stage = 'CLOSED' THEN '{}'::TEXT[]
+        ELSE array_remove(
+            ARRAY[f.assignee, CASE WHEN f.stage = 'WARDEN' THEN 'warden:*' END],
+            NULL
+        )
+    END;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION request_events_sync() RETURNS trigger AS $$
+DECLARE
+    e request_events;
+    old_scopes TEXT[] := '{}';
+    new_scopes TEXT[] := '{}';
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        old_scopes := request_event_scopes(OLD);
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        new_scopes := request_event_scopes(NEW);
+    END IF;
+
+    -- Still waiting in the same queue: nothing for the inboxes
+    IF old_scopes = new_scopes THEN
+        RETURN NULL;
+    END IF;
+
+    IF cardinality(old_scopes) > 0 THEN
+        IF TG_OP = 'DELETE' THEN
+            INSERT INTO request_events (kind, request_type, request_id, status, stage, scopes)
+            VALUES ('removed', OLD.request_type, OLD.request_id, OLD.status, OLD.stage, old_scopes)
+            RETURNING * INTO e;
+        ELSE
+            INSERT INTO request_events (kind, request_type, request_id, status, stage, scopes)
+            VALUES ('reviewed', NEW.request_type, NEW.request_id, NEW.status, NEW.stage, old_scopes)
+            RETURNING * INTO e;
+        END IF;
+
+        PERFORM pg_notify('request_events', row_to_json(e)::TEXT);
+    END IF;
+
+    IF cardinality(new_scopes) > 0 THEN
+        INSERT INTO request_events (kind, request_type, request_id, status, stage, scopes)
+        VALUES ('pending', NEW.request_type, NEW.request_id, NEW.status, NEW.stage, new_scopes)
+        RETURNING * INTO e;
+
+        PERFORM pg_notify('request_events', row_to_json(e)::TEXT);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_request_events ON request_feed;
+CREATE TRIGGER trg_request_events AFTER INSERT OR UPDATE OR DELETE ON request_feed
+    FOR EACH ROW EXECUTE FUNCTION request_events_sync();
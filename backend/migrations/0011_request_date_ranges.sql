@@ -0,0 +1,33 @@
+-- A student can't hold two active (PENDING / APPROVED) leaves, or two
+-- active outpasses, over overlapping dates. The apply endpoints used to
+-- SELECT for an overlap and then INSERT, which two concurrent submits
+-- could both pass. Here the date window is a stored daterange and a GiST
+-- exclusion constraint rejects the overlapping INSERT itself
+-- (SQLSTATE 23P01, mapped to 409 by the endpoints).
+--
+-- btree_gist provides the GiST "=" on reg_no. Adding a constraint fails
+-- if existing active rows already overlap; close those first.
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+-- ================= LEAVE =================
+ALTER TABLE leave_requests
+    ADD COLUMN IF NOT EXISTS date_range DATERANGE
+        GENERATED ALWAYS AS (daterange(start_date, end_date, '[]')) STORED;
+
+ALTER TABLE leave_requests DROP CONSTRAINT IF EXISTS leave_requests_no_overlap;
+ALTER TABLE leave_requests
+    ADD CONSTRAINT leave_requests_no_overlap
+    EXCLUDE USING gist (reg_no WITH =, date_range WITH &&)
+    WHERE (overall_status IN ('PENDING', 'APPROVED'));
+
+-- ================= OUTPASS =================
+-- Day scholars have no in_date: the window is the out_date alone
+ALTER TABLE outpass_requests
+    ADD COLUMN IF NOT EXISTS date_range DATERANGE
+        GENERATED ALWAYS AS (daterange(out_date, COALESCE(in_date, out_date), '[]')) STORED;
+
+ALTER TABLE outpass_requests DROP CONSTRAINT IF EXISTS outpass_requests_no_overlap;
+ALTER TABLE outpass_requests
+    ADD CONSTRAINT outpass_requests_no_overlap
+    EXCLUDE USING gist (reg_no WITH =, date_range WITH &&)
+    WHERE (overall_status IN ('PENDING', 'APPROVED'));
@@ -0,0 +1,87 @@
+-- Archive tier for closed requests (see archive.py). Closed requests
+-- older than ARCHIVE_AFTER_SEMESTERS are moved out of the live tables
+-- into <table>_archive, which every existing query leaves alone, so the
+-- live tables only hold open requests and the recent history.
+--
+-- Archive tables are partitioned by academic year (June to May) of the
+-- request's applied_at / created_at; manage.py create-archive-partitions
+-- adds the yearly partitions ahead of time, optionally in a cold
+-- tablespace. The DEFAULT partition only catches rows with no date.
+--
+-- The columns are copied from the live table as plain columns (generated
+-- values are kept as they were at archive time) plus archived_at. A
+-- column added to a live table must be added to its archive too;
+-- archive.py refuses to move rows otherwise.
+
+-- ================= LEAVE =================
+CREATE TABLE IF NOT EXISTS leave_requests_archive (
+    LIKE leave_requests,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+) PARTITION BY RANGE (applied_at);
+
+CREATE TABLE IF NOT EXISTS leave_requests_archive_default
+    PARTITION OF leave_requests_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_leave_archive_id ON leave_requests_archive (leave_id);
+CREATE INDEX IF NOT EXISTS idx_leave_archive_reg
+    ON leave_requests_archive (reg_no, applied_at DESC);
+
+-- ================= BONAFIDE =================
+CREATE TABLE IF NOT EXISTS bonafide_requests_archive (
+    LIKE bonafide_requests,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+) PARTITION BY RANGE (applied_at);
+
+CREATE TABLE IF NOT EXISTS bonafide_requests_archive_default
+    PARTITION OF bonafide_requests_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_bonafide_archive_id ON bonafide_requests_archive (request_id);
+CREATE INDEX IF NOT EXISTS idx_bonafide_archive_reg
+    ON bonafide_requests_archive (reg_no, applied_at DESC);
+
+-- ================= OUTPASS =================
+CREATE TABLE IF NOT EXISTS outpass_requests_archive (
+    LIKE outpass_requests,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS outpass_requests_archive_default
+    PARTITION OF outpass_requests_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_outpass_archive_id ON outpass_requests_archive (outpass_id);
+CREATE INDEX IF NOT EXISTS idx_outpass_archive_reg
+    ON outpass_requests_archive (reg_no, created_at DESC);
+
+-- ================= OD =================
+CREATE TABLE IF NOT EXISTS od_requests_archive (
+    LIKE od_requests,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS od_requests_archive_default
+    PARTITION OF od_requests_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_od_archive_id ON od_requests_archive (od_id);
+CREATE INDEX IF NOT EXISTS idx_od_archive_reg
+    ON od_requests_archive (reg_no, created_at DESC);
+
+-- Proof files follow their OD (few rows, not partitioned)
+CREATE TABLE IF NOT EXISTS od_proofs_archive (
+    LIKE od_proofs,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_od_proofs_archive_od ON od_proofs_archive (od_id);
+
+-- ================= COMPLAINTS =================
+CREATE TABLE IF NOT EXISTS complaints_archive (
+    LIKE complaints,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS complaints_archive_default
+    PARTITION OF complaints_archive DEFAULT;
+
+CREATE INDEX IF NOT EXISTS idx_complaints_archive_id ON complaints_archive (complaint_id);
+CREATE INDEX IF NOT EXISTS idx_complaints_archive_dept
+    ON complaints_archive (department, created_at DESC);
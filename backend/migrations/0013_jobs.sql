@@ -0,0 +1,35 @@
+-- Background jobs (see jobs.py / worker.py): PDF rendering and mail for
+-- reviewed requests. The review endpoints insert a job in the same
+-- transaction as their status UPDATE, so a job exists exactly when the
+-- review committed; workers claim queued jobs with FOR UPDATE SKIP
+-- LOCKED and run them outside any request.
+--
+--   status  queued   waiting for a worker (again, after a failed attempt)
+--           running  claimed by locked_by at locked_at
+--           done     finished
+--           failed   gave up after max_attempts
+CREATE TABLE IF NOT EXISTS jobs (
+    id           BIGSERIAL   PRIMARY KEY,
+    kind         VARCHAR(40) NOT NULL,
+    payload      JSONB       NOT NULL DEFAULT '{}',
+    request_type VARCHAR(10),
+    request_id   INTEGER,
+    status       VARCHAR(10) NOT NULL DEFAULT 'queued',
+    attempts     INTEGER     NOT NULL DEFAULT 0,
+    max_attempts INTEGER     NOT NULL DEFAULT 5,
+    run_after    TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_by    TEXT,
+    locked_at    TIMESTAMPTZ,
+    last_error   TEXT,
+    created_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at  TIMESTAMPTZ
+);
+
+-- The claim query walks this; it only holds the waiting jobs
+CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs (run_after, id) WHERE status = 'queued';
+
+-- Finding jobs whose worker died
+CREATE INDEX IF NOT EXISTS idx_jobs_running ON jobs (locked_at) WHERE status = 'running';
+
+CREATE INDEX IF NOT EXISTS idx_jobs_request ON jobs (request_type, request_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs (finished_at) WHERE finished_at IS NOT NULL;
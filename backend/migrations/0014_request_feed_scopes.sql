@@ -0,0 +1,203 @@
+-- Dashboard counters (0005) keyed off the request_feed row instead of
+-- the request row plus the student's *current* department / section /
+-- year. Once a student moved, the keys recomputed for OLD no longer
+-- matched the ones the request had been counted under, and the counters
+-- drifted.
+--
+-- request_feed now records everything a counter key depends on: the
+-- student's scope when the row was written and the stage statuses. The
+-- counters trigger moves from the four request tables to request_feed,
+-- so OLD keys always come from OLD and NEW keys from NEW. A student
+-- moving is then just their feed rows being rewritten (0015).
+--
+-- Counter rows are updated in key order, so two transactions touching
+-- the same counters can't take their row locks in opposite orders.
+
+ALTER TABLE request_feed
+    ADD COLUMN IF NOT EXISTS department     VARCHAR(50),
+    ADD COLUMN IF NOT EXISTS section        VARCHAR(10),
+    ADD COLUMN IF NOT EXISTS year_of_study  INTEGER,
+    ADD COLUMN IF NOT EXISTS advisor_status VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS hod_status     VARCHAR(20),
+    ADD COLUMN IF NOT EXISTS warden_status  VARCHAR(20);
+
+CREATE OR REPLACE FUNCTION request_feed_row(rtype TEXT, r JSONB) RETURNS request_feed AS $$
+DECLARE
+    f request_feed;
+BEGIN
+    f.request_type := rtype;
+    f.request_id := (r ->> CASE rtype
+                               WHEN 'LEAVE' THEN 'leave_id'
+                               WHEN 'BONAFIDE' THEN 'request_id'
+                               WHEN 'OUTPASS' THEN 'outpass_id'
+                               ELSE 'od_id'
+                           END)::INTEGER;
+    f.reg_no := r ->> 'reg_no';
+    f.created_at := COALESCE(r ->> 'applied_at', r ->> 'created_at')::TIMESTAMP;
+    f.updated_at := CURRENT_TIMESTAMP;
+    f.status := r ->> 'overall_status';
+    f.stage := r ->> 'current_stage';
+
+    f.advisor_status := CASE WHEN rtype = 'LEAVE' THEN r ->> 'status' ELSE r ->> 'advisor_status' END;
+    f.hod_status := r ->> 'hod_status';
+    f.warden_status := r ->> 'warden_status';
+
+    SELECT s.department, s.section, s.year_of_study
+    INTO f.department, f.section, f.year_of_study
+    FROM students s WHERE s.reg_no = f.reg_no;
+
+    f.assignee := CASE f.stage
+        WHEN 'ADVISOR' THEN 'section:' || f.department || ':' || f.section || ':' || f.year_of_study
+        WHEN 'HOD' THEN 'dept:' || f.department
+        WHEN 'WARDEN' THEN 'floor:' || (r ->> 'floor_id')
+    END;
+
+    RETURN f;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION request_feed_sync() RETURNS trigger AS $$
+DECLARE
+    f request_feed;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        f := request_feed_row(TG_ARGV[0], to_jsonb(OLD));
+        DELETE FROM request_feed
+        WHERE request_type = f.request_type AND request_id = f.request_id;
+        RETURN NULL;
+    END IF;
+
+    f := request_feed_row(TG_ARGV[0], to_jsonb(NEW));
+
+    INSERT INTO request_feed
+    VALUES (f.*)
+    ON CONFLICT (request_type, request_id) DO UPDATE
+    SET reg_no         = EXCLUDED.reg_no,
+        status         = EXCLUDED.status,
+        stage          = EXCLUDED.stage,
+        assignee       = EXCLUDED.assignee,
+        created_at     = EXCLUDED.created_at,
+        updated_at     = EXCLUDED.updated_at,
+        department     = EXCLUDED.department,
+        section        = EXCLUDED.section,
+        year_of_study  = EXCLUDED.year_of_study,
+        advisor_status = EXCLUDED.advisor_status,
+        hod_status     = EXCLUDED.hod_status,
+        warden_status  = EXCLUDED.warden_status;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Counter keys of one feed row (same buckets as 0005)
+CREATE OR REPLACE FUNCTION request_feed_counter_keys(f request_feed)
+RETURNS TABLE (scope_type TEXT, scope_id TEXT, status TEXT) AS $$
+BEGIN
+    scope_type := 'STUDENT'; scope_id := f.reg_no; status := f.status;
+    RETURN NEXT;
+
+    scope_type := 'SECTION';
+    scope_id := COALESCE(f.department, '') || ':' || COALESCE(f.section, '') || ':'
+                || COALESCE(f.year_of_study::TEXT, '');
+    status := COALESCE(f.advisor_status, 'OTHER');
+    RETURN NEXT;
+
+    IF f.request_type <> 'LEAVE' THEN
+        scope_type := 'DEPT';
+        scope_id := COALESCE(f.department, '');
+        status := CASE
+            WHEN f.hod_status IN ('APPROVED', 'REJECTED') THEN f.hod_status
+            WHEN f.advisor_status = 'APPROVED' AND f.hod_status = 'PENDING' THEN 'PENDING'
+            ELSE 'OTHER'
+        END;
+        RETURN NEXT;
+    END IF;
+
+    IF f.request_type = 'OUTPASS' AND f.advisor_status = 'APPROVED' AND f.hod_status = 'APPROVED' THEN
+        scope_type := 'HOSTEL';
+        scope_id := '*';
+        status := COALESCE(f.warden_status, 'OTHER');
+        RETURN NEXT;
+    END IF;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- Kept for request_counters_expected: the keys a request row would get now
+CREATE OR REPLACE FUNCTION request_counter_keys(rtype TEXT, r JSONB)
+RETURNS TABLE (scope_type TEXT, scope_id TEXT, status TEXT) AS $$
+    SELECT * FROM request_feed_counter_keys(request_feed_row(rtype, r));
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION request_counters_sync() RETURNS trigger AS $$
+DECLARE
+    k RECORD;
+BEGIN
+    FOR k IN
+        SELECT d.scope_type, d.scope_id, d.status, SUM(d.delta) AS delta
+        FROM (
+            SELECT x.scope_type, x.scope_id, x.status, -1 AS delta
+            FROM request_feed_counter_keys(OLD) x
+            WHERE TG_OP IN ('UPDATE', 'DELETE')
+            UNION ALL
+            SELECT x.scope_type, x.scope_id, x.status, 1
+            FROM request_feed_counter_keys(NEW) x
+            WHERE TG_OP IN ('INSERT', 'UPDATE')
+        ) d
+        GROUP BY d.scope_type, d.scope_id, d.status
+        HAVING SUM(d.delta) <> 0
+        ORDER BY d.scope_type, d.scope_id, d.status
+    LOOP
+        IF k.delta < 0 THEN
+            UPDATE request_counters c
+            SET count = c.count + k.delta
+            WHERE c.scope_type = k.scope_type
+              AND c.scope_id = k.scope_id
+              AND c.request_type = COALESCE(NEW.request_type, OLD.request_type)
+              AND c.status = k.status;
+        ELSE
+            INSERT INTO request_counters (scope_type, scope_id, request_type, status, count)
+            VALUES (k.scope_type, k.scope_id, COALESCE(NEW.request_type, OLD.request_type), k.status, k.delta)
+            ON CONFLICT (scope_type, scope_id, request_type, status)
+            DO UPDATE SET count = request_counters.count + EXCLUDED.count;
+        END IF;
+    END LOOP;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_request_counters ON leave_requests;
+DROP TRIGGER IF EXISTS trg_request_counters ON bonafide_requests;
+DROP TRIGGER IF EXISTS trg_request_counters ON outpass_requests;
+DROP TRIGGER IF EXISTS trg_request_counters ON od_requests;
+
+-- Fill the new columns before the trigger goes on, then recount once
+UPDATE request_feed f
+SET department = n.department, section = n.section, year_of_study = n.year_of_study,
+    advisor_status = n.advisor_status, hod_status = n.hod_status, warden_status = n.warden_status
+FROM (SELECT (request_feed_row('LEAVE', to_jsonb(t))).* FROM leave_requests t) n
+WHERE f.request_type = n.request_type AND f.request_id = n.request_id;
+
+UPDATE request_feed f
+SET department = n.department, section = n.section, year_of_study = n.year_of_study,
+    advisor_status = n.advisor_status, hod_status = n.hod_status, warden_status = n.warden_status
+FROM (SELECT (request_feed_row('BONAFIDE', to_jsonb(t))).* FROM bonafide_requests t) n
+WHERE f.request_type = n.request_type AND f.request_id = n.request_id;
+
+UPDATE request_feed f
+SET department = n.department, section = n.section, year_of_study = n.year_of_study,
+    advisor_status = n.advisor_status, hod_status = n.hod_status, warden_status = n.warden_status
+FROM (SELECT (request_feed_row('OUTPASS', to_jsonb(t))).* FROM outpass_requests t) n
+WHERE f.request_type = n.request_type AND f.request_id = n.request_id;
+
+UPDATE request_feed f
+SET department = n.department, section = n.section, year_of_study = n.year_of_study,
+    advisor_status = n.advisor_status, hod_status = n.hod_status, warden_status = n.warden_status
+FROM (SELECT (request_feed_row('OD', to_jsonb(t))).* FROM od_requests t) n
+WHERE f.request_type = n.request_type AND f.request_id = n.request_id;
+
+DROP TRIGGER IF EXISTS trg_request_counters ON request_feed;
+CREATE TRIGGER trg_request_counters AFTER INSERT OR UPDATE OR DELETE ON request_feed
+    FOR EACH ROW EXECUTE FUNCTION request_counters_sync();
+
+SELECT refresh_request_counters();
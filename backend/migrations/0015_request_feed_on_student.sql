@@ -0,0 +1,53 @@
+-- request_feed rows carry the student's department / section / year
+-- (their advisor and HOD queue, and since 0014 their counter keys), but
+-- were only rewritten when the request itself changed. A student moving
+-- left their open requests in the old section's queue.
+--
+-- Moving a student now rewrites their feed rows, which in turn moves
+-- their counters, bumps the version stamps of both queues and sends the
+-- inbox events (the triggers on request_feed).
+
+-- Rewrite every feed row of one student from the request tables
+CREATE OR REPLACE FUNCTION refresh_student_feed(p_reg_no TEXT) RETURNS void AS $$
+BEGIN
+    UPDATE request_feed f
+    SET status         = n.status,
+        stage          = n.stage,
+        assignee       = n.assignee,
+        updated_at     = n.updated_at,
+        department     = n.department,
+        section        = n.section,
+        year_of_study  = n.year_of_study,
+        advisor_status = n.advisor_status,
+        hod_status     = n.hod_status,
+        warden_status  = n.warden_status
+    FROM (
+        SELECT (request_feed_row('LEAVE', to_jsonb(t))).* FROM leave_requests t WHERE t.reg_no = p_reg_no
+        UNION ALL
+        SELECT (request_feed_row('BONAFIDE', to_jsonb(t))).* FROM bonafide_requests t WHERE t.reg_no = p_reg_no
+        UNION ALL
+        SELECT (request_feed_row('OUTPASS', to_jsonb(t))).* FROM outpass_requests t WHERE t.reg_no = p_reg_no
+        UNION ALL
+        SELECT (request_feed_row('OD', to_jsonb(t))).* FROM od_requests t WHERE t.reg_no = p_reg_no
+    ) n
+    WHERE f.request_type = n.request_type
+      AND f.request_id = n.request_id
+      AND (f.department, f.section, f.year_of_study, f.assignee)
+          IS DISTINCT FROM (n.department, n.section, n.year_of_study, n.assignee);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION request_feed_on_student() RETURNS trigger AS $$
+BEGIN
+    PERFORM refresh_student_feed(NEW.reg_no);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_request_feed_student ON students;
+CREATE TRIGGER trg_request_feed_student
+    AFTER UPDATE OF department, section, year_of_study ON students
+    FOR EACH ROW
+    WHEN ((OLD.department, OLD.section, OLD.year_of_study)
+          IS DISTINCT FROM (NEW.department, NEW.section, NEW.year_of_study))
+    EXECUTE FUNCTION request_feed_on_student();
@@ -0,0 +1,99 @@
+-- /hod/history paged over a UNION of three request tables sorted by
+-- COALESCE(hod_reviewed_at, applied_at / created_at): no index could
+-- serve the keyset, and a row with both times NULL sorted first and
+-- could never be passed by a cursor.
+--
+-- request_feed now carries hod_acted_at: when the HOD reviewed the
+-- request, NULL while the HOD stage is pending or not applicable. It
+-- falls back to the creation and then the feed-write time, so it is
+-- never NULL for a reviewed row. 0017 indexes it by department.
+
+ALTER TABLE request_feed ADD COLUMN IF NOT EXISTS hod_acted_at TIMESTAMP;
+
+CREATE OR REPLACE FUNCTION request_feed_row(rtype TEXT, r JSONB) RETURNS request_feed AS $$
+DECLARE
+    f request_feed;
+BEGIN
+    f.request_type := rtype;
+    f.request_id := (r ->> CASE rtype
+                               WHEN 'LEAVE' THEN 'leave_id'
+                               WHEN 'BONAFIDE' THEN 'request_id'
+                               WHEN 'OUTPASS' THEN 'outpass_id'
+                               ELSE 'od_id'
+                           END)::INTEGER;
+    f.reg_no := r ->> 'reg_no';
+    f.created_at := COALESCE(r ->> 'applied_at', r ->> 'created_at')::TIMESTAMP;
+    f.updated_at := CURRENT_TIMESTAMP;
+    f.status := r ->> 'overall_status';
+    f.stage := r ->> 'current_stage';
+
+    f.advisor_status := CASE WHEN rtype = 'LEAVE' THEN r ->> 'status' ELSE r ->> 'advisor_status' END;
+    f.hod_status := r ->> 'hod_status';
+    f.warden_status := r ->> 'warden_status';
+
+    IF f.hod_status <> 'PENDING' THEN
+        f.hod_acted_at := COALESCE((r ->> 'hod_reviewed_at')::TIMESTAMP, f.created_at, f.updated_at);
+    END IF;
+
+    SELECT s.department, s.section, s.year_of_study
+    INTO f.department, f.section, f.year_of_study
+    FROM students s WHERE s.reg_no = f.reg_no;
+
+    f.assignee := CASE f.stage
+        WHEN 'ADVISOR' THEN 'section:' || f.department || ':' || f.section || ':' || f.year_of_study
+        WHEN 'HOD' THEN 'dept:' || f.department
+        WHEN 'WARDEN' THEN 'floor:' || (r ->> 'floor_id')
+    END;
+
+    RETURN f;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION request_feed_sync() RETURNS trigger AS $$
+DECLARE
+    f request_feed;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        f := request_feed_row(TG_ARGV[0], to_jsonb(OLD));
+        DELETE FROM request_feed
+        WHERE request_type = f.request_type AND request_id = f.request_id;
+        RETURN NULL;
+    END IF;
+
+    f := request_feed_row(TG_ARGV[0], to_jsonb(NEW));
+
+    INSERT INTO request_feed
+    VALUES (f.*)
+    ON CONFLICT (request_type, request_id) DO UPDATE
+    SET reg_no         = EXCLUDED.reg_no,
+        status         = EXCLUDED.status,
+        stage          = EXCLUDED.stage,
+        assignee       = EXCLUDED.assignee,
+        created_at     = EXCLUDED.created_at,
+        updated_at     = EXCLUDED.updated_at,
+        department     = EXCLUDED.department,
+        section        = EXCLUDED.section,
+        year_of_study  = EXCLUDED.year_of_study,
+        advisor_status = EXCLUDED.advisor_status,
+        hod_status     = EXCLUDED.hod_status,
+        warden_status  = EXCLUDED.warden_status,
+        hod_acted_at   = EXCLUDED.hod_acted_at;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+UPDATE request_feed f
+SET hod_acted_at = COALESCE(t.hod_reviewed_at, f.created_at, f.updated_at)
+FROM bonafide_requests t
+WHERE f.request_type = 'BONAFIDE' AND f.request_id = t.request_id AND t.hod_status <> 'PENDING';
+
+UPDATE request_feed f
+SET hod_acted_at = COALESCE(t.hod_reviewed_at, f.created_at, f.updated_at)
+FROM outpass_requests t
+WHERE f.request_type = 'OUTPASS' AND f.request_id = t.outpass_id AND t.hod_status <> 'PENDING';
+
+UPDATE request_feed f
+SET hod_acted_at = COALESCE(t.hod_reviewed_at, f.created_at, f.updated_at)
+FROM od_requests t
+WHERE f.request_type = 'OD' AND f.request_id = t.od_id AND t.hod_status <> 'PENDING';
@@ -0,0 +1,7 @@
+-- migrate: no-transaction
+-- The (hod_acted_at, type, id) keyset /hod/history seeks on, per
+-- department; only rows the HOD has reviewed (see 0016).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_request_feed_hod_keyset
+    ON request_feed (department, hod_acted_at DESC, request_type DESC, request_id DESC)
+    WHERE hod_acted_at IS NOT NULL;
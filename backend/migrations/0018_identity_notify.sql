@@ -0,0 +1,27 @@
+-- An advisor's section assignments are part of their identity claims
+-- (identity.py), cached per worker by email. Changing section_advisors
+-- now sends the advisor's email on the identity_changed channel; every
+-- worker's event listener (events.py) drops that cache entry, so the
+-- advisor's next SSE stream subscribes to the sections they hold now.
+
+CREATE OR REPLACE FUNCTION identity_changed_on_section() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM pg_notify('identity_changed', COALESCE(email, ''))
+        FROM advisors WHERE advisor_id = OLD.advisor_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('identity_changed', COALESCE(email, ''))
+        FROM advisors WHERE advisor_id = NEW.advisor_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_identity_changed_section ON section_advisors;
+CREATE TRIGGER trg_identity_changed_section
+    AFTER INSERT OR DELETE OR UPDATE
+    ON section_advisors
+    FOR EACH ROW EXECUTE FUNCTION identity_changed_on_section();
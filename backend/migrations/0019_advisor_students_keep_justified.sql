@@ -0,0 +1,41 @@
+-- Unassigning a section (or moving a section_advisors row) deleted the
+-- advisor's mapping to every student of the old section, even when
+-- another section_advisors row still gave the advisor that section.
+-- Only mappings no remaining section_advisors row justifies go now.
+
+CREATE OR REPLACE FUNCTION advisor_students_on_section() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM advisor_students ast
+        USING students s
+        WHERE ast.advisor_id = OLD.advisor_id
+          AND ast.reg_no = s.reg_no
+          AND s.department = OLD.department
+          AND s.section = OLD.section
+          AND s.year_of_study = OLD.year_of_study
+          AND NOT EXISTS (
+              SELECT 1
+              FROM section_advisors sa
+              WHERE sa.advisor_id = ast.advisor_id
+                AND sa.department = s.department
+                AND sa.section = s.section
+                AND sa.year_of_study = s.year_of_study
+          );
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.advisor_id IS NOT NULL THEN
+        INSERT INTO advisor_students (advisor_id, reg_no)
+        SELECT NEW.advisor_id, s.reg_no
+        FROM students s
+        WHERE s.department = NEW.department
+          AND s.section = NEW.section
+          AND s.year_of_study = NEW.year_of_study
+        ON CONFLICT DO NOTHING;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Put back mappings the old trigger removed
+SELECT refresh_advisor_students();
@@ -0,0 +1,32 @@
+-- migrate: no-transaction
+-- 0007 replaced the per-stage partial indexes led by reg_no / floor_id
+-- with ones led by current_stage. Those serve a scan of a whole stage,
+-- but the queues start from a small set of students (advisor_students,
+-- a department's students) or of floors (a warden's) and probe the
+-- requests per student / floor, which only an index led by reg_no /
+-- floor_id does without reading every open row of the stage. These put
+-- the selective lookups back, on the current overall_status /
+-- current_stage predicates the queues filter on.
+
+-- ================= LEAVE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_leave_open_reg
+    ON leave_requests (reg_no, current_stage, applied_at DESC)
+    WHERE overall_status = 'PENDING';
+
+-- ================= BONAFIDE =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bonafide_open_reg
+    ON bonafide_requests (reg_no, current_stage, applied_at DESC)
+    WHERE overall_status = 'PENDING';
+
+-- ================= OUTPASS =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_open_reg
+    ON outpass_requests (reg_no, current_stage, created_at DESC)
+    WHERE overall_status = 'PENDING';
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_outpass_open_floor
+    ON outpass_requests (floor_id, outpass_id DESC)
+    WHERE overall_status = 'PENDING' AND current_stage = 'WARDEN';
+
+-- ================= OD =================
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_od_open_reg
+    ON od_requests (reg_no, current_stage, created_at DESC)
+    WHERE overall_status = 'PENDING';
@@ -0,0 +1,42 @@
+-- The queue and detail responses show the student's name, department,
+-- section, year and residence type, but their version stamps (0009)
+-- only moved with request_feed rows. Renaming a student, or a
+-- department change that left the feed's queue keys as they were, kept
+-- serving the old values as 304s.
+--
+-- Changing any of those columns now bumps the stamps of every request
+-- of the student and of the queues those requests sit in, the same
+-- scopes request_versions_sync bumps for a feed row.
+
+CREATE OR REPLACE FUNCTION request_versions_on_student() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO request_versions (scope, version, updated_at)
+    SELECT s, nextval('request_version_seq'), now()
+    FROM (
+        SELECT DISTINCT u.s
+        FROM request_feed f,
+             unnest(ARRAY[
+                 f.assignee,
+                 'request:' || f.request_type || ':' || f.request_id,
+                 CASE WHEN f.stage = 'WARDEN' THEN 'warden:*' END
+             ]) AS u(s)
+        WHERE f.reg_no = NEW.reg_no
+          AND u.s IS NOT NULL
+    ) d
+    ON CONFLICT (scope) DO UPDATE
+    SET version = EXCLUDED.version,
+        updated_at = EXCLUDED.updated_at;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fires after trg_request_feed_student (0015, triggers run in name
+-- order), so a moved student's feed rows already carry the new queues
+DROP TRIGGER IF EXISTS trg_request_versions_student ON students;
+CREATE TRIGGER trg_request_versions_student
+    AFTER UPDATE OF name, department, section, year_of_study, residence_type ON students
+    FOR EACH ROW
+    WHEN ((OLD.name, OLD.department, OLD.section, OLD.year_of_study, OLD.residence_type)
+          IS DISTINCT FROM (NEW.name, NEW.department, NEW.section, NEW.year_of_study, NEW.residence_type))
+    EXECUTE FUNCTION request_versions_on_student();
@@ -0,0 +1,113 @@
+"""
+Keyset (cursor) pagination for the history and list endpoints.
+
+Lists are ordered newest first by a key such as (reviewed_at, id). A
+page is read as "rows whose key is below the last key of the previous
+page", so every page costs the same no matter how deep the client has
+scrolled. The cursor handed to the client is that last key, base64
+encoded; clients send it back as ?cursor= and pass ?limit= to size the
+page. Clients that send neither get the newest DEFAULT_LIMIT rows.
+
+The next cursor is returned in the X-Next-Cursor header (absent on the
+last page) so the existing response bodies keep their shape; endpoints
+that return an object also carry it as "next_cursor".
+"""
+
+import base64
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime
+
+from fastapi import HTTPException, Query, Response
+
+DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise ValueError("unknown cursor value")
+    return value
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or not values:
+            raise ValueError("empty cursor")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def keyset_after(*columns: str) -> str:
+    """Row-comparison predicate for keys below :_after0, :_after1, ..."""
+    placeholders = ", ".join(f":_after{i}" for i in range(len(columns)))
+    return f"({', '.join(columns)}) < ({placeholders})"
+
+
+# A registered keyset page: the first-page statement, the one past a
+# cursor, and how many key columns the cursor carries (see statements.paged)
+KeysetPage = namedtuple("KeysetPage", "first after width")
+
+
+class Page:
+    """Dependency for ?limit=&cursor= on a descending keyset."""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: str | None = Query(None),
+    ):
+        self.limit = limit
+        self.after = decode_cursor(cursor) if cursor else None
+
+    def statement(self, keyset: KeysetPage):
+        """The statement to run for this page: keyset.first, or keyset.after past a cursor."""
+        if self.after is None:
+            return keyset.first
+        if len(self.after) != keyset.width:
+            raise HTTPException(400, "Invalid cursor")
+        return keyset.after
+
+    def params(self, **params) -> dict:
+        # One extra row tells us whether there is a next page
+        params["_limit"] = self.limit + 1
+        for i, value in enumerate(self.after or ()):
+            params[f"_after{i}"] = value
+        return params
+
+    def cut(self, rows, *keys: str) -> tuple[list, str | None]:
+        """Trim the look-ahead row; return (rows, next_cursor)."""
+        rows = list(rows)
+        if len(rows) <= self.limit:
+            return rows, None
+
+        rows = rows[:self.limit]
+        last = rows[-1]
+        return rows, encode_cursor(last[k] for k in keys)
+
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
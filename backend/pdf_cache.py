@@ -0,0 +1,191 @@
+"""
+Content-addressed cache for generated PDFs.
+
+A PDF is stored under a key hashed from what determines its bytes: the
+template name and version (template_service), the data it was rendered
+with and the renderer options. Rendering the same document again - a
+re-sent mail, a re-download - finds the existing file instead of
+running wkhtmltopdf; any change to the data or the template gives a new
+key, so a stale PDF is never served.
+
+    PDF_CACHE_DIR/<key>/<filename>
+
+The entry is a directory so the file keeps its readable name
+(outpass_12.pdf) for attachments and downloads.
+
+The cache is bounded by PDF_CACHE_MAX_BYTES. A hit bumps the file's
+mtime, which is the LRU order. The directory is shared by the web app
+and the job workers, so eviction happens in one place only: the job
+worker (worker.py) runs evict() every PDF_CACHE_EVICT_SECONDS, and
+`python manage.py prune-pdf-cache` runs it by hand. Puts never evict.
+
+Entries used within PDF_CACHE_EVICT_GRACE_SECONDS are never evicted, so
+a path handed out by get_or_render stays there while the caller sends
+it. Another process may still remove entries at any time, so every
+directory scan tolerates them vanishing, and get_or_render renders
+again if its file disappears before it returns. Each process keeps its
+own counters.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(BASE_DIR, "pdf_cache"))
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PDF_CACHE_EVICT_SECONDS = float(os.getenv("PDF_CACHE_EVICT_SECONDS", "300"))
+PDF_CACHE_EVICT_GRACE_SECONDS = float(os.getenv("PDF_CACHE_EVICT_GRACE_SECONDS", "600"))
+
+
+def cache_key(template_name: str, template_version: str, data: dict, options: dict | None = None) -> str:
+    document = {
+        "template": template_name,
+        "version": template_version,
+        "data": data,
+        "options": options or {},
+    }
+    encoded = json.dumps(document, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, root: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        # One lock per key being rendered, so concurrent requests for the
+        # same document render it once
+        self._rendering: dict[str, threading.Lock] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "evicted_bytes": 0}
+
+    def path(self, key: str, filename: str) -> str:
+        return os.path.join(self.root, key, filename)
+
+    def get(self, key: str, filename: str) -> str | None:
+        path = self.path(key, filename)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def get_or_render(self, key: str, filename: str, render) -> str:
+        """
+        The cached path for key, calling render(path) to create it on a
+        miss. render must write the file atomically (renderer.render_pdf
+        does).
+        """
+        # A second pass only if the entry was evicted under us
+        for _ in range(2):
+            path = self._get_or_render(key, filename, render)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(path)
+
+    def _get_or_render(self, key: str, filename: str, render) -> str:
+        path = self.get(key, filename)
+        if path is not None:
+            self._count("hits")
+            return path
+
+        with self._lock:
+            key_lock = self._rendering.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Someone else may have rendered it while we waited
+            path = self.get(key, filename)
+            if path is not None:
+                self._count("hits")
+                return path
+
+            self._count("misses")
+            path = self.path(key, filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                render(path)
+            finally:
+                with self._lock:
+                    self._rendering.pop(key, None)
+
+        return path
+
+    def _count(self, name: str, by: int = 1):
+        with self._lock:
+            self._stats[name] += by
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """(mtime, size, entry dir) for every entry, least recently used first."""
+        # Entries (and their files) can vanish mid-scan when another
+        # process evicts them; they are just left out
+        entries = []
+        try:
+            roots = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return entries
+
+        for entry in roots:
+            mtime, size = 0.0, 0
+            try:
+                if not entry.is_dir():
+                    continue
+                for item in os.scandir(entry.path):
+                    stat = item.stat()
+                    mtime = max(mtime, stat.st_mtime)
+                    size += stat.st_size
+            except FileNotFoundError:
+                continue
+            entries.append((mtime, size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self) -> int:
+        """
+        Remove least recently used entries until under budget; returns
+        the bytes removed. Run from one place only (see above).
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        recent = time.time() - PDF_CACHE_EVICT_GRACE_SECONDS
+        removed = 0
+
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            # Never drop an entry in use right now: just served, or being
+            # (re)rendered in this process
+            if mtime > recent or os.path.basename(path) in self._rendering:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += size
+            with self._lock:
+                self._stats["evictions"] += 1
+                self._stats["evicted_bytes"] += size
+
+        return removed
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            "oldest_age_s": round(time.time() - entries[0][0]) if entries else 0,
+        })
+        return stats
+
+
+# One per process; the directory is shared
+pdf_cache = PdfCache()
@@ -0,0 +1,344 @@
+"""
+PDF renderer pool.
+
+Every PDF used to go through pdfkit.from_string in the calling thread.
+Here renders run in a ProcessPoolExecutor of RENDERER_WORKERS processes,
+started and warmed up once. Callers wait on a future, so a slow render
+never holds more than its own thread.
+
+The default backend is WeasyPrint, which renders inside the pool
+processes: its import, fonts and CSS machinery are loaded once per
+process at warm-up and each PDF is just a function call.
+wkhtmltopdf has no long-running mode, so that backend still starts one
+wkhtmltopdf process per PDF; the pool only bounds and queues them.
+`python manage.py bench-renderer` compares both with the old pdfkit path.
+
+    RENDERER_BACKEND      weasyprint (default) or wkhtmltopdf
+    RENDERER_WORKERS      renderer processes
+    RENDERER_QUEUE_LIMIT  renders queued or running at once; past it
+                          submit() raises RendererBusy instead of queueing
+    RENDERER_TIMEOUT_SECONDS
+                          per render; the render is interrupted (and a
+                          wkhtmltopdf process killed)
+    RENDERER_MAX_TIMEOUT_SECONDS
+                          cap on a multi-document render's timeout
+
+A render can take a list of HTML documents and produce one multi-page
+PDF from them in a single backend call (the warden's print run); the
+timeout then applies per document, up to RENDERER_MAX_TIMEOUT_SECONDS
+in total, so one large print run can't hold a renderer process for
+hours.
+
+PDFs are written to a temporary file and renamed into place, so a
+reader never sees a half-written one.
+"""
+
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
+
+RENDERER_BACKEND = os.getenv("RENDERER_BACKEND", "weasyprint")
+RENDERER_WORKERS = int(os.getenv("RENDERER_WORKERS", "2"))
+RENDERER_QUEUE_LIMIT = int(os.getenv("RENDERER_QUEUE_LIMIT", "32"))
+RENDERER_TIMEOUT_SECONDS = float(os.getenv("RENDERER_TIMEOUT_SECONDS", "60"))
+RENDERER_MAX_TIMEOUT_SECONDS = float(os.getenv("RENDERER_MAX_TIMEOUT_SECONDS", "300"))
+
+WKHTMLTOPDF_PATH = os.getenv(
+    "WKHTMLTOPDF_PATH", r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
+)
+
+# Window for the pdfs_per_s throughput figure
+THROUGHPUT_WINDOW_SECONDS = 60
+
+
+class RendererBusy(Exception):
+    """The render queue is full."""
+
+
+class RenderTimeout(Exception):
+    """A render ran past RENDERER_TIMEOUT_SECONDS."""
+
+
+class RenderError(Exception):
+    """The backend failed to produce a PDF."""
+
+
+# -------------------------------------------------
+# BACKENDS (run inside the renderer processes)
+# -------------------------------------------------
+class WkhtmltopdfBackend:
+    """wkhtmltopdf, one process per render, options as in pdfkit."""
+
+    def warm(self):
+        subprocess.run([WKHTMLTOPDF_PATH, "--version"], capture_output=True, check=True, timeout=30)
+
+    def render(self, pages: list[str], out_path: str, options: dict, timeout: float):
+        args = [WKHTMLTOPDF_PATH]
+        for name, value in options.items():
+            args.append(f"--{name}")
+            if value not in (None, ""):
+                args.append(str(value))
+
+        with tempfile.TemporaryDirectory() as page_dir:
+            # One page: stdin. Several: one input file each, all in this
+            # one wkhtmltopdf run
+            if len(pages) == 1:
+                args.append("-")
+                stdin = pages[0].encode("utf-8")
+            else:
+                for i, html in enumerate(pages):
+                    page_path = os.path.join(page_dir, f"page_{i}.html")
+                    with open(page_path, "w", encoding="utf-8") as f:
+                        f.write(html)
+                    args.append(page_path)
+                stdin = None
+            args.append(out_path)
+
+            try:
+                result = subprocess.run(args, input=stdin, capture_output=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                raise RenderTimeout(f"wkhtmltopdf ran past {timeout}s")
+
+        # wkhtmltopdf exits 1 on some asset warnings but still writes the PDF
+        if result.returncode not in (0, 1) or not os.path.exists(out_path):
+            raise RenderError(result.stderr.decode("utf-8", "replace")[-2000:])
+
+
+class WeasyPrintBackend:
+    """WeasyPrint, in-process: the warm-up pays for importing it once."""
+
+    def warm(self):
+        import weasyprint
+        self._weasyprint = weasyprint
+        weasyprint.HTML(string="<p></p>").write_pdf()
+
+    def render(self, pages: list[str], out_path: str, options: dict, timeout: float):
+        # Page size etc. come from the template's CSS
+        base_url = os.path.dirname(os.path.abspath(__file__))
+        documents = [self._weasyprint.HTML(string=html, base_url=base_url).render() for html in pages]
+        all_pages = [page for document in documents for page in document.pages]
+        documents[0].copy(all_pages).write_pdf(out_path)
+
+
+BACKENDS = {
+    "wkhtmltopdf": WkhtmltopdfBackend,
+    "weasyprint": WeasyPrintBackend,
+}
+
+_backend = None
+
+
+def _init_process(backend_name: str):
+    global _backend
+    _backend = BACKENDS[backend_name]()
+    _backend.warm()
+
+
+def _alarm(signum, frame):
+    raise RenderTimeout("render timed out")
+
+
+def _render(pages: list[str], out_path: str, options: dict, timeout: float) -> float:
+    """Render one PDF in a renderer process; returns the render time in ms."""
+    started = time.perf_counter()
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+
+    # In-process backends can't be killed from outside; interrupt them
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    try:
+        _backend.render(pages, tmp_path, options, timeout)
+        os.replace(tmp_path, out_path)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return (time.perf_counter() - started) * 1000
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# -------------------------------------------------
+# POOL
+# -------------------------------------------------
+class RendererPool:
+    def __init__(
+        self,
+        workers: int = RENDERER_WORKERS,
+        queue_limit: int = RENDERER_QUEUE_LIMIT,
+        timeout: float = RENDERER_TIMEOUT_SECONDS,
+        backend: str = RENDERER_BACKEND,
+        max_timeout: float = RENDERER_MAX_TIMEOUT_SECONDS,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown renderer backend {backend!r}")
+
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self.max_timeout = max(max_timeout, timeout)
+        self.backend = backend
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._in_flight = 0
+        self._recent = deque()
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "pool_restarts": 0,
+            "render_ms_total": 0.0,
+            "render_ms_max": 0.0,
+        }
+
+    def start(self):
+        """Start the renderer processes and wait until each has warmed up."""
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_process,
+                initargs=(self.backend,),
+            )
+            executor = self._executor
+
+        # The pool spawns its processes on demand; make it spawn them all.
+        # If the warm-up fails (backend missing, binary not found) the
+        # executor is broken for good: drop it so the next call retries
+        try:
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+        except BrokenProcessPool as e:
+            self._discard(executor)
+            raise RenderError(f"renderer processes failed to start: {e}")
+
+    def _discard(self, executor):
+        """Forget a broken executor; the next submit starts a new one."""
+        with self._lock:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+            self._stats["pool_restarts"] += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def submit(self, html: str | list[str], out_path: str, options: dict | None = None):
+        """Queue a render; returns a Future of the render time in ms."""
+        pages = [html] if isinstance(html, str) else list(html)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise RendererBusy(f"{self.queue_limit} renders already queued")
+
+        executor = None
+        try:
+            self.start()
+            with self._lock:
+                executor = self._executor
+                self._in_flight += 1
+                self._stats["submitted"] += 1
+            timeout = min(self.timeout * len(pages), self.max_timeout)
+            future = executor.submit(_render, pages, out_path, options or {}, timeout)
+        except BaseException as e:
+            with self._lock:
+                self._in_flight = max(self._in_flight - 1, 0)
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool):
+                self._discard(executor)
+                raise RenderError(f"renderer process died: {e}")
+            raise
+
+        future.add_done_callback(partial(self._finished, executor))
+        return future
+
+    def render(self, html: str | list[str], out_path: str, options: dict | None = None) -> str:
+        """Render and wait; returns out_path."""
+        future = self.submit(html, out_path, options)
+        try:
+            future.result()
+        except BrokenProcessPool as e:
+            raise RenderError(f"renderer process died: {e}")
+        return out_path
+
+    def _finished(self, executor, future):
+        self._slots.release()
+
+        try:
+            elapsed_ms = future.result()
+            error = None
+        except BaseException as e:
+            error = e
+
+        with self._lock:
+            self._in_flight -= 1
+
+            if error is None:
+                self._stats["completed"] += 1
+                self._stats["render_ms_total"] += elapsed_ms
+                self._stats["render_ms_max"] = max(self._stats["render_ms_max"], elapsed_ms)
+                self._recent.append(time.monotonic())
+            elif isinstance(error, RenderTimeout):
+                self._stats["timeouts"] += 1
+            else:
+                self._stats["failed"] += 1
+
+        # A crashed process breaks the whole executor: start a new one on
+        # the next submit
+        if isinstance(error, BrokenProcessPool):
+            self._discard(executor)
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            now = time.monotonic()
+            while self._recent and self._recent[0] < now - THROUGHPUT_WINDOW_SECONDS:
+                self._recent.popleft()
+            stats.update({
+                "backend": self.backend,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "timeout_s": self.timeout,
+                "max_timeout_s": self.max_timeout,
+                "running": self._executor is not None,
+                "in_flight": self._in_flight,
+                "pdfs_per_s": round(len(self._recent) / THROUGHPUT_WINDOW_SECONDS, 3),
+            })
+
+        stats["render_ms_avg"] = (
+            round(stats["render_ms_total"] / stats["completed"], 3) if stats["completed"] else 0.0
+        )
+        return stats
+
+
+# One pool per process, started on first use
+renderer = RendererPool()
+
+
+def render_pdf(html: str | list[str], out_path: str, options: dict | None = None) -> str:
+    return renderer.render(html, out_path, options)
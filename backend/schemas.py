@@ -51,4 +51,10 @@ class OutpassApply(BaseModel):
 
 class OutpassReview(BaseModel):
     status: str
-    parent_mobile: Optional[str] = None
\ No newline at end of file
+    parent_mobile: Optional[str] = None
+
+class BulkReviewItem(BaseModel):
+    type: str
+    id: int
+    status: str
+    remark: Optional[str] = None
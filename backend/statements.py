@@ -0,0 +1,1598 @@
+"""
+Named, module-level SQL statements for the API routes, the worker and
+the bulk/export paths.
+
+The advisor/HOD dashboards used to rebuild the same multi-kilobyte
+text(f"...{student_filter}...") on every call. Here each statement is
+built once at import and tagged with a statement_name execution option,
+so SQLAlchemy's compiled cache and asyncpg's prepared-statement cache
+see one stable statement per name. Per-name call counts and timings are
+collected from the engine cursor events.
+
+Keyset-paginated lists are registered twice through paged(): once for
+the first page and once past a cursor (pagination.Page.statement picks
+one), so they stay static too.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from pagination import KeysetPage, keyset_after
+
+REGISTRY = {}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def named(name: str, sql: str):
+    stmt = text(sql).execution_options(statement_name=name)
+    REGISTRY[name] = stmt
+    return stmt
+
+
+def paged(name: str, sql: str, *columns: str) -> KeysetPage:
+    """Register a keyset page (sql with an {after} slot) once per cursor state."""
+    return KeysetPage(
+        first=named(name, sql.format(after="TRUE")),
+        after=named(f"{name}.after", sql.format(after=keyset_after(*columns))),
+        width=len(columns),
+    )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and context.execution_options.get("statement_name"):
+        context._statement_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+
+    name = context.execution_options.get("statement_name")
+    started = getattr(context, "_statement_started", None)
+    if not name or started is None:
+        return
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    with _stats_lock:
+        entry = _stats.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+        entry["calls"] += 1
+        entry["total_ms"] += elapsed_ms
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+
+
+def statement_stats() -> dict:
+    with _stats_lock:
+        snapshot = {name: dict(entry) for name, entry in _stats.items()}
+
+    for name in REGISTRY:
+        snapshot.setdefault(name, {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+
+    for entry in snapshot.values():
+        entry["avg_ms"] = round(entry["total_ms"] / entry["calls"], 3) if entry["calls"] else 0.0
+
+    return snapshot
+
+
+# -------------------------------------------------
+# DASHBOARD COUNTERS
+# -------------------------------------------------
+# request_counters is maintained by a trigger on request_feed
+# (migrations/0005_request_counters.sql, 0014_request_feed_scopes.sql);
+# every stats endpoint sums a handful of its rows.
+COUNTER_TOTALS = """
+    SELECT
+        COALESCE(SUM(count), 0)::BIGINT AS total,
+        COALESCE(SUM(count) FILTER (WHERE status = 'PENDING'), 0)::BIGINT AS pending,
+        COALESCE(SUM(count) FILTER (WHERE status = 'APPROVED'), 0)::BIGINT AS approved,
+        COALESCE(SUM(count) FILTER (WHERE status = 'REJECTED'), 0)::BIGINT AS rejected
+    FROM request_counters
+"""
+
+
+# -------------------------------------------------
+# ADVISOR
+# -------------------------------------------------
+# request_counters SECTION scope ids for the sections this advisor handles
+ADVISOR_SECTIONS = """
+    SELECT COALESCE(department, '') || ':' || COALESCE(section, '') || ':'
+           || COALESCE(year_of_study::TEXT, '')
+    FROM section_advisors
+    WHERE advisor_id = :aid
+"""
+
+# Students handled by advisor :aid (advisor_students is kept in sync with
+# students / section_advisors by triggers, PK (advisor_id, reg_no))
+ADVISOR_STUDENT_FILTER = """
+    EXISTS (
+        SELECT 1 FROM advisor_students ast
+        WHERE ast.advisor_id = :aid AND ast.reg_no = s.reg_no
+    )
+"""
+
+ADVISOR_PENDING_LEAVES = named("advisor.pending.leaves", f"""
+    SELECT
+        l.leave_id AS request_id,
+        'LEAVE' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        l.start_date,
+        l.end_date,
+        l.category,
+        l.applied_at AS created_at
+    FROM leave_requests l
+    JOIN students s ON s.reg_no = l.reg_no
+    WHERE l.overall_status = 'PENDING'
+      AND l.current_stage = 'ADVISOR'
+      AND {ADVISOR_STUDENT_FILTER}
+    ORDER BY l.applied_at DESC
+""")
+
+ADVISOR_PENDING_BONAFIDES = named("advisor.pending.bonafides", f"""
+    SELECT
+        b.request_id AS request_id,
+        'BONAFIDE' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        b.category,
+        b.purpose,
+        b.applied_at AS created_at
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    WHERE b.overall_status = 'PENDING'
+      AND b.current_stage = 'ADVISOR'
+      AND {ADVISOR_STUDENT_FILTER}
+    ORDER BY b.applied_at DESC
+""")
+
+ADVISOR_PENDING_OUTPASSES = named("advisor.pending.outpasses", f"""
+    SELECT
+        o.outpass_id AS request_id,
+        'OUTPASS' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        o.out_date,
+        o.out_time,
+        o.purpose,
+        o.created_at
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.overall_status = 'PENDING'
+      AND o.current_stage = 'ADVISOR'
+      AND {ADVISOR_STUDENT_FILTER}
+    ORDER BY o.created_at DESC
+""")
+
+ADVISOR_PENDING_ODS = named("advisor.pending.ods", f"""
+    SELECT
+        o.od_id AS request_id,
+        'OD' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        o.from_date,
+        o.to_date,
+        o.purpose,
+        o.created_at
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.overall_status = 'PENDING'
+      AND o.current_stage = 'ADVISOR'
+      AND {ADVISOR_STUDENT_FILTER}
+    ORDER BY o.created_at DESC
+""")
+
+
+# request_feed.assignee keys for the sections this advisor handles
+ADVISOR_ASSIGNEES = """
+    SELECT 'section:' || department || ':' || section || ':' || year_of_study
+    FROM section_advisors
+    WHERE advisor_id = :aid
+"""
+
+ADVISOR_PENDING_PREVIEW = named("advisor.pending.preview", f"""
+    SELECT f.request_type AS type, f.request_id AS id, s.name, f.created_at AS dt
+    FROM request_feed f
+    JOIN students s ON s.reg_no = f.reg_no
+    WHERE f.assignee IN ({ADVISOR_ASSIGNEES})
+      AND f.status = 'PENDING'
+    ORDER BY f.created_at DESC
+    LIMIT 5
+""")
+
+ADVISOR_STATS = named("advisor.stats", f"""
+    {COUNTER_TOTALS}
+    WHERE scope_type = 'SECTION'
+      AND scope_id IN ({ADVISOR_SECTIONS})
+""")
+
+ADVISOR_BREAKDOWN = named("advisor.breakdown", f"""
+    SELECT request_type, COALESCE(SUM(count), 0)::BIGINT AS count
+    FROM request_counters
+    WHERE scope_type = 'SECTION'
+      AND scope_id IN ({ADVISOR_SECTIONS})
+      AND status = 'PENDING'
+    GROUP BY request_type
+""")
+
+
+# -------------------------------------------------
+# HOD
+# -------------------------------------------------
+HOD_STATS = named("hod.stats", f"""
+    {COUNTER_TOTALS}
+    WHERE scope_type = 'DEPT'
+      AND scope_id = :dept
+      AND request_type IN ('BONAFIDE', 'OUTPASS', 'OD')
+""")
+
+HOD_BREAKDOWN = named("hod.breakdown", """
+    SELECT request_type, COALESCE(SUM(count), 0)::BIGINT AS count
+    FROM request_counters
+    WHERE scope_type = 'DEPT'
+      AND scope_id = :dept
+      AND status = 'PENDING'
+    GROUP BY request_type
+""")
+
+HOD_PENDING_PREVIEW = named("hod.pending.preview", """
+    SELECT
+        f.request_type AS type,
+        f.request_id AS id,
+        s.name,
+        s.reg_no,
+        s.department,
+        f.created_at AS dt
+    FROM request_feed f
+    JOIN students s ON s.reg_no = f.reg_no
+    WHERE f.assignee = 'dept:' || :dept
+      AND f.status = 'PENDING'
+    ORDER BY f.created_at DESC
+""")
+
+
+# -------------------------------------------------
+# WARDEN
+# -------------------------------------------------
+WARDEN_STATS = named("warden.stats", f"""
+    {COUNTER_TOTALS}
+    WHERE scope_type = 'HOSTEL'
+      AND scope_id = '*'
+""")
+
+
+# -------------------------------------------------
+# STUDENT
+# -------------------------------------------------
+STUDENT_STATS = named("student.stats", f"""
+    {COUNTER_TOTALS}
+    WHERE scope_type = 'STUDENT'
+      AND scope_id = :reg_no
+""")
+
+STUDENT_FEED_RECENT = named("student.feed.recent", """
+    SELECT request_id AS id, request_type AS type, created_at, status
+    FROM request_feed
+    WHERE reg_no = :reg_no
+    ORDER BY created_at DESC
+    LIMIT :limit
+""")
+
+# Keyset pages of a student's feed, newest first; see pagination.Page
+STUDENT_FEED_PAGE = paged("student.feed.page", """
+    SELECT request_id AS id, request_type AS type, created_at, status
+    FROM request_feed
+    WHERE reg_no = :reg_no
+      AND {after}
+    ORDER BY created_at DESC, request_type DESC, request_id DESC
+    LIMIT :_limit
+""", "created_at", "request_type", "request_id")
+
+
+# -------------------------------------------------
+# EXPORTS (streamed, see exports.py)
+# -------------------------------------------------
+# Optional filters: a NULL parameter disables its condition
+HOD_EXPORT = named("hod.export", """
+    SELECT * FROM (
+        SELECT 'BONAFIDE' AS type,
+               b.request_id AS id,
+               s.name,
+               s.reg_no,
+               s.section,
+               s.year_of_study,
+               b.advisor_status,
+               b.hod_status AS status,
+               b.applied_at AS created_at,
+               COALESCE(b.hod_reviewed_at, b.applied_at) AS acted_on
+        FROM bonafide_requests b
+        JOIN students s ON s.reg_no = b.reg_no
+        WHERE s.department = :dept AND b.hod_status <> 'PENDING'
+
+        UNION ALL
+
+        SELECT 'OUTPASS',
+               o.outpass_id,
+               s.name,
+               s.reg_no,
+               s.section,
+               s.year_of_study,
+               o.advisor_status,
+               o.hod_status,
+               o.created_at,
+               COALESCE(o.hod_reviewed_at, o.created_at)
+        FROM outpass_requests o
+        JOIN students s ON s.reg_no = o.reg_no
+        WHERE s.department = :dept AND o.hod_status <> 'PENDING'
+
+        UNION ALL
+
+        SELECT 'OD',
+               o.od_id,
+               s.name,
+               s.reg_no,
+               s.section,
+               s.year_of_study,
+               o.advisor_status,
+               o.hod_status,
+               o.created_at,
+               COALESCE(o.hod_reviewed_at, o.created_at)
+        FROM od_requests o
+        JOIN students s ON s.reg_no = o.reg_no
+        WHERE s.department = :dept AND o.hod_status <> 'PENDING'
+    ) x
+    WHERE (CAST(:rtype AS TEXT) IS NULL OR type = :rtype)
+      AND (CAST(:status AS TEXT) IS NULL OR status = :status)
+      AND (CAST(:from_date AS DATE) IS NULL OR acted_on >= CAST(:from_date AS DATE))
+      AND (CAST(:to_date AS DATE) IS NULL OR acted_on < CAST(:to_date AS DATE) + 1)
+    ORDER BY acted_on DESC, type DESC, id DESC
+""")
+
+DEPT_COMPLAINTS_EXPORT = named("dept.complaints.export", """
+    SELECT
+        c.complaint_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        c.complaint_text,
+        c.status,
+        c.attachment_name,
+        c.created_at
+    FROM complaints c
+    JOIN students s ON s.reg_no = c.reg_no
+    WHERE c.department = :dept
+      AND (CAST(:status AS TEXT) IS NULL OR c.status = :status)
+      AND (CAST(:from_date AS DATE) IS NULL OR c.created_at >= CAST(:from_date AS DATE))
+      AND (CAST(:to_date AS DATE) IS NULL OR c.created_at < CAST(:to_date AS DATE) + 1)
+    ORDER BY c.created_at DESC, c.complaint_id DESC
+""")
+
+
+# -------------------------------------------------
+# VERSION STAMPS (conditional GET, see conditional.py)
+# -------------------------------------------------
+# md5 over the (scope, version) pairs of the scopes a response depends on;
+# reads request_versions only
+_VERSION_STAMP = """
+    SELECT
+        md5(COALESCE(string_agg(k.scope || '=' || COALESCE(v.version, 0), ',' ORDER BY k.scope), '')) AS tag,
+        MAX(v.updated_at) AS modified
+    FROM ({scopes}) AS k(scope)
+    LEFT JOIN request_versions v ON v.scope = k.scope
+"""
+
+ADVISOR_QUEUE_VERSION = named(
+    "version.advisor.queue", _VERSION_STAMP.format(scopes=ADVISOR_ASSIGNEES)
+)
+
+HOD_QUEUE_VERSION = named(
+    "version.hod.queue", _VERSION_STAMP.format(scopes="SELECT 'dept:' || CAST(:dept AS TEXT)")
+)
+
+WARDEN_QUEUE_VERSION = named(
+    "version.warden.queue", _VERSION_STAMP.format(scopes="SELECT 'warden:*'")
+)
+
+REQUEST_VERSION = named("version.request", _VERSION_STAMP.format(
+    scopes="SELECT 'request:' || CAST(:rtype AS TEXT) || ':' || CAST(:rid AS TEXT)"
+))
+
+
+# -------------------------------------------------
+# INBOX EVENTS (SSE replay, see events.py)
+# -------------------------------------------------
+# Ids are taken at INSERT, not commit: an event with a lower id than
+# :after_id may have committed after it, so the replay also goes back
+# :lookback seconds before :after_id's event (the stream drops the ones
+# it has already sent)
+REQUEST_EVENTS_SINCE = named("events.since", """
+    SELECT id, kind, request_type, request_id, status, stage, scopes, created_at
+    FROM request_events
+    WHERE scopes && CAST(:scopes AS TEXT[])
+      AND id <> :after_id
+      AND (
+            id > :after_id
+         OR created_at >= (SELECT created_at FROM request_events WHERE id = :after_id)
+                          - make_interval(secs => :lookback)
+      )
+    ORDER BY id
+    LIMIT :limit
+""")
+
+
+# -------------------------------------------------
+# BULK REVIEW (see bulk_review.py)
+# -------------------------------------------------
+# One statement per (approver, request type): the items arrive as three
+# parallel arrays and every eligible row is updated in a single UPDATE.
+# The WHERE guards are the ones the single review endpoints use, so an
+# item already acted on is simply not returned. The rows come back with
+# the student fields the notification mails and PDFs need.
+REVIEW_TABLES = {
+    "LEAVE": ("leave_requests", "leave_id"),
+    "BONAFIDE": ("bonafide_requests", "request_id"),
+    "OUTPASS": ("outpass_requests", "outpass_id"),
+    "OD": ("od_requests", "od_id"),
+}
+
+_BULK_REVIEW = """
+    WITH v AS (
+        SELECT * FROM unnest(
+            CAST(:ids AS INTEGER[]),
+            CAST(:statuses AS TEXT[]),
+            CAST(:remarks AS TEXT[])
+        ) AS v(id, status, remark)
+    ),
+    u AS (
+        UPDATE {table} t
+        SET {sets}
+        FROM v
+        WHERE t.{key} = v.id
+          AND {guard}
+        RETURNING t.*
+    )
+    SELECT u.{key} AS item_id, u.*, s.name, s.department, s.year_of_study,
+           s.residence_type, s.email
+    FROM u
+    JOIN students s ON s.reg_no = u.reg_no
+"""
+
+
+def _bulk_review(role: str, rtype: str, sets: str, guard: str):
+    table, key = REVIEW_TABLES[rtype]
+    return named(f"review.bulk.{role}.{rtype.lower()}", _BULK_REVIEW.format(
+        table=table, key=key, sets=sets, guard=guard
+    ))
+
+
+BULK_REVIEW = {
+    "advisor": {
+        "LEAVE": _bulk_review("advisor", "LEAVE", """
+            status = v.status,
+            advisor_remark = v.remark,
+            acted_advisor_id = :actor,
+            reviewed_at = CURRENT_TIMESTAMP,
+            advisor_reviewed_at = CURRENT_TIMESTAMP
+        """, "t.status = 'PENDING'"),
+        "BONAFIDE": _bulk_review("advisor", "BONAFIDE", """
+            advisor_status = v.status,
+            acted_advisor_id = :actor,
+            advisor_reviewed_at = CURRENT_TIMESTAMP
+        """, "t.advisor_status = 'PENDING'"),
+        "OUTPASS": _bulk_review("advisor", "OUTPASS", """
+            advisor_status = v.status,
+            acted_advisor_id = :actor
+        """, "t.advisor_status = 'PENDING'"),
+        "OD": _bulk_review("advisor", "OD", """
+            advisor_status = v.status,
+            acted_advisor_id = :actor,
+            advisor_reviewed_at = CURRENT_TIMESTAMP
+        """, "t.advisor_status = 'PENDING'"),
+    },
+    "hod": {
+        "BONAFIDE": _bulk_review("hod", "BONAFIDE", """
+            hod_status = v.status,
+            hod_reviewed_at = CURRENT_TIMESTAMP
+        """, "t.advisor_status = 'APPROVED' AND t.hod_status = 'PENDING'"),
+        "OUTPASS": _bulk_review("hod", "OUTPASS", """
+            hod_status = v.status,
+            acted_hod_id = :actor
+        """, "t.advisor_status = 'APPROVED' AND t.hod_status = 'PENDING'"),
+        "OD": _bulk_review("hod", "OD", """
+            hod_status = v.status,
+            hod_remark = v.remark,
+            acted_hod_id = :actor,
+            hod_reviewed_at = CURRENT_TIMESTAMP
+        """, "t.advisor_status = 'APPROVED' AND t.hod_status = 'PENDING'"),
+    },
+    "warden": {
+        "OUTPASS": _bulk_review("warden", "OUTPASS", """
+            warden_status = v.status,
+            acted_warden_id = :actor
+        """, "t.hod_status = 'APPROVED' AND t.warden_status = 'PENDING'"),
+    },
+}
+
+# Taken before each bulk UPDATE: row locks in id order, so two
+# overlapping batches queue behind each other instead of deadlocking
+# (UPDATE ... FROM unnest locks rows in whatever order the join yields)
+BULK_REVIEW_LOCK = {
+    rtype: named(f"review.bulk.lock.{rtype.lower()}", f"""
+        SELECT {key}
+        FROM {table}
+        WHERE {key} = ANY(CAST(:ids AS INTEGER[]))
+        ORDER BY {key}
+        FOR UPDATE
+    """)
+    for rtype, (table, key) in REVIEW_TABLES.items()
+}
+
+# Where the items the bulk UPDATE skipped stand now (conflict report)
+REQUEST_STATES = {
+    rtype: named(f"review.states.{rtype.lower()}", f"""
+        SELECT {key} AS item_id, overall_status, current_stage
+        FROM {table}
+        WHERE {key} = ANY(CAST(:ids AS INTEGER[]))
+    """)
+    for rtype, (table, key) in REVIEW_TABLES.items()
+}
+
+
+# -------------------------------------------------
+# JOBS (see jobs.py / worker.py)
+# -------------------------------------------------
+JOB_ENQUEUE = named("jobs.enqueue", """
+    INSERT INTO jobs (kind, payload, request_type, request_id)
+    SELECT kind, CAST(payload AS JSONB), request_type, request_id
+    FROM unnest(
+        CAST(:kinds AS TEXT[]),
+        CAST(:payloads AS TEXT[]),
+        CAST(:request_types AS TEXT[]),
+        CAST(:request_ids AS INTEGER[])
+    ) AS j(kind, payload, request_type, request_id)
+    RETURNING id, request_type, request_id
+""")
+
+# Delivered when the enqueueing transaction commits
+JOB_NOTIFY = named("jobs.notify", "SELECT pg_notify('jobs', '')")
+
+JOB_CLAIM = named("jobs.claim", """
+    UPDATE jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = :worker,
+        locked_at = now()
+    FROM (
+        SELECT id
+        FROM jobs
+        WHERE status = 'queued'
+          AND run_after <= now()
+        ORDER BY run_after, id
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    ) c
+    WHERE j.id = c.id
+    RETURNING j.id, j.kind, j.payload, j.request_type, j.request_id, j.attempts, j.max_attempts
+""")
+
+JOB_DONE = named("jobs.done", """
+    UPDATE jobs
+    SET status = 'done',
+        finished_at = now(),
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = :id AND locked_by = :worker
+""")
+
+# Back off exponentially between attempts; give up after max_attempts
+JOB_FAILED = named("jobs.failed", """
+    UPDATE jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+        finished_at = CASE WHEN attempts >= max_attempts THEN now() END,
+        run_after = now() + make_interval(secs => LEAST(
+            CAST(:backoff AS DOUBLE PRECISION) * power(2, attempts - 1),
+            CAST(:max_backoff AS DOUBLE PRECISION)
+        )),
+        last_error = :error,
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE id = :id AND locked_by = :worker
+""")
+
+# Jobs whose worker died mid-run go back to the queue
+JOB_REAP = named("jobs.reap", """
+    UPDATE jobs
+    SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+        finished_at = CASE WHEN attempts >= max_attempts THEN now() END,
+        last_error = 'worker lock expired',
+        locked_by = NULL,
+        locked_at = NULL
+    WHERE status = 'running'
+      AND locked_at < now() - make_interval(secs => CAST(:timeout AS DOUBLE PRECISION))
+    RETURNING id
+""")
+
+_JOB_STATE = """
+    SELECT id, kind, request_type, request_id, status, attempts, max_attempts,
+           run_after, last_error, created_at, finished_at
+    FROM jobs
+"""
+
+JOB_STATE = named("jobs.state", _JOB_STATE + " WHERE id = :id")
+
+REQUEST_JOBS = named("jobs.request", _JOB_STATE + """
+    WHERE request_type = :rtype AND request_id = :rid
+    ORDER BY id
+""")
+
+# Outpass + student fields for the outpass / leave form PDFs and mails
+OUTPASS_DOCUMENT = named("documents.outpass", """
+    SELECT
+        o.*,
+        s.name,
+        s.department,
+        s.year_of_study,
+        s.residence_type,
+        s.email
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.outpass_id = :oid
+""")
+
+# Request + student fields for the bonafide certificate PDF and mail
+BONAFIDE_DOCUMENT = named("documents.bonafide", """
+    SELECT
+        s.name,
+        s.reg_no,
+        s.department,
+        s.section,
+        s.year_of_study,
+        s.email,
+        s.gender,
+        s.residence_type,
+
+        b.request_id,
+        b.purpose,
+        b.category,
+        b.intern_start_date,
+        b.intern_end_date,
+        b.applied_at,
+        b.advisor_status,
+        b.hod_status
+
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    WHERE b.request_id = :rid
+""")
+
+# Whether a staff member may see a student's documents: an advisor for
+# their own sections' students, an HOD for their department's (the
+# first-year HOD for every first year), a warden for outpasses from
+# their floors
+DOCUMENT_ACCESS = {
+    "advisor": named("documents.access.advisor", """
+        SELECT EXISTS (
+            SELECT 1 FROM advisor_students
+            WHERE advisor_id = :uid AND reg_no = :reg_no
+        )
+    """),
+    "hod": named("documents.access.hod", """
+        SELECT EXISTS (
+            SELECT 1
+            FROM hods h
+            JOIN students s ON s.reg_no = :reg_no
+            WHERE h.hod_id = :uid
+              AND (h.department = s.department OR (h.is_first_year AND s.year_of_study = 1))
+        )
+    """),
+    "warden": named("documents.access.warden", """
+        SELECT EXISTS (
+            SELECT 1
+            FROM outpass_requests o
+            JOIN hostel_floors hf ON hf.floor_id = o.floor_id
+            WHERE o.outpass_id = :doc_id AND hf.warden_id = :uid
+        )
+    """),
+}
+
+# The warden's print run: everything approved to go out on :day from
+# their floors, in walking order
+WARDEN_PRINT_RUN = named("documents.warden_print_run", """
+    SELECT
+        o.*,
+        s.name,
+        s.department,
+        s.year_of_study,
+        s.residence_type,
+        s.email
+    FROM outpass_requests o
+    JOIN hostel_floors hf ON hf.floor_id = o.floor_id
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE hf.warden_id = :wid
+      AND o.out_date = :day
+      AND o.overall_status = 'APPROVED'
+      AND o.warden_status = 'APPROVED'
+    ORDER BY o.floor_id, o.room_no, o.outpass_id
+""")
+
+JOB_QUEUE_STATS = named("jobs.stats", """
+    SELECT
+        kind,
+        status,
+        COUNT(*) AS count,
+        EXTRACT(EPOCH FROM now() - MIN(run_after)) FILTER (
+            WHERE status = 'queued' AND run_after <= now()
+        ) AS oldest_due_s
+    FROM jobs
+    WHERE status IN ('queued', 'running', 'failed')
+    GROUP BY kind, status
+    ORDER BY kind, status
+""")
+
+
+# -------------------------------------------------
+# ROUTES: AUTH
+# -------------------------------------------------
+# Resolve + upsert the user at Google login (see app.google_login)
+LOGIN_UPSERT = named("auth.login_upsert", """
+    WITH existing AS (
+        SELECT user_id, email, reg_no, role
+        FROM users
+        WHERE email = :email
+    ),
+    identity AS (
+        SELECT * FROM (
+            SELECT 1 AS priority, reg_no, 'STUDENT' AS role FROM students WHERE email = :email
+            UNION ALL
+            SELECT 2, NULL, 'ADVISOR' FROM advisors WHERE email = :email
+            UNION ALL
+            SELECT 3, NULL, 'HOD' FROM hods WHERE email = :email
+            UNION ALL
+            SELECT 4, NULL, 'WARDEN' FROM wardens WHERE email = :email
+        ) x
+        ORDER BY priority
+        LIMIT 1
+    ),
+    inserted AS (
+        INSERT INTO users (email, reg_no, role)
+        SELECT :email, reg_no, role
+        FROM identity
+        WHERE NOT EXISTS (SELECT 1 FROM existing)
+        ON CONFLICT (email) DO NOTHING
+        RETURNING user_id, email, reg_no, role
+    )
+    SELECT * FROM existing
+    UNION ALL
+    SELECT * FROM inserted
+""")
+
+
+# -------------------------------------------------
+# ROUTES: LEAVE
+# -------------------------------------------------
+LEAVE_APPLY_STUDENT = named("leave.apply.student", """
+    SELECT department, year_of_study, residence_type
+    FROM students
+    WHERE reg_no = :reg_no
+""")
+
+LEAVE_PENDING = named("leave.pending", """
+    SELECT
+        lr.leave_id,
+        lr.reg_no,
+        s.name AS student_name,
+        lr.category,
+        lr.start_date,
+        lr.end_date,
+        lr.reason,
+        lr.status
+    FROM leave_requests lr
+    JOIN students s ON s.reg_no = lr.reg_no
+    JOIN advisor_students ast
+      ON ast.advisor_id = :advisor_id
+     AND ast.reg_no = s.reg_no
+    WHERE lr.overall_status = 'PENDING'
+      AND lr.current_stage = 'ADVISOR'
+    ORDER BY lr.leave_id DESC
+""")
+
+LEAVE_REVIEW = named("leave.review", """
+    UPDATE leave_requests
+    SET status = :status,
+        acted_advisor_id = :advisor_id,
+        advisor_remark = :remark,
+        advisor_reviewed_at = CURRENT_TIMESTAMP
+    WHERE leave_id = :leave_id
+    AND status = 'PENDING'
+""")
+
+LEAVE_REVIEW_MAIL = named("leave.review.mail", """
+    SELECT s.email
+    FROM leave_requests l
+    JOIN students s ON s.reg_no = l.reg_no
+    WHERE l.leave_id = :lid
+""")
+
+LEAVE_DETAIL = named("leave.detail", """
+    SELECT
+        l.leave_id AS id,
+        'leave' AS type,
+
+        -- 👤 Student Info
+        s.name AS studentName,
+        s.reg_no AS rollNumber,
+        s.department,
+        s.email AS studentEmail,
+
+        -- 📄 Leave Details
+        l.category,
+        l.start_date AS startDate,
+        l.end_date AS endDate,
+        l.reason,
+
+        -- 📊 Status Info
+        l.status,
+        l.advisor_remark AS advisorComment,
+
+        -- ⏱ Dates
+        l.applied_at AS createdAt,
+        l.advisor_reviewed_at AS advisorActedAt
+
+    FROM leave_requests l
+    JOIN students s ON s.reg_no = l.reg_no
+    WHERE l.leave_id = :id
+""")
+
+
+# -------------------------------------------------
+# ROUTES: BONAFIDE
+# -------------------------------------------------
+BONAFIDE_APPLY_STUDENT = named("bonafide.apply.student", """
+    SELECT department, section, year_of_study
+    FROM students
+    WHERE reg_no = :reg_no
+""")
+
+BONAFIDE_FIRST_YEAR_HOD = named("bonafide.apply.first_year_hod", """
+    SELECT hod_id FROM hods WHERE is_first_year = TRUE
+""")
+
+BONAFIDE_DEPT_HOD = named("bonafide.apply.dept_hod", """
+    SELECT hod_id FROM hods WHERE department = :department AND is_first_year = FALSE
+""")
+
+BONAFIDE_INSERT = named("bonafide.apply.insert", """
+    INSERT INTO bonafide_requests
+    (reg_no, hod_id, category, purpose, intern_start_date, intern_end_date, advisor_status, hod_status)
+    VALUES (:reg_no, :hod_id, :category, :purpose, :intern_start_date, :intern_end_date, 'PENDING', 'PENDING')
+""")
+
+BONAFIDE_ADVISOR_PENDING = named("bonafide.advisor.pending", """
+    SELECT
+        b.request_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.department,
+        s.section,
+        s.year_of_study,
+        b.category,
+        b.purpose,
+        b.intern_start_date,
+        b.intern_end_date,
+        b.advisor_status
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    JOIN advisor_students ast
+      ON ast.advisor_id = :advisor_id
+     AND ast.reg_no = s.reg_no
+    WHERE b.overall_status = 'PENDING'
+      AND b.current_stage = 'ADVISOR'
+""")
+
+BONAFIDE_ADVISOR_REVIEW = named("bonafide.advisor.review", """
+    UPDATE bonafide_requests
+    SET advisor_status = :status,
+        acted_advisor_id = :advisor_id,
+        advisor_reviewed_at = CURRENT_TIMESTAMP
+    WHERE request_id = :rid
+    AND advisor_status = 'PENDING'
+""")
+
+BONAFIDE_ADVISOR_HISTORY = named("bonafide.advisor.history", """
+    SELECT
+        b.request_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        b.category,
+        b.purpose,
+        b.advisor_status,
+        b.advisor_reviewed_at
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    JOIN advisor_students ast
+      ON ast.advisor_id = :advisor_id
+     AND ast.reg_no = s.reg_no
+    WHERE b.advisor_status <> 'PENDING'
+    ORDER BY b.advisor_reviewed_at DESC
+""")
+
+BONAFIDE_HOD_PENDING = named("bonafide.hod.pending", """
+    SELECT
+        b.request_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        b.category,
+        b.purpose,
+        b.advisor_status,
+        b.hod_status
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    WHERE b.hod_id = :hid
+    AND b.overall_status = 'PENDING'
+    AND b.current_stage = 'HOD'
+""")
+
+BONAFIDE_HOD_REVIEW = named("bonafide.hod.review", """
+    UPDATE bonafide_requests
+    SET hod_status = :status,
+        hod_reviewed_at = CURRENT_TIMESTAMP
+    WHERE request_id = :rid
+    AND advisor_status = 'APPROVED'
+    AND hod_status = 'PENDING'
+""")
+
+BONAFIDE_DETAIL = named("bonafide.detail", """
+    SELECT
+        b.request_id AS id,
+        'bonafide' AS type,
+        s.name AS name,
+        s.reg_no AS rollNo,
+        s.department,
+        b.category,
+        b.purpose,
+        b.applied_at AS submittedAt,
+        b.intern_start_date AS internshipStartDate,
+        b.intern_end_date AS internshipEndDate, -- ✅ FIX
+        b.hod_status AS status,
+        b.advisor_status
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    WHERE b.request_id = :id
+""")
+
+
+# -------------------------------------------------
+# ROUTES: OUTPASS
+# -------------------------------------------------
+OUTPASS_APPLY_STUDENT = named("outpass.apply.student", """
+    SELECT department, section, year_of_study,
+           residence_type, email
+    FROM students
+    WHERE reg_no = :reg_no
+""")
+
+OUTPASS_INSERT = named("outpass.apply.insert", """
+    INSERT INTO outpass_requests (
+        reg_no, year_of_study,
+        out_date, out_time,
+        in_date, in_time,
+        purpose,
+        contact_number,
+        parent_mobile,
+        hostel_id, floor_id, room_no,
+        advisor_status, hod_status, warden_status
+    )
+    VALUES (
+        :reg_no, :year_of_study,
+        :out_date, :out_time,
+        :in_date, :in_time,
+        :purpose,
+        :contact_number,
+        :parent_mobile,
+        :hostel_id, :floor_id, :room_no,
+        'PENDING','PENDING','PENDING'
+    )
+""")
+
+OUTPASS_ADVISOR_PENDING = named("outpass.advisor.pending", """
+    SELECT
+        o.outpass_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        s.residence_type,
+        o.out_date,
+        o.out_time,
+        o.in_date,
+        o.in_time,
+        o.purpose,
+        o.contact_number
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    JOIN advisor_students ast
+      ON ast.advisor_id = :advisor_id
+     AND ast.reg_no = s.reg_no
+    WHERE o.overall_status = 'PENDING'
+      AND o.current_stage = 'ADVISOR'
+    ORDER BY o.outpass_id DESC
+""")
+
+OUTPASS_ADVISOR_REVIEW = named("outpass.advisor.review", """
+    UPDATE outpass_requests
+    SET advisor_status = :status,
+        acted_advisor_id = :advisor_id
+    WHERE outpass_id = :oid
+    AND advisor_status = 'PENDING'
+""")
+
+OUTPASS_ADVISOR_REVIEW_MAIL = named("outpass.advisor.review.mail", """
+    SELECT o.out_date, s.email
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.outpass_id = :oid
+""")
+
+OUTPASS_HOD_PENDING = named("outpass.hod.pending", """
+    SELECT
+        o.outpass_id,
+        s.name AS student_name,   -- 👤 clearer naming
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        s.residence_type,
+        o.out_date,
+        o.out_time,
+        o.purpose
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    JOIN hods h ON h.department = s.department
+    WHERE h.hod_id = :hod_id
+      AND o.overall_status = 'PENDING'
+      AND o.current_stage = 'HOD'
+    ORDER BY o.outpass_id DESC
+""")
+
+OUTPASS_HOD_REVIEW = named("outpass.hod.review", """
+    UPDATE outpass_requests
+    SET hod_status = :status,
+        acted_hod_id = :hid
+    WHERE outpass_id = :oid
+    AND advisor_status = 'APPROVED'
+    AND hod_status = 'PENDING'
+""")
+
+OUTPASS_WARDEN_PENDING = named("outpass.warden.pending", """
+    SELECT
+        o.outpass_id,
+        s.name AS student_name,   -- 👤 added
+        s.reg_no,
+        s.year_of_study,
+        s.section,
+        o.out_date,
+        o.out_time,
+        o.in_date,
+        o.in_time,
+        o.room_no,
+        o.purpose
+    FROM outpass_requests o
+    JOIN hostel_floors hf ON hf.floor_id = o.floor_id
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE hf.warden_id = :warden_id
+      AND o.overall_status = 'PENDING'
+      AND o.current_stage = 'WARDEN'
+    ORDER BY o.outpass_id DESC
+""")
+
+OUTPASS_WARDEN_REVIEW = named("outpass.warden.review", """
+    UPDATE outpass_requests
+    SET warden_status = :status,
+        acted_warden_id = :wid
+    WHERE outpass_id = :oid
+    AND hod_status = 'APPROVED'
+    AND warden_status = 'PENDING'
+""")
+
+OUTPASS_DETAIL = named("outpass.detail", """
+    SELECT
+        o.outpass_id AS id,
+        'outpass' AS type,
+
+        -- 👤 Student Info
+        s.name AS studentName,
+        s.reg_no AS rollNumber,
+        s.department,
+        s.email AS studentEmail,
+        o.year_of_study,
+
+        -- 📄 Outpass Details
+        o.out_date AS outDate,
+        o.out_time AS outTime,
+        o.in_date AS inDate,
+        o.in_time AS inTime,
+        o.purpose,
+        o.contact_number AS contactNumber,
+        o.parent_mobile AS parentContact,
+
+        -- 🏨 Hostel Info
+        o.hostel_id AS hostelId,
+        o.floor_id AS floorId,
+        o.room_no AS roomNumber,
+
+        -- 📊 Status Info
+        o.advisor_status AS advisorStatus,
+        o.hod_status AS hodStatus,
+        o.warden_status AS wardenStatus,
+
+        -- ⏱ Dates
+        o.created_at AS createdAt,
+        o.hod_reviewed_at AS hodActedAt
+
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.outpass_id = :id
+""")
+
+WARDEN_PENDING_PREVIEW = named("warden.pending.preview", """
+    SELECT
+        o.outpass_id AS id,
+        'outpass' AS type,
+        s.name,
+        s.reg_no AS rollNo,
+        s.department,
+        o.out_date AS outDate,
+        o.out_time AS outTime,
+        o.in_date AS inDate,
+        o.in_time AS inTime,
+        o.contact_number AS contact,
+        o.parent_mobile AS parentMobile,
+        o.purpose,
+        o.created_at AS submittedAt,
+        o.hod_status,
+        o.advisor_status,
+        o.warden_status
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE s.residence_type = 'HOSTEL'
+      AND o.overall_status = 'PENDING'
+      AND o.current_stage = 'WARDEN'
+    ORDER BY o.created_at DESC
+""")
+
+
+# -------------------------------------------------
+# ROUTES: OD
+# -------------------------------------------------
+OD_APPLY_STUDENT = named("od.apply.student", """
+    SELECT department, year_of_study
+    FROM students
+    WHERE reg_no = :reg_no
+""")
+
+OD_INSERT = named("od.apply.insert", """
+    INSERT INTO od_requests (
+        reg_no, from_date, to_date,
+        start_time, end_time,
+        purpose, place,
+        advisor_status, hod_status
+    )
+    VALUES (
+        :reg_no, :from_date, :to_date,
+        :start_time, :end_time,
+        :purpose, :place,
+        'PENDING', 'PENDING'
+    )
+    RETURNING od_id
+""")
+
+OD_PROOF_INSERT = named("od.apply.proof", """
+    INSERT INTO od_proofs (od_id, file_path)
+    VALUES (:od_id, :file_path)
+""")
+
+OD_ADVISOR_PENDING = named("od.advisor.pending", """
+    SELECT
+        o.od_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        o.from_date,
+        o.to_date,
+        o.start_time,
+        o.end_time,
+        o.purpose,
+        o.place
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    JOIN advisor_students ast
+      ON ast.advisor_id = :advisor_id
+     AND ast.reg_no = s.reg_no
+    WHERE o.overall_status = 'PENDING'
+      AND o.current_stage = 'ADVISOR'
+    ORDER BY o.od_id DESC
+""")
+
+OD_ADVISOR_REVIEW = named("od.advisor.review", """
+    UPDATE od_requests
+    SET advisor_status = :status,
+        acted_advisor_id = :advisor_id,   -- stored securely
+        advisor_reviewed_at = CURRENT_TIMESTAMP
+    WHERE od_id = :oid
+      AND advisor_status = 'PENDING'
+""")
+
+OD_ADVISOR_REVIEW_MAIL = named("od.advisor.review.mail", """
+    SELECT s.email
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.od_id = :oid
+""")
+
+OD_HOD_PENDING = named("od.hod.pending", """
+    SELECT
+        o.od_id,
+        s.name AS student_name,   -- 👤 Added
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        o.from_date,
+        o.to_date,
+        o.start_time,
+        o.end_time,
+        o.purpose,
+        o.place
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    JOIN hods h ON h.department = s.department
+    WHERE h.hod_id = :hid
+      AND o.overall_status = 'PENDING'
+      AND o.current_stage = 'HOD'
+    ORDER BY o.od_id DESC
+""")
+
+OD_HOD_REVIEW = named("od.hod.review", """
+    UPDATE od_requests
+    SET hod_status = :status,
+        hod_remark = :remark,
+        acted_hod_id = :hod_id,              -- stored securely
+        hod_reviewed_at = CURRENT_TIMESTAMP
+    WHERE od_id = :oid
+      AND advisor_status = 'APPROVED'
+      AND hod_status = 'PENDING'
+""")
+
+OD_HOD_REVIEW_MAIL = named("od.hod.review.mail", """
+    SELECT s.email
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.od_id = :oid
+""")
+
+OD_DETAIL = named("od.detail", """
+    SELECT
+        o.od_id AS id,
+        'od' AS type,
+        s.name AS name,
+        s.reg_no AS rollNo,
+        s.department,
+        o.from_date AS fromDate,        -- ✅ FIX
+        o.to_date AS toDate,            -- ✅ FIX
+        o.start_time AS startTime,
+        o.end_time AS endTime,
+        o.place,
+        o.purpose,
+        o.created_at AS submittedAt,    -- ✅ FIX
+        o.hod_status AS status,
+        o.advisor_status
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.od_id = :id
+""")
+
+
+# -------------------------------------------------
+# ROUTES: COMPLAINTS
+# -------------------------------------------------
+COMPLAINT_INSERT = named("complaints.insert", """
+    INSERT INTO complaints
+    (reg_no, complaint_text, department, attachment_path, attachment_name)
+    VALUES (:reg_no, :text, :dept, :path, :name)
+""")
+
+COMPLAINT_DEPT_PAGE = paged("complaints.dept.page", """
+    SELECT
+        c.complaint_id,
+        s.name AS student_name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        c.complaint_text,
+        c.department,
+        c.status,
+        c.attachment_name,
+        c.created_at
+    FROM complaints c
+    JOIN students s ON s.reg_no = c.reg_no
+    WHERE c.department = :dept
+      AND {after}
+    ORDER BY c.created_at DESC, c.complaint_id DESC
+    LIMIT :_limit
+""", "c.created_at", "c.complaint_id")
+
+COMPLAINT_DEPT_COUNT = named("complaints.dept.count", "SELECT COUNT(*) FROM complaints WHERE department = :dept")
+
+COMPLAINT_STATUS_UPDATE = named("complaints.status", """
+    UPDATE complaints
+    SET status = :status
+    WHERE complaint_id = :cid
+      AND department = :dept
+""")
+
+
+# -------------------------------------------------
+# ROUTES: ADVISOR REVIEW (one endpoint for every request type)
+# -------------------------------------------------
+ADVISOR_REVIEW_LEAVE = named("review.advisor.leave", """
+    UPDATE leave_requests
+    SET status = :status,
+        advisor_remark = :remark,
+        acted_advisor_id = :aid,
+        reviewed_at = CURRENT_TIMESTAMP,
+        advisor_reviewed_at = CURRENT_TIMESTAMP
+    WHERE leave_id = :id
+      AND status = 'PENDING'
+""")
+
+ADVISOR_REVIEW_BONAFIDE = named("review.advisor.bonafide", """
+    UPDATE bonafide_requests
+    SET advisor_status = :status,
+        acted_advisor_id = :aid,
+        advisor_reviewed_at = CURRENT_TIMESTAMP
+    WHERE request_id = :id
+      AND advisor_status = 'PENDING'
+""")
+
+ADVISOR_REVIEW_OUTPASS = named("review.advisor.outpass", """
+    UPDATE outpass_requests
+    SET advisor_status = :status,
+        acted_advisor_id = :aid
+    WHERE outpass_id = :id
+      AND advisor_status = 'PENDING'
+""")
+
+ADVISOR_REVIEW_OD = named("review.advisor.od", """
+    UPDATE od_requests
+    SET advisor_status = :status,
+        advisor_reviewed_at = CURRENT_TIMESTAMP
+    WHERE od_id = :id
+      AND advisor_status = 'PENDING'
+""")
+
+
+# -------------------------------------------------
+# ROUTES: REQUEST DETAIL (approver view)
+# -------------------------------------------------
+REQUEST_DETAIL_BONAFIDE = named("detail.bonafide", """
+    SELECT b.*, s.name, s.reg_no, s.department
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no=b.reg_no
+    WHERE b.request_id=:id
+""")
+
+REQUEST_DETAIL_OUTPASS = named("detail.outpass", """
+    SELECT o.*, s.name, s.reg_no, s.department
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no=o.reg_no
+    WHERE o.outpass_id=:id
+""")
+
+REQUEST_DETAIL_OD = named("detail.od", """
+    SELECT o.*, s.name, s.reg_no, s.department
+    FROM od_requests o
+    JOIN students s ON s.reg_no=o.reg_no
+    WHERE o.od_id=:id
+""")
+
+
+# -------------------------------------------------
+# ROUTES: HISTORY (keyset pages, see pagination.Page)
+# -------------------------------------------------
+LEAVE_ADVISOR_HISTORY = paged("leave.advisor.history", """
+    SELECT
+        lr.leave_id,
+        lr.reg_no,
+        s.name AS student_name,
+        lr.category,
+        lr.start_date,
+        lr.end_date,
+        lr.status,
+        lr.advisor_remark,
+        COALESCE(lr.advisor_reviewed_at, lr.applied_at) AS advisor_reviewed_at
+    FROM leave_requests lr
+    JOIN students s ON s.reg_no = lr.reg_no
+    JOIN advisor_students ast
+      ON ast.advisor_id = :advisor_id
+     AND ast.reg_no = s.reg_no
+    WHERE lr.status <> 'PENDING'
+      AND {after}
+    ORDER BY COALESCE(lr.advisor_reviewed_at, lr.applied_at) DESC, lr.leave_id DESC
+    LIMIT :_limit
+""", "COALESCE(lr.advisor_reviewed_at, lr.applied_at)", "lr.leave_id")
+
+BONAFIDE_HOD_HISTORY = paged("bonafide.hod.history", """
+    SELECT
+        b.request_id,
+        s.name AS student_name,      -- 👤 Student name
+        s.reg_no,                    -- 🆔 Register number
+        s.department,
+        s.section,                   -- 🏫 Class section
+        s.year_of_study,             -- 🎓 Year
+        b.category,
+        b.purpose,
+        b.intern_start_date,
+        b.intern_end_date,
+        b.advisor_status,
+        b.hod_status,
+        COALESCE(b.hod_reviewed_at, b.applied_at) AS hod_reviewed_at
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    WHERE b.hod_id = :hid
+    AND b.hod_status <> 'PENDING'      -- Only reviewed ones
+    AND {after}
+    ORDER BY COALESCE(b.hod_reviewed_at, b.applied_at) DESC, b.request_id DESC
+    LIMIT :_limit
+""", "COALESCE(b.hod_reviewed_at, b.applied_at)", "b.request_id")
+
+ADVISOR_HISTORY_LEAVES = paged("advisor.history.leaves", """
+    SELECT
+        l.leave_id AS request_id,
+        'LEAVE' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        l.start_date,
+        l.end_date,
+        l.category,
+        l.status,
+        COALESCE(l.advisor_reviewed_at, l.applied_at) AS reviewed_at
+    FROM leave_requests l
+    JOIN students s ON s.reg_no = l.reg_no
+    WHERE l.acted_advisor_id = :aid
+      AND l.status <> 'PENDING'
+      AND {after}
+    ORDER BY COALESCE(l.advisor_reviewed_at, l.applied_at) DESC, l.leave_id DESC
+    LIMIT :_limit
+""", "COALESCE(l.advisor_reviewed_at, l.applied_at)", "'LEAVE'", "l.leave_id")
+
+ADVISOR_HISTORY_BONAFIDES = paged("advisor.history.bonafides", """
+    SELECT
+        b.request_id AS request_id,
+        'BONAFIDE' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        b.category,
+        b.purpose,
+        b.advisor_status AS status,
+        COALESCE(b.advisor_reviewed_at, b.applied_at) AS reviewed_at
+    FROM bonafide_requests b
+    JOIN students s ON s.reg_no = b.reg_no
+    WHERE b.acted_advisor_id = :aid
+      AND b.advisor_status <> 'PENDING'
+      AND {after}
+    ORDER BY COALESCE(b.advisor_reviewed_at, b.applied_at) DESC, b.request_id DESC
+    LIMIT :_limit
+""", "COALESCE(b.advisor_reviewed_at, b.applied_at)", "'BONAFIDE'", "b.request_id")
+
+ADVISOR_HISTORY_OUTPASSES = paged("advisor.history.outpasses", """
+    SELECT
+        o.outpass_id AS request_id,
+        'OUTPASS' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        o.out_date,
+        o.purpose,
+        o.advisor_status AS status,
+        o.created_at AS reviewed_at   -- fallback since review time not stored
+    FROM outpass_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.acted_advisor_id = :aid
+      AND o.advisor_status <> 'PENDING'
+      AND {after}
+    ORDER BY o.created_at DESC, o.outpass_id DESC
+    LIMIT :_limit
+""", "o.created_at", "'OUTPASS'", "o.outpass_id")
+
+ADVISOR_HISTORY_ODS = paged("advisor.history.ods", """
+    SELECT
+        o.od_id AS request_id,
+        'OD' AS type,
+        s.name,
+        s.reg_no,
+        s.section,
+        s.year_of_study,
+        o.from_date,
+        o.to_date,
+        o.purpose,
+        o.advisor_status AS status,
+        COALESCE(o.advisor_reviewed_at, o.created_at) AS reviewed_at
+    FROM od_requests o
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE o.advisor_status <> 'PENDING'
+      AND s.department = :dept
+      AND {after}
+    ORDER BY COALESCE(o.advisor_reviewed_at, o.created_at) DESC, o.od_id DESC
+    LIMIT :_limit
+""", "COALESCE(o.advisor_reviewed_at, o.created_at)", "'OD'", "o.od_id")
+
+# Served from request_feed by idx_request_feed_hod_keyset (0016 / 0017);
+# hod_acted_at is set on every row the HOD has reviewed
+HOD_HISTORY = paged("hod.history", """
+    SELECT f.request_type AS type,
+           f.request_id AS id,
+           s.name,
+           s.reg_no,
+           f.hod_status AS status,
+           f.hod_acted_at AS acted_on
+    FROM request_feed f
+    JOIN students s ON s.reg_no = f.reg_no
+    WHERE f.department = :dept
+      AND f.hod_acted_at IS NOT NULL
+      AND {after}
+    ORDER BY f.hod_acted_at DESC, f.request_type DESC, f.request_id DESC
+    LIMIT :_limit
+""", "f.hod_acted_at", "f.request_type", "f.request_id")
+
+WARDEN_HISTORY = paged("warden.history", """
+    SELECT
+        o.outpass_id AS id,
+        'outpass' AS type,
+        s.name AS studentName,
+        s.reg_no AS rollNumber,
+        s.department,
+        o.out_date AS outDate,
+        o.in_date AS inDate,
+        o.purpose,
+        o.warden_status AS status,
+        o.created_at AS submittedAt,   -- request created
+        o.out_date AS actedAt          -- TEMP: since no updated_at column
+    FROM outpass_requests o
+    JOIN hostel_floors hf ON hf.floor_id = o.floor_id
+    JOIN students s ON s.reg_no = o.reg_no
+    WHERE hf.warden_id = :wid
+      AND o.hod_status = 'APPROVED'
+      AND o.warden_status IN ('APPROVED','REJECTED')
+      AND {after}
+    ORDER BY o.outpass_id DESC
+    LIMIT :_limit
+""", "o.outpass_id")
+
+
+# -------------------------------------------------
+# ROUTES: INTERNAL
+# -------------------------------------------------
+SERVER_MAX_CONNECTIONS = named("internal.max_connections", "SHOW max_connections")
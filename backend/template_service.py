@@ -0,0 +1,157 @@
+"""
+Shared Jinja2 template service for the PDF documents.
+
+One Environment for every document, instead of one per call: all
+templates in templates/ are compiled at startup, with compiled bytecode
+kept in TEMPLATE_CACHE_DIR (FileSystemBytecodeCache) so a restart only
+recompiles templates whose source changed. The logo and verified images
+are read once and passed to every template as data URIs (logo_path,
+verified_path), so the PDF renderer never loads them from disk.
+
+Templates are not stat'ed per render: at most every
+TEMPLATE_RELOAD_CHECK_SECONDS (0 disables) the template and asset mtimes
+are compared, and everything is reloaded only if one changed.
+
+Each template has a version, a hash of its source and the assets, for
+keying cached PDFs (pdf_cache.py).
+
+A template that fails to compile is logged and listed in errors; the
+others still load, and rendering the broken one raises its
+TemplateSyntaxError.
+"""
+
+import base64
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateSyntaxError
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
+STATIC_DIR = os.path.join(BASE_DIR, "static")
+
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(BASE_DIR, ".template_cache"))
+TEMPLATE_RELOAD_CHECK_SECONDS = float(os.getenv("TEMPLATE_RELOAD_CHECK_SECONDS", "2"))
+
+# Template variable -> file in static/
+ASSETS = {
+    "logo_path": "logo.jpeg",
+    "verified_path": "verified.jpeg",
+}
+
+
+def data_uri(path: str) -> str:
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode('ascii')}"
+
+
+class TemplateService:
+    def __init__(self, template_dir: str = TEMPLATE_DIR, static_dir: str = STATIC_DIR, cache_dir: str = TEMPLATE_CACHE_DIR):
+        self.template_dir = template_dir
+        self.static_dir = static_dir
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            # Reloading is driven by mtimes below, not checked per lookup
+            auto_reload=False,
+            cache_size=-1,
+        )
+
+        self.assets: dict[str, str] = {}
+        self.errors: dict[str, str] = {}
+        self.versions: dict[str, str] = {}
+        self.loads = 0
+
+        self._lock = threading.Lock()
+        self._mtimes: dict[str, float] = {}
+        self._checked_at = 0.0
+
+    def _watched(self) -> dict[str, float]:
+        paths = [os.path.join(self.template_dir, name) for name in self.env.list_templates()]
+        paths += [os.path.join(self.static_dir, name) for name in ASSETS.values()]
+        return {path: os.stat(path).st_mtime for path in paths if os.path.exists(path)}
+
+    def load(self):
+        """(Re)compile every template and re-read the assets."""
+        with self._lock:
+            mtimes = self._watched()
+            self.env.cache.clear()
+
+            assets = {}
+            for var, filename in ASSETS.items():
+                path = os.path.join(self.static_dir, filename)
+                if os.path.exists(path):
+                    assets[var] = data_uri(path)
+                else:
+                    print(f"Template asset {path} is missing")
+                    assets[var] = ""
+
+            assets_digest = hashlib.sha256(
+                "".join(assets[var] for var in sorted(assets)).encode("ascii")
+            ).hexdigest()
+
+            errors = {}
+            versions = {}
+            for name in self.env.list_templates():
+                try:
+                    self.env.get_template(name)
+                except TemplateSyntaxError as e:
+                    errors[name] = f"line {e.lineno}: {e.message}"
+                    print(f"Template {name} failed to compile: {errors[name]}")
+                    continue
+
+                source = self.env.loader.get_source(self.env, name)[0]
+                versions[name] = hashlib.sha256(
+                    (source + assets_digest).encode("utf-8")
+                ).hexdigest()[:16]
+
+            self.assets = assets
+            self.errors = errors
+            self.versions = versions
+            self._mtimes = mtimes
+            self._checked_at = time.monotonic()
+            self.loads += 1
+
+    def reload_if_changed(self) -> bool:
+        if TEMPLATE_RELOAD_CHECK_SECONDS <= 0 and self.loads:
+            return False
+        if self.loads and time.monotonic() - self._checked_at < TEMPLATE_RELOAD_CHECK_SECONDS:
+            return False
+
+        self._checked_at = time.monotonic()
+        if self.loads and self._watched() == self._mtimes:
+            return False
+
+        self.load()
+        return True
+
+    def version(self, template_name: str) -> str:
+        self.reload_if_changed()
+        return self.versions.get(template_name, "")
+
+    def render(self, template_name: str, /, **context) -> str:
+        self.reload_if_changed()
+        return self.env.get_template(template_name).render({**self.assets, **context})
+
+    def stats(self) -> dict:
+        return {
+            "templates": sorted(self.env.list_templates()),
+            "errors": self.errors,
+            "versions": self.versions,
+            "assets": {var: len(uri) for var, uri in self.assets.items()},
+            "loads": self.loads,
+        }
+
+
+# One per process, compiled on first use
+templates = TemplateService()
+
+
+def render_template(template_name: str, /, **context) -> str:
+    return templates.render(template_name, **context)
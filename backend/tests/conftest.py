@@ -0,0 +1,154 @@
+"""
+Integration tests, soak tests and benchmarks.
+
+Tests marked `db` run against the Postgres in DATABASE_URL, which must
+already hold the app schema (python manage.py migrate); without
+DATABASE_URL they are skipped. They create their own rows under a
+per-run prefix and delete them afterwards.
+
+    DATABASE_URL=postgresql://... python -m pytest -q tests
+    python -m pytest -q tests -m "not soak"     # skip the long ones
+
+Benchmarks time their paths through the `bench` fixture, which prints
+p50 / p95 per path and how each compares with its baseline. The
+comparison is reported, not asserted: shared machines are too noisy
+for a speed gate.
+"""
+
+import os
+import statistics
+import sys
+import time
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "db: needs DATABASE_URL (a migrated database)")
+    config.addinivalue_line("markers", "soak: long-running load or soak test")
+
+
+def pytest_collection_modifyitems(config, items):
+    if os.getenv("DATABASE_URL"):
+        return
+    skip = pytest.mark.skip(reason="DATABASE_URL not set")
+    for item in items:
+        if "db" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def run_id() -> str:
+    """Prefix for the rows a test run creates."""
+    return f"T{uuid.uuid4().hex[:8].upper()}"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from database import engine
+    return engine
+
+
+@pytest.fixture
+def make_student(engine, run_id):
+    """Insert students for a test; removed (with their requests) afterwards."""
+    from sqlalchemy import text
+
+    created = []
+
+    def make(suffix: str, **columns) -> dict:
+        row = {
+            "reg_no": f"{run_id}{suffix}"[:20],
+            "name": f"Test Student {suffix}",
+            "gender": "M",
+            "department": f"{run_id}-DEPT",
+            "section": "A",
+            "year_of_study": 3,
+            "residence_type": "HOSTELLER",
+            "email": f"{run_id.lower()}.{suffix.lower()}@test.invalid",
+            "contact_number": "9000000000",
+            **columns,
+        }
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                INSERT INTO students ({", ".join(row)})
+                VALUES ({", ".join(f":{c}" for c in row)})
+            """), row)
+        created.append(row["reg_no"])
+        return row
+
+    yield make
+
+    if created:
+        with engine.begin() as conn:
+            for table in ("leave_requests", "outpass_requests", "bonafide_requests", "od_requests"):
+                conn.execute(text(f"DELETE FROM {table} WHERE reg_no = ANY(:r)"), {"r": created})
+            conn.execute(text("DELETE FROM students WHERE reg_no = ANY(:r)"), {"r": created})
+
+
+@pytest.fixture(scope="session")
+def jwt_for():
+    """Mint an app token for a payload, as /auth/google would."""
+    from datetime import datetime, timedelta
+
+    from jose import jwt
+
+    from identity import IDENTITY_VERSION
+
+    secret = os.getenv("JWT_SECRET_KEY", "default-secret")
+
+    def mint(**claims) -> str:
+        claims.setdefault("idv", IDENTITY_VERSION)
+        claims.setdefault("exp", datetime.utcnow() + timedelta(hours=1))
+        return jwt.encode(claims, secret, algorithm="HS256")
+
+    return mint
+
+
+class Bench:
+    """Per-call latencies of named paths, reported as p50 / p95."""
+
+    def __init__(self):
+        self.results: dict[str, tuple[list[float], dict]] = {}
+
+    def time(self, name: str, call, items) -> list:
+        """Run call(item) for every item, timing each; returns the results."""
+        values, timings = [], []
+        for item in items:
+            started = time.perf_counter()
+            values.append(call(item))
+            timings.append((time.perf_counter() - started) * 1000)
+        self.record(name, timings)
+        return values
+
+    def record(self, name: str, timings_ms: list[float], **extra):
+        """Add latencies measured elsewhere; extra values are printed as-is."""
+        self.results[name] = (timings_ms, extra)
+
+    def p50(self, name: str) -> float:
+        return statistics.median(self.results[name][0])
+
+    def p95(self, name: str) -> float:
+        timings = self.results[name][0]
+        return statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+
+    def report(self, title: str, compare: dict[str, str] | None = None):
+        """Print every path; compare maps a path to the baseline it is set against."""
+        print(f"\n{title}")
+        width = max(len(name) for name in self.results)
+        for name, (_, extra) in self.results.items():
+            line = f"  {name:<{width}}  p50 {self.p50(name):8.2f} ms  p95 {self.p95(name):8.2f} ms"
+            for key, value in extra.items():
+                line += f"  {value} {key}"
+            baseline = (compare or {}).get(name)
+            if baseline:
+                line += f"  ({self.p50(baseline) / self.p50(name):.2f}x {baseline} p50)"
+            print(line)
+
+
+@pytest.fixture
+def bench() -> Bench:
+    return Bench()
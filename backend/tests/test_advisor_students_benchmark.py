@@ -0,0 +1,117 @@
+"""
+Benchmark: advisor queue filters, the old section_advisors subquery
+against the advisor_students mapping (migrations/0003_advisor_students.sql).
+
+Seeds ADVISOR_BENCH_STUDENTS students (default 20000) across
+ADVISOR_BENCH_ADVISORS sections with one advisor each (default 300), and
+a pending leave for every fourth student. Then, for a sample of
+advisors, times the four-branch pending count each way and reports
+p50 / p95. Every seeded row is removed afterwards.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import text
+
+import statements as st
+
+STUDENTS = int(os.getenv("ADVISOR_BENCH_STUDENTS", "20000"))
+ADVISORS = int(os.getenv("ADVISOR_BENCH_ADVISORS", "300"))
+SAMPLE = int(os.getenv("ADVISOR_BENCH_SAMPLE", "50"))
+
+# The filter every advisor endpoint ran before advisor_students
+OLD_STUDENT_FILTER = """
+    s.reg_no IN (
+        SELECT s2.reg_no
+        FROM students s2
+        JOIN section_advisors sa
+          ON sa.department = s2.department
+         AND sa.section = s2.section
+         AND sa.year_of_study = s2.year_of_study
+        WHERE sa.advisor_id = :aid
+    )
+"""
+
+_PENDING_COUNT = """
+    SELECT
+        (SELECT COUNT(*) FROM leave_requests l JOIN students s ON s.reg_no = l.reg_no
+         WHERE l.overall_status = 'PENDING' AND l.current_stage = 'ADVISOR' AND {f})
+      + (SELECT COUNT(*) FROM bonafide_requests b JOIN students s ON s.reg_no = b.reg_no
+         WHERE b.overall_status = 'PENDING' AND b.current_stage = 'ADVISOR' AND {f})
+      + (SELECT COUNT(*) FROM outpass_requests o JOIN students s ON s.reg_no = o.reg_no
+         WHERE o.overall_status = 'PENDING' AND o.current_stage = 'ADVISOR' AND {f})
+      + (SELECT COUNT(*) FROM od_requests o JOIN students s ON s.reg_no = o.reg_no
+         WHERE o.overall_status = 'PENDING' AND o.current_stage = 'ADVISOR' AND {f})
+"""
+
+OLD_PENDING = text(_PENDING_COUNT.format(f=OLD_STUDENT_FILTER))
+NEW_PENDING = text(_PENDING_COUNT.format(f=st.ADVISOR_STUDENT_FILTER))
+
+
+@pytest.fixture
+def seeded(engine, run_id):
+    dept = f"{run_id}-D"
+    params = {"run": run_id, "dept": dept, "students": STUDENTS, "advisors": ADVISORS}
+
+    with engine.begin() as conn:
+        first_id = conn.execute(text("SELECT COALESCE(MAX(advisor_id), 0) + 1 FROM advisors")).scalar()
+        params["first_id"] = first_id
+
+        # Advisor g owns section S<g> of year 2
+        conn.execute(text("""
+            INSERT INTO advisors (advisor_id, name, department, email)
+            SELECT :first_id + g, 'Bench Advisor ' || g, :dept,
+                   lower(:run) || '.adv' || g || '@test.invalid'
+            FROM generate_series(0, :advisors - 1) g
+        """), params)
+        conn.execute(text("""
+            INSERT INTO section_advisors (advisor_id, department, section, year_of_study)
+            SELECT :first_id + g, :dept, 'S' || g, 2
+            FROM generate_series(0, :advisors - 1) g
+        """), params)
+        conn.execute(text("""
+            INSERT INTO students (reg_no, name, gender, department, section, year_of_study,
+                                  residence_type, email, contact_number)
+            SELECT :run || lpad(g::TEXT, 6, '0'), 'Bench Student ' || g, 'M', :dept,
+                   'S' || (g % :advisors), 2, 'DAY_SCHOLAR',
+                   lower(:run) || '.st' || g || '@test.invalid', '9000000000'
+            FROM generate_series(0, :students - 1) g
+        """), params)
+        conn.execute(text("""
+            INSERT INTO leave_requests (reg_no, category, start_date, end_date, reason, status)
+            SELECT :run || lpad(g::TEXT, 6, '0'), 'SHORT',
+                   CURRENT_DATE + 30, CURRENT_DATE + 30, 'benchmark', 'PENDING'
+            FROM generate_series(0, :students - 1, 4) g
+        """), params)
+        conn.execute(text("ANALYZE students; ANALYZE advisor_students; ANALYZE leave_requests"))
+
+    yield list(range(first_id, first_id + ADVISORS))
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM leave_requests WHERE reg_no LIKE :run || '%'"), params)
+        conn.execute(text("DELETE FROM section_advisors WHERE department = :dept"), params)
+        conn.execute(text("DELETE FROM students WHERE department = :dept"), params)
+        conn.execute(text("DELETE FROM advisors WHERE department = :dept"), params)
+
+
+@pytest.mark.db
+@pytest.mark.soak
+def test_advisor_filter_benchmark(engine, seeded, bench):
+    step = max(1, len(seeded) // SAMPLE)
+    sample = seeded[::step][:SAMPLE]
+
+    with engine.connect() as conn:
+        def pending(statement):
+            return lambda aid: conn.execute(statement, {"aid": aid}).scalar()
+
+        # Warm both plans once
+        pending(OLD_PENDING)(sample[0])
+        pending(NEW_PENDING)(sample[0])
+
+        old_counts = bench.time("section_advisors subquery", pending(OLD_PENDING), sample)
+        new_counts = bench.time("advisor_students", pending(NEW_PENDING), sample)
+
+    assert new_counts == old_counts
+    bench.report(f"{STUDENTS} students, {ADVISORS} advisors, {len(sample)} advisors sampled",
+                 compare={"advisor_students": "section_advisors subquery"})
@@ -0,0 +1,81 @@
+"""
+Double-submit on the apply endpoints (migrations/0011_request_date_ranges.sql).
+
+APPLY_CONCURRENCY threads (default 50) post the same leave / outpass at
+once for one student. The exclusion constraint must let exactly one
+insert through and every other submit must get the endpoint's 409.
+"""
+
+import os
+import threading
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+
+CONCURRENCY = int(os.getenv("APPLY_CONCURRENCY", "50"))
+
+
+@pytest.fixture(scope="module")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app import app
+
+    # No context manager: the startup hooks (SSE listener, cert refresher)
+    # aren't needed here
+    return TestClient(app)
+
+
+def _submit_concurrently(client, path: str, token: str, body: dict) -> Counter:
+    barrier = threading.Barrier(CONCURRENCY)
+    codes = []
+    lock = threading.Lock()
+
+    def submit():
+        barrier.wait()
+        response = client.post(path, json=body, headers={"Authorization": f"Bearer {token}"})
+        with lock:
+            codes.append(response.status_code)
+
+    threads = [threading.Thread(target=submit) for _ in range(CONCURRENCY)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return Counter(codes)
+
+
+@pytest.mark.db
+def test_concurrent_leave_submits(client, make_student, jwt_for):
+    student = make_student("LV", department="CSE")
+    token = jwt_for(sub=student["email"], email=student["email"],
+                    role="student", reg_no=student["reg_no"])
+
+    day = (date.today() + timedelta(days=10)).isoformat()
+    codes = _submit_concurrently(client, "/leave/apply", token, {
+        "category": "SHORT",
+        "start_date": day,
+        "end_date": day,
+        "reason": "concurrency test",
+    })
+
+    assert codes == Counter({200: 1, 409: CONCURRENCY - 1})
+
+
+@pytest.mark.db
+def test_concurrent_outpass_submits(client, make_student, jwt_for):
+    student = make_student("OP", department="CSE", residence_type="DAY_SCHOLAR")
+    token = jwt_for(sub=student["email"], email=student["email"],
+                    role="student", reg_no=student["reg_no"])
+
+    codes = _submit_concurrently(client, "/outpass/apply", token, {
+        "out_date": (date.today() + timedelta(days=10)).isoformat(),
+        "out_time": "10:00:00",
+        "purpose": "concurrency test",
+        "contact_number": student["contact_number"],
+        "parent_mobile": "9000000001",
+    })
+
+    assert codes == Counter({200: 1, 409: CONCURRENCY - 1})
@@ -0,0 +1,176 @@
+"""
+Load test: the async /advisor/dashboard-stats against the sync endpoint
+it replaced, on the same seeded advisor.
+
+Seeds one advisor owning a section of LOAD_STUDENTS students (default
+2000), each with a leave and a bonafide request in a mix of statuses.
+The baseline is the endpoint as it was before the async move: a sync
+def on FastAPI's threadpool running four sequential COUNT queries over
+the section_advisors filter. Both run in-process (httpx over ASGI) at
+each of LOAD_CONCURRENCY client counts (default 8,32,128) for
+LOAD_SECONDS each (default 10); requests/sec, p50 and p95 are reported
+per level. All levels share one event loop, as the async engine's pool
+is bound to the loop it first connected on.
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+from sqlalchemy import text
+
+LEVELS = [int(n) for n in os.getenv("LOAD_CONCURRENCY", "8,32,128").split(",")]
+SECONDS = float(os.getenv("LOAD_SECONDS", "10"))
+STUDENTS = int(os.getenv("LOAD_STUDENTS", "2000"))
+
+SYNC_PATH = "/_load/advisor-dashboard-stats-sync"
+ASYNC_PATH = "/advisor/dashboard-stats"
+
+OLD_STUDENT_FILTER = """
+    s.reg_no IN (
+        SELECT s.reg_no
+        FROM students s
+        JOIN section_advisors sa
+          ON sa.department = s.department
+         AND sa.section = s.section
+         AND sa.year_of_study = s.year_of_study
+        WHERE sa.advisor_id = :aid
+    )
+"""
+
+
+def _old_count(leave_status: str, advisor_status: str):
+    f = OLD_STUDENT_FILTER
+    return text(f"""
+        SELECT COUNT(*) FROM (
+            SELECT leave_id FROM leave_requests l JOIN students s ON s.reg_no=l.reg_no WHERE {leave_status} AND {f}
+            UNION ALL
+            SELECT request_id FROM bonafide_requests b JOIN students s ON s.reg_no=b.reg_no WHERE {advisor_status.format(t="b")} AND {f}
+            UNION ALL
+            SELECT outpass_id FROM outpass_requests o JOIN students s ON s.reg_no=o.reg_no WHERE {advisor_status.format(t="o")} AND {f}
+            UNION ALL
+            SELECT od_id FROM od_requests o JOIN students s ON s.reg_no=o.reg_no WHERE {advisor_status.format(t="o")} AND {f}
+        ) x
+    """)
+
+
+# The four queries /advisor/dashboard-stats ran before it went async
+OLD_STATS = {
+    "total": _old_count("TRUE", "TRUE"),
+    "pending": _old_count("l.status='PENDING'", "{t}.advisor_status='PENDING'"),
+    "approved": _old_count("l.status='APPROVED'", "{t}.advisor_status='APPROVED'"),
+    "rejected": _old_count("l.status='REJECTED'", "{t}.advisor_status='REJECTED'"),
+}
+
+
+@pytest.fixture(scope="module")
+def app_with_baseline():
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    from app import app, get_current_user_soft, get_db
+
+    def sync_advisor_stats(payload=Depends(get_current_user_soft), db: Session = Depends(get_db)):
+        if not payload or not payload.get("advisor_id"):
+            raise HTTPException(403, "Not an advisor")
+        return {key: db.execute(query, {"aid": payload["advisor_id"]}).scalar()
+                for key, query in OLD_STATS.items()}
+
+    app.add_api_route(SYNC_PATH, sync_advisor_stats, methods=["GET"])
+    yield app
+    app.router.routes[:] = [r for r in app.router.routes if getattr(r, "path", None) != SYNC_PATH]
+
+
+@pytest.fixture
+def advisor_id(engine, run_id):
+    dept = f"{run_id}-LD"
+    params = {"run": run_id, "dept": dept, "students": STUDENTS}
+
+    with engine.begin() as conn:
+        aid = conn.execute(text("SELECT COALESCE(MAX(advisor_id), 0) + 1 FROM advisors")).scalar()
+        params["aid"] = aid
+
+        conn.execute(text("""
+            INSERT INTO advisors (advisor_id, name, department, email)
+            VALUES (:aid, 'Load Advisor', :dept, lower(:run) || '.loadadv@test.invalid')
+        """), params)
+        conn.execute(text("""
+            INSERT INTO section_advisors (advisor_id, department, section, year_of_study)
+            VALUES (:aid, :dept, 'A', 3)
+        """), params)
+        conn.execute(text("""
+            INSERT INTO students (reg_no, name, gender, department, section, year_of_study,
+                                  residence_type, email, contact_number)
+            SELECT :run || lpad(g::TEXT, 6, '0'), 'Load Student ' || g, 'M', :dept, 'A', 3,
+                   'DAY_SCHOLAR', lower(:run) || '.ld' || g || '@test.invalid', '9000000000'
+            FROM generate_series(0, :students - 1) g
+        """), params)
+        conn.execute(text("""
+            INSERT INTO leave_requests (reg_no, category, start_date, end_date, reason, status)
+            SELECT :run || lpad(g::TEXT, 6, '0'), 'SHORT', CURRENT_DATE + 30, CURRENT_DATE + 30,
+                   'load test', (ARRAY['PENDING', 'APPROVED', 'REJECTED'])[g % 3 + 1]
+            FROM generate_series(0, :students - 1) g
+        """), params)
+        conn.execute(text("""
+            INSERT INTO bonafide_requests (reg_no, category, purpose, advisor_status, hod_status)
+            SELECT :run || lpad(g::TEXT, 6, '0'), 'GENERAL', 'load test', 'PENDING', 'PENDING'
+            FROM generate_series(0, :students - 1, 2) g
+        """), params)
+        conn.execute(text("ANALYZE students; ANALYZE leave_requests; ANALYZE bonafide_requests"))
+
+    yield aid
+
+    with engine.begin() as conn:
+        for table in ("leave_requests", "bonafide_requests"):
+            conn.execute(text(f"DELETE FROM {table} WHERE reg_no LIKE :run || '%'"), params)
+        conn.execute(text("DELETE FROM section_advisors WHERE department = :dept"), params)
+        conn.execute(text("DELETE FROM students WHERE department = :dept"), params)
+        conn.execute(text("DELETE FROM advisors WHERE department = :dept"), params)
+
+
+async def _load(client, path: str, headers: dict, clients: int) -> tuple[list[float], float]:
+    latencies = []
+    deadline = time.monotonic() + SECONDS
+
+    async def run():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.monotonic()
+    await asyncio.gather(*(run() for _ in range(clients)))
+    return latencies, len(latencies) / (time.monotonic() - started)
+
+
+async def _run_levels(app, token: str, bench):
+    import httpx
+
+    from database import async_engine, async_replica_engine
+
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+            for clients in LEVELS:
+                for name, path in (("sync", SYNC_PATH), ("async", ASYNC_PATH)):
+                    latencies, rps = await _load(client, path, headers, clients)
+                    bench.record(f"{clients:>4} clients {name}", latencies, **{"req/s": f"{rps:8.1f}"})
+    finally:
+        # Pooled asyncpg connections belong to this loop
+        await async_engine.dispose()
+        await async_replica_engine.dispose()
+
+
+@pytest.mark.db
+@pytest.mark.soak
+def test_async_dashboard_throughput(app_with_baseline, advisor_id, jwt_for, run_id, bench):
+    token = jwt_for(sub=f"{run_id.lower()}.loadadv@test.invalid", role="advisor", advisor_id=advisor_id)
+
+    asyncio.run(_run_levels(app_with_baseline, token, bench))
+
+    bench.report(f"{STUDENTS} students, {SECONDS:.0f}s per level",
+                 compare={f"{n:>4} clients async": f"{n:>4} clients sync" for n in LEVELS})
@@ -0,0 +1,70 @@
+"""
+Login role resolution: the old sequential lookups against LOGIN_UPSERT.
+
+For LOGIN_BENCH_USERS students (default 200) each path is timed on a
+cold login (no users row yet) and a warm one (the row exists), one
+transaction per login as google_login runs it. The old path is the one
+google_login had before statements.LOGIN_UPSERT: SELECT users, SELECT
+students, INSERT, SELECT users again.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import text
+
+import statements as st
+
+USERS = int(os.getenv("LOGIN_BENCH_USERS", "200"))
+
+
+def _old_login(conn, email: str):
+    user = conn.execute(text("SELECT * FROM users WHERE email = :email"), {"email": email}).mappings().first()
+    if user:
+        return user
+
+    student = conn.execute(
+        text("SELECT reg_no FROM students WHERE email = :email"), {"email": email}
+    ).mappings().first()
+    conn.execute(
+        text("INSERT INTO users (email, reg_no, role) VALUES (:email, :reg_no, 'STUDENT')"),
+        {"email": email, "reg_no": student["reg_no"]},
+    )
+    conn.commit()
+    return conn.execute(text("SELECT * FROM users WHERE email = :email"), {"email": email}).mappings().first()
+
+
+def _new_login(conn, email: str):
+    return conn.execute(st.LOGIN_UPSERT, {"email": email}).mappings().first()
+
+
+@pytest.mark.db
+@pytest.mark.soak
+def test_login_cold_and_warm(engine, make_student, bench):
+    students = [make_student(f"L{i:04d}") for i in range(2 * USERS)]
+    old_emails = [s["email"] for s in students[:USERS]]
+    new_emails = [s["email"] for s in students[USERS:]]
+
+    try:
+        with engine.connect() as conn:
+            def one_login(login):
+                def run(email):
+                    user = login(conn, email)
+                    conn.commit()
+                    return user
+                return run
+
+            users = [
+                *bench.time("old cold", one_login(_old_login), old_emails),
+                *bench.time("old warm", one_login(_old_login), old_emails),
+                *bench.time("new cold", one_login(_new_login), new_emails),
+                *bench.time("new warm", one_login(_new_login), new_emails),
+            ]
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM users WHERE email = ANY(:e)"),
+                         {"e": old_emails + new_emails})
+
+    assert all(user is not None for user in users)
+    bench.report(f"{USERS} logins per path",
+                 compare={"new cold": "old cold", "new warm": "old warm"})
@@ -0,0 +1,262 @@
+"""
+Query plans of the hot queue, history and feed statements on a seeded
+database: each must reach its request table through an index (Index,
+Index Only or Bitmap Index Scan) rather than a sequential scan. These
+are the plans the indexes of migrations 0002, 0007, 0008, 0017 and 0020
+were added for.
+
+Seeds PLAN_SEED_ROWS request rows (default 1000000) split evenly over
+the four request tables, for one student per 20 rows in sections of 60
+with an advisor each, across ten departments. About one row in five is
+still open, at the advisor, HOD or warden stage. The tables are
+ANALYZEd and each statement is run through EXPLAIN (FORMAT JSON) with
+the parameters of a seeded advisor / department / student. Every seeded
+row is removed afterwards.
+
+The approver queues must go further and use one of the partial indexes
+on the open (overall_status = 'PENDING') rows, from 0007 and 0020.
+
+HOD and warden queues hang off existing hods / hostel_floors rows; they
+are skipped on a database without any.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import text
+
+import statements as st
+
+ROWS = int(os.getenv("PLAN_SEED_ROWS", "1000000"))
+PER_TABLE = ROWS // 4
+SECTION_SIZE = 60
+STUDENTS = max(ROWS // 20, SECTION_SIZE)
+SECTIONS = -(-STUDENTS // SECTION_SIZE)
+
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+# Row g of a request table belongs to student g % :students; g % 20
+# picks its state: 0 open at the advisor, 1 open at the HOD, 2 open at
+# the warden (outpasses only; closed elsewhere), 3 rejected, else approved
+_ROW = """
+    FROM generate_series(0, :per_table - 1) g,
+    LATERAL (SELECT
+        :run || lpad((g % :students)::TEXT, 7, '0') AS reg_no,
+        :first_id + (g % :students) / :section_size AS advisor_id,
+        DATE '2020-01-01' + (g / :students) * 3 AS day,
+        now() - g * INTERVAL '1 second' AS at,
+        CASE g % 20 WHEN 0 THEN 'PENDING' WHEN 3 THEN 'REJECTED' ELSE 'APPROVED' END AS advisor,
+        CASE WHEN g % 20 IN (0, 1, 3) THEN 'PENDING' ELSE 'APPROVED' END AS hod,
+        CASE WHEN g % 20 < 4 THEN 'PENDING' ELSE 'APPROVED' END AS warden
+    ) r
+"""
+
+SEED = [
+    """
+    INSERT INTO advisors (advisor_id, name, department, email)
+    SELECT :first_id + k, 'Plan Advisor ' || k, :run || '-P' || (k % 10),
+           lower(:run) || '.padv' || k || '@test.invalid'
+    FROM generate_series(0, :sections - 1) k
+    """,
+    """
+    INSERT INTO section_advisors (advisor_id, department, section, year_of_study)
+    SELECT :first_id + k, :run || '-P' || (k % 10), 'S' || k, 3
+    FROM generate_series(0, :sections - 1) k
+    """,
+    """
+    INSERT INTO students (reg_no, name, gender, department, section, year_of_study,
+                          residence_type, email, contact_number)
+    SELECT :run || lpad(g::TEXT, 7, '0'), 'Plan Student ' || g, 'M',
+           :run || '-P' || ((g / :section_size) % 10), 'S' || (g / :section_size), 3,
+           'HOSTELLER', lower(:run) || '.pst' || g || '@test.invalid', '9000000000'
+    FROM generate_series(0, :students - 1) g
+    """,
+    f"""
+    INSERT INTO leave_requests (reg_no, category, start_date, end_date, reason, status,
+                                acted_advisor_id, advisor_reviewed_at, applied_at)
+    SELECT reg_no, 'SHORT', day, day, 'plan test',
+           CASE WHEN g % 20 < 2 THEN 'PENDING' ELSE r.advisor END,
+           CASE WHEN g % 20 >= 2 THEN advisor_id END,
+           CASE WHEN g % 20 >= 2 THEN at END, at
+    {_ROW}
+    """,
+    f"""
+    INSERT INTO bonafide_requests (reg_no, hod_id, category, purpose,
+                                   advisor_status, hod_status, acted_advisor_id,
+                                   advisor_reviewed_at, hod_reviewed_at, applied_at)
+    SELECT reg_no, :hid, 'GENERAL', 'plan test', r.advisor, r.hod,
+           CASE WHEN r.advisor <> 'PENDING' THEN advisor_id END,
+           CASE WHEN r.advisor <> 'PENDING' THEN at END,
+           CASE WHEN r.hod <> 'PENDING' THEN at END, at
+    {_ROW}
+    """,
+    f"""
+    INSERT INTO outpass_requests (reg_no, year_of_study, out_date, out_time, purpose,
+                                  contact_number, parent_mobile, floor_id,
+                                  advisor_status, hod_status, warden_status,
+                                  acted_advisor_id, created_at)
+    SELECT reg_no, 3, day, TIME '10:00', 'plan test', '9000000000', '9000000001', :floor_id,
+           r.advisor, CASE WHEN g % 20 = 2 THEN 'APPROVED' ELSE r.hod END, r.warden,
+           CASE WHEN r.advisor <> 'PENDING' THEN advisor_id END, at
+    {_ROW}
+    """,
+    f"""
+    INSERT INTO od_requests (reg_no, from_date, to_date, start_time, end_time, purpose, place,
+                             advisor_status, hod_status, acted_advisor_id,
+                             advisor_reviewed_at, created_at)
+    SELECT reg_no, day, day, TIME '09:00', TIME '17:00', 'plan test', 'campus', r.advisor, r.hod,
+           CASE WHEN r.advisor <> 'PENDING' THEN advisor_id END,
+           CASE WHEN r.advisor <> 'PENDING' THEN at END, at
+    {_ROW}
+    """,
+    """
+    INSERT INTO complaints (reg_no, complaint_text, department, created_at)
+    SELECT :run || lpad((g % :students)::TEXT, 7, '0'), 'plan test',
+           :run || '-P' || (((g % :students) / :section_size) % 10),
+           now() - g * INTERVAL '1 second'
+    FROM generate_series(0, :per_table / 25) g
+    """,
+]
+
+ANALYZED = ("students", "advisor_students", "leave_requests", "bonafide_requests",
+            "outpass_requests", "od_requests", "request_feed", "complaints")
+
+
+@pytest.fixture(scope="module")
+def seeded(engine, run_id):
+    params = {
+        "run": run_id, "per_table": PER_TABLE, "students": STUDENTS,
+        "sections": SECTIONS, "section_size": SECTION_SIZE,
+    }
+
+    with engine.begin() as conn:
+        params["first_id"] = conn.execute(
+            text("SELECT COALESCE(MAX(advisor_id), 0) + 1 FROM advisors")
+        ).scalar()
+        params["hid"] = conn.execute(text("SELECT MIN(hod_id) FROM hods")).scalar()
+        floor = conn.execute(
+            text("SELECT floor_id, warden_id FROM hostel_floors ORDER BY floor_id LIMIT 1")
+        ).first()
+        params["floor_id"], warden_id = floor or (None, None)
+
+        for statement in SEED:
+            conn.execute(text(statement), params)
+
+    with engine.begin() as conn:
+        for table in ANALYZED:
+            conn.execute(text(f"ANALYZE {table}"))
+
+    # A mid-range advisor and student of department P0
+    section = (SECTIONS // 20) * 10
+    yield {
+        "aid": params["first_id"] + section,
+        "advisor_id": params["first_id"] + section,
+        "dept": f"{run_id}-P0",
+        "reg_no": f"{run_id}{section * SECTION_SIZE:07d}",
+        "hid": params["hid"],
+        "hod_id": params["hid"],
+        "warden_id": warden_id,
+        "wid": warden_id,
+        "_limit": 50,
+    }
+
+    with engine.begin() as conn:
+        for table in ("leave_requests", "outpass_requests", "bonafide_requests",
+                      "od_requests", "complaints"):
+            conn.execute(text(f"DELETE FROM {table} WHERE reg_no LIKE :run || '%'"), params)
+        conn.execute(text("DELETE FROM section_advisors WHERE department LIKE :run || '-P%'"), params)
+        conn.execute(text("DELETE FROM students WHERE department LIKE :run || '-P%'"), params)
+        conn.execute(text("DELETE FROM advisors WHERE department LIKE :run || '-P%'"), params)
+
+
+def plan_indexes(engine, statement, params) -> dict[str, str]:
+    """Index name -> table for every index the plan of statement scans."""
+    with engine.connect() as conn:
+        [root] = conn.execute(text(f"EXPLAIN (FORMAT JSON) {statement.text}"), params).scalar()
+        tables = dict(conn.execute(text(
+            "SELECT indexname, tablename FROM pg_indexes WHERE schemaname = current_schema()"
+        )).all())
+
+    used, nodes = {}, [root["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] in INDEX_SCANS:
+            used[node["Index Name"]] = tables.get(node["Index Name"])
+        nodes.extend(node.get("Plans", []))
+    return used
+
+
+def _needs(seeded, *keys):
+    missing = [key for key in keys if seeded[key] is None]
+    if missing:
+        pytest.skip(f"no {', '.join(missing)} to seed against")
+
+
+HOT = [
+    # 0020: open requests per advisor_students reg_no
+    ("advisor.pending.leaves", st.ADVISOR_PENDING_LEAVES, "leave_requests", ()),
+    ("advisor.pending.bonafides", st.ADVISOR_PENDING_BONAFIDES, "bonafide_requests", ()),
+    ("advisor.pending.outpasses", st.ADVISOR_PENDING_OUTPASSES, "outpass_requests", ()),
+    ("advisor.pending.ods", st.ADVISOR_PENDING_ODS, "od_requests", ()),
+    ("leave.pending", st.LEAVE_PENDING, "leave_requests", ()),
+    ("bonafide.advisor.pending", st.BONAFIDE_ADVISOR_PENDING, "bonafide_requests", ()),
+    ("outpass.advisor.pending", st.OUTPASS_ADVISOR_PENDING, "outpass_requests", ()),
+    ("od.advisor.pending", st.OD_ADVISOR_PENDING, "od_requests", ()),
+    # 0007 / 0020: HOD and warden stages
+    ("bonafide.hod.pending", st.BONAFIDE_HOD_PENDING, "bonafide_requests", ("hid",)),
+    ("outpass.hod.pending", st.OUTPASS_HOD_PENDING, "outpass_requests", ("hod_id",)),
+    ("od.hod.pending", st.OD_HOD_PENDING, "od_requests", ("hid",)),
+    ("outpass.warden.pending", st.OUTPASS_WARDEN_PENDING, "outpass_requests", ("warden_id",)),
+    # 0008: keyset history pages
+    ("leave.advisor.history", st.LEAVE_ADVISOR_HISTORY.first, "leave_requests", ()),
+    ("bonafide.hod.history", st.BONAFIDE_HOD_HISTORY.first, "bonafide_requests", ("hid",)),
+    ("advisor.history.leaves", st.ADVISOR_HISTORY_LEAVES.first, "leave_requests", ()),
+    ("advisor.history.bonafides", st.ADVISOR_HISTORY_BONAFIDES.first, "bonafide_requests", ()),
+    ("advisor.history.outpasses", st.ADVISOR_HISTORY_OUTPASSES.first, "outpass_requests", ()),
+    ("advisor.history.ods", st.ADVISOR_HISTORY_ODS.first, "od_requests", ()),
+    ("warden.history", st.WARDEN_HISTORY.first, "outpass_requests", ("wid",)),
+    ("complaints.dept.page", st.COMPLAINT_DEPT_PAGE.first, "complaints", ()),
+    # 0008 / 0017: request_feed
+    ("student.feed.page", st.STUDENT_FEED_PAGE.first, "request_feed", ()),
+    ("hod.history", st.HOD_HISTORY.first, "request_feed", ()),
+    ("advisor.pending.preview", st.ADVISOR_PENDING_PREVIEW, "request_feed", ()),
+    ("hod.pending.preview", st.HOD_PENDING_PREVIEW, "request_feed", ()),
+]
+
+
+@pytest.mark.db
+@pytest.mark.soak
+@pytest.mark.parametrize(
+    "statement, table, needs", [h[1:] for h in HOT], ids=[h[0] for h in HOT]
+)
+def test_hot_query_uses_an_index(engine, seeded, statement, table, needs):
+    _needs(seeded, *needs)
+
+    used = plan_indexes(engine, statement, seeded)
+
+    assert table in used.values(), f"no index scan on {table}; indexes used: {used}"
+
+
+# Partial indexes on overall_status = 'PENDING' (0007 by stage, 0020 by
+# student / floor)
+OPEN_INDEXES = {
+    "leave_requests": {"idx_leave_open_stage", "idx_leave_open_reg"},
+    "bonafide_requests": {"idx_bonafide_open_stage", "idx_bonafide_open_reg"},
+    "outpass_requests": {"idx_outpass_open_stage", "idx_outpass_open_reg", "idx_outpass_open_floor"},
+    "od_requests": {"idx_od_open_stage", "idx_od_open_reg"},
+}
+
+PENDING_QUEUES = [h for h in HOT if ".pending" in h[0] and h[2] in OPEN_INDEXES]
+
+
+@pytest.mark.db
+@pytest.mark.soak
+@pytest.mark.parametrize(
+    "statement, table, needs", [q[1:] for q in PENDING_QUEUES], ids=[q[0] for q in PENDING_QUEUES]
+)
+def test_pending_queue_uses_an_open_index(engine, seeded, statement, table, needs):
+    _needs(seeded, *needs)
+
+    used = plan_indexes(engine, statement, seeded)
+
+    assert OPEN_INDEXES[table] & used.keys(), f"no partial open index on {table}; indexes used: {used}"
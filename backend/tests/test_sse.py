@@ -0,0 +1,150 @@
+"""
+Approver SSE streams (events.py).
+
+test_out_of_order_ids runs in-process; the soak test holds
+SSE_SOAK_SUBSCRIBERS idle streams (default 2000, one worker's worth) on
+a real LISTEN connection for SSE_SOAK_SECONDS and checks that every one
+of them gets heartbeats and each NOTIFY.
+"""
+
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+
+import events
+from events import EventHub, event_stream
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def _event(event_id: int, scope: str) -> dict:
+    return {
+        "id": event_id,
+        "kind": "pending",
+        "request_type": "LEAVE",
+        "request_id": event_id,
+        "status": "PENDING",
+        "stage": "ADVISOR",
+        "scopes": [scope],
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+def _ids(chunks) -> list[int]:
+    return [int(chunk.split("\n", 1)[0][4:]) for chunk in chunks if chunk.startswith("id: ")]
+
+
+def test_out_of_order_ids(monkeypatch):
+    # Two reviews commit in the opposite order to their event ids: the
+    # lower id arrives second and must still be sent
+    monkeypatch.setattr(EventHub, "start", lambda self: None)
+
+    async def run():
+        hub = EventHub("postgresql://unused")
+        request = FakeRequest()
+        stream = event_stream(hub, request, ["sec:X"], None)
+        received = [await stream.__anext__()]     # retry: line
+
+        async def read(n):
+            for _ in range(n):
+                received.append(await stream.__anext__())
+
+        reader = asyncio.create_task(read(3))
+        await asyncio.sleep(0)
+        hub._dispatch(_event(11, "sec:X"))
+        hub._dispatch(_event(10, "sec:X"))
+        hub._dispatch(_event(11, "sec:X"))       # the listener's catch-up
+        hub._dispatch(_event(12, "sec:X"))
+        await asyncio.wait_for(reader, 5)
+
+        request.disconnected = True
+        await stream.aclose()
+        return _ids(received)
+
+    assert asyncio.run(run()) == [11, 10, 12]
+
+
+@pytest.mark.db
+@pytest.mark.soak
+def test_idle_subscribers_soak(monkeypatch, engine, run_id):
+    from sqlalchemy import text
+
+    from database import DATABASE_URL
+
+    subscribers = int(os.getenv("SSE_SOAK_SUBSCRIBERS", "2000"))
+    seconds = float(os.getenv("SSE_SOAK_SECONDS", "30"))
+    monkeypatch.setattr(events, "SSE_HEARTBEAT_SECONDS", 1.0)
+
+    scope = f"dept:{run_id}"
+
+    def notify(event_id: int):
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify('request_events', :payload)"),
+                         {"payload": json.dumps(_event(event_id, scope))})
+
+    async def run():
+        hub = EventHub(DATABASE_URL)
+        request = FakeRequest()
+        pings = [0] * subscribers
+        seen = [[] for _ in range(subscribers)]
+
+        async def consume(i):
+            async for chunk in event_stream(hub, request, [scope], None):
+                if chunk.startswith(": ping"):
+                    pings[i] += 1
+                elif chunk.startswith("id: "):
+                    seen[i].append(_ids([chunk])[0])
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tasks = [asyncio.create_task(consume(i)) for i in range(subscribers)]
+
+        # Listener up, every stream subscribed
+        deadline = time.monotonic() + 30
+        while not hub.stats()["connected"] or hub.stats()["subscribers"] < subscribers:
+            assert time.monotonic() < deadline, hub.stats()
+            await asyncio.sleep(0.1)
+
+        # Idle, with one event in the middle (a high id first, then a
+        # lower one, as with two out-of-order commits)
+        base = 2**40 + int(time.time())
+        await asyncio.sleep(seconds / 2)
+        sent_at = time.monotonic()
+        await asyncio.to_thread(notify, base + 1)
+        await asyncio.to_thread(notify, base)
+        while any(len(s) < 2 for s in seen):
+            assert time.monotonic() - sent_at < 10, "events not fanned out to every stream"
+            await asyncio.sleep(0.05)
+        fanout_s = time.monotonic() - sent_at
+        await asyncio.sleep(seconds / 2)
+
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        request.disconnected = True
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await hub.stop()
+
+        print(
+            f"\n{subscribers} idle streams for {seconds:.0f}s: "
+            f"fan-out {fanout_s * 1000:.0f} ms, {grown / subscribers / 1024:.1f} KiB per stream, "
+            f"min {min(pings)} heartbeats"
+        )
+        assert all(sorted(s) == [base, base + 1] for s in seen)
+        assert min(pings) >= int(seconds) // 2
+        assert hub.stats()["subscribers"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,237 @@
+"""
+Job worker: renders the PDFs and sends the mails the review endpoints
+enqueue (see jobs.py).
+
+    python worker.py          # run until interrupted
+    python worker.py --once   # run what is due now, then exit
+
+Run as many as needed; jobs are claimed with FOR UPDATE SKIP LOCKED so
+workers never share one. An idle worker sleeps on LISTEN jobs, polling
+every JOB_POLL_SECONDS in case a notification was missed. A failed job
+is retried with exponential backoff up to its max_attempts.
+
+Templates are compiled (template_service.py) and the renderer pool
+(renderer.py) warmed up before the first job is claimed; the pool's
+counters and the PDF cache's are logged whenever the queue drains. The
+worker is also where the shared PDF cache is evicted, every
+PDF_CACHE_EVICT_SECONDS (pdf_cache.py).
+"""
+
+import os
+import select
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import psycopg2
+
+import statements as st
+from database import DATABASE_URL, SessionLocal, engine, libpq_dsn
+from documents import (
+    generate_bonafide_pdf, generate_outpass_pdf, generate_leave_pdf, outpass_days,
+    send_mail_with_pdfs, send_bonafide_email, fetch_bonafide_certificate_data
+)
+from jobs import JOBS_CHANNEL, JOB_BACKOFF_SECONDS, JOB_MAX_BACKOFF_SECONDS, JOB_LOCK_TIMEOUT_SECONDS
+from pdf_cache import PDF_CACHE_EVICT_SECONDS, pdf_cache
+from renderer import renderer
+from template_service import templates
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+JOB_CLAIM_BATCH = int(os.getenv("JOB_CLAIM_BATCH", "5"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "5"))
+
+HANDLERS = {}
+
+
+def handler(kind: str):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+
+# -------------------------------------------------
+# HANDLERS
+# -------------------------------------------------
+@handler("mail")
+def send_mail(db, payload: dict):
+    send_mail_with_pdfs(
+        to_email=payload["to"],
+        subject=payload["subject"],
+        body=payload["body"],
+        pdf_paths=[]
+    )
+
+
+@handler("bonafide.certificate")
+def bonafide_certificate(db, payload: dict):
+    cert_data = fetch_bonafide_certificate_data(db, payload["request_id"])
+    pdf_path = generate_bonafide_pdf(cert_data)
+    send_bonafide_email(cert_data["email"], pdf_path)
+
+
+@handler("outpass.approved")
+def outpass_approved(db, payload: dict):
+    outpass_id = payload["outpass_id"]
+    outpass = db.execute(st.OUTPASS_DOCUMENT, {"oid": outpass_id}).mappings().first()
+    if outpass is None:
+        raise LookupError(f"Outpass {outpass_id} not found")
+
+    # Day scholars are done once the HOD approves
+    if payload["by"] == "hod":
+        send_mail_with_pdfs(
+            to_email=outpass["email"],
+            subject="Outpass Approved",
+            body=(
+                f"Your outpass request has been approved.\n\n"
+                f"Outpass ID : {outpass_id}\n"
+                f"Date       : {outpass['out_date']}\n"
+                f"Time       : {outpass['out_time']}"
+            ),
+            pdf_paths=[generate_outpass_pdf(outpass)]
+        )
+        return
+
+    # Hostellers: the warden's approval, with a leave form past one day
+    days = outpass_days(outpass)
+
+    pdfs = [generate_outpass_pdf(outpass)]
+    if days > 1:
+        pdfs.append(generate_leave_pdf(outpass))
+
+    send_mail_with_pdfs(
+        to_email=outpass["email"],
+        subject="Outpass Approved" if days == 1 else "Outpass & Leave Approved",
+        body=(
+            f"Your request has been approved.\n\n"
+            f"Outpass ID : {outpass_id}\n"
+            f"From Date  : {outpass['out_date']}\n"
+            f"To Date    : {outpass['in_date']}"
+        ),
+        pdf_paths=pdfs
+    )
+
+
+# -------------------------------------------------
+# LOOP
+# -------------------------------------------------
+def run_job(job) -> None:
+    try:
+        fn = HANDLERS.get(job["kind"])
+        if fn is None:
+            raise LookupError(f"No handler for job kind {job['kind']!r}")
+
+        with SessionLocal() as db:
+            fn(db, job["payload"])
+
+    except Exception as e:
+        print(f"Job {job['id']} ({job['kind']}) attempt {job['attempts']} failed:", e)
+        with engine.begin() as conn:
+            conn.execute(st.JOB_FAILED, {
+                "id": job["id"],
+                "worker": WORKER_ID,
+                "error": f"{type(e).__name__}: {e}",
+                "backoff": JOB_BACKOFF_SECONDS,
+                "max_backoff": JOB_MAX_BACKOFF_SECONDS,
+            })
+        return
+
+    with engine.begin() as conn:
+        conn.execute(st.JOB_DONE, {"id": job["id"], "worker": WORKER_ID})
+
+
+def run_due_jobs() -> int:
+    """Claim and run one batch of due jobs; returns how many ran."""
+    # Claimed in their own short transaction: nothing stays locked
+    # while a job renders or mails
+    with engine.begin() as conn:
+        claimed = conn.execute(
+            st.JOB_CLAIM, {"worker": WORKER_ID, "n": JOB_CLAIM_BATCH}
+        ).mappings().all()
+
+    for job in claimed:
+        run_job(job)
+
+    return len(claimed)
+
+
+def reap_stale_jobs() -> int:
+    with engine.begin() as conn:
+        return len(conn.execute(st.JOB_REAP, {"timeout": JOB_LOCK_TIMEOUT_SECONDS}).all())
+
+
+def _listen():
+    conn = psycopg2.connect(libpq_dsn(DATABASE_URL))
+    conn.autocommit = True
+    conn.cursor().execute(f"LISTEN {JOBS_CHANNEL}")
+    return conn
+
+
+def _wait(conn, timeout: float):
+    if select.select([conn], [], [], timeout)[0]:
+        conn.poll()
+        conn.notifies.clear()
+
+
+def main(once: bool = False):
+    templates.load()
+    renderer.start()
+    print(f"Job worker {WORKER_ID} started ({len(HANDLERS)} job kinds, {renderer.workers} renderer(s))")
+    listener = None
+    busy = False
+    evicted_at = 0.0
+
+    while True:
+        # The PDF cache directory is shared with the web app; only the
+        # worker evicts from it
+        if time.monotonic() - evicted_at >= PDF_CACHE_EVICT_SECONDS:
+            evicted_at = time.monotonic()
+            removed = pdf_cache.evict()
+            if removed:
+                print(f"PDF cache: evicted {removed} bytes")
+
+        if run_due_jobs():
+            busy = True
+            continue
+
+        if busy:
+            stats = renderer.stats()
+            print(
+                f"Renderer: {stats['completed']} done, {stats['failed']} failed, "
+                f"{stats['timeouts']} timed out, avg {stats['render_ms_avg']:.0f} ms, "
+                f"{stats['pdfs_per_s']} PDFs/s (last minute)"
+            )
+            cache = pdf_cache.stats()
+            print(
+                f"PDF cache: {cache['hits']} hits, {cache['misses']} misses, "
+                f"{cache['entries']} entries, {cache['bytes']} / {cache['max_bytes']} bytes"
+            )
+            busy = False
+
+        if once:
+            return
+
+        reaped = reap_stale_jobs()
+        if reaped:
+            print(f"Requeued {reaped} job(s) from dead workers")
+
+        try:
+            listener = listener or _listen()
+            _wait(listener, JOB_POLL_SECONDS)
+        except psycopg2.Error as e:
+            print("Job listener error:", e)
+            if listener is not None:
+                listener.close()
+            listener = None
+            time.sleep(JOB_POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    try:
+        main(once="--once" in sys.argv[1:])
+    except KeyboardInterrupt:
+        pass